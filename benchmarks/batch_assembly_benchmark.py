@@ -0,0 +1,101 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+"""
+Microbenchmark of batch assembly in FormatReader.next.
+
+For every record_length_resize, assembles batches of the resized image the way the readers do:
+appending the samples to a list and copying it into a new array with np.array (list), and
+writing them into a ring of preallocated buffers (ring, reader.batch_buffers). Prints the time
+per batch, the batch bandwidth and the bytes allocated per batch. When torch is installed, the
+cost of handing the batch to torch is measured too: torch.tensor copies the batch while
+torch.from_numpy wraps the ring buffer.
+
+    python benchmarks/batch_assembly_benchmark.py --record-lengths 65536 1048576 16777216 --batch-size 16
+"""
+import argparse
+import math
+from time import perf_counter
+
+import numpy as np
+
+from dlio_benchmark.common.enumerations import BufferBacking
+from dlio_benchmark.reader.batch_assembler import BatchAssembler
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+
+def assemble_list(image, batch_size, steps, handoff):
+    for _ in range(steps):
+        batch = []
+        for _ in range(batch_size):
+            batch.append(image)
+        batch = np.array(batch)
+        if handoff:
+            torch.tensor(batch)
+
+
+def assemble_ring(image, batch_size, steps, handoff, depth, backing):
+    assembler = BatchAssembler(batch_size, image.shape, image.dtype, depth, backing)
+    for _ in range(steps):
+        for _ in range(batch_size):
+            assembler.add(image)
+        batch = assembler.pop()
+        if handoff:
+            torch.from_numpy(batch)
+    assembler.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DLIO batch assembly microbenchmark')
+    parser.add_argument("-r", "--record-lengths", default=[65536, 1048576, 16777216], type=int, nargs="+",
+                        help="record_length_resize values in bytes")
+    parser.add_argument("-b", "--batch-size", default=16, type=int,
+                        help="Samples per batch")
+    parser.add_argument("-s", "--steps", default=50, type=int,
+                        help="Batches assembled per run")
+    parser.add_argument("-d", "--depth", default=2, type=int,
+                        help="Buffers of the ring")
+    parser.add_argument("--backing", default="heap", choices=[str(backing) for backing in BufferBacking],
+                        help="Memory of the ring buffers")
+    args = parser.parse_args()
+    backing = BufferBacking(args.backing)
+
+    handoffs = [False, True] if torch is not None else [False]
+    print(f"{'record':>10} {'mode':>5} {'torch':>6} {'ms/batch':>10} {'GB/s':>8} {'alloc MB/batch':>15}")
+    for record_length in args.record_lengths:
+        dimension = int(math.sqrt(record_length))
+        image = np.random.randint(255, size=(dimension, dimension), dtype=np.uint8)
+        batch_bytes = args.batch_size * image.nbytes
+        for handoff in handoffs:
+            for mode in ["list", "ring"]:
+                start = perf_counter()
+                if mode == "list":
+                    assemble_list(image, args.batch_size, args.steps, handoff)
+                    allocated = batch_bytes * (2 if handoff else 1)
+                else:
+                    assemble_ring(image, args.batch_size, args.steps, handoff, args.depth, backing)
+                    allocated = 0
+                elapsed = perf_counter() - start
+                print(f"{record_length:>10} {mode:>5} {str(handoff):>6} {elapsed / args.steps * 1000:>10.3f} "
+                      f"{batch_bytes * args.steps / elapsed / 1024 ** 3:>8.2f} {allocated / 1024 ** 2:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
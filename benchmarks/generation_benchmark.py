@@ -0,0 +1,102 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+"""
+Compares the static and dynamic generation schedules (dataset.generation_schedule) for a range
+of generation_processes per rank, on a dataset whose file sizes vary as much as in the unet3d
+workloads (record_length_bytes_stdev).
+
+Every configuration generates the dataset from scratch and prints the overall GB/s, the mean
+and minimum GB/s of the ranks and how much longer than the mean the slowest rank took.
+
+    mpirun -np 4 python benchmarks/generation_benchmark.py --format npz --processes 1 2 4
+"""
+import argparse
+import os
+
+from hydra import initialize_config_dir, compose
+
+import dlio_benchmark
+from dlio_benchmark.main import DLIOBenchmark
+from dlio_benchmark.utils.config import ConfigArguments
+from dlio_benchmark.utils.utility import DLIOMPI
+
+config_dir = os.path.dirname(dlio_benchmark.__file__) + "/configs/"
+
+
+def run(overrides):
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=overrides)
+    ConfigArguments.reset()
+    benchmark = DLIOBenchmark(cfg['workload'])
+    benchmark.initialize()
+    benchmark.finalize()
+    return benchmark.stats.summary['generation']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DLIO data generation schedule benchmark')
+    parser.add_argument("-f", "--format", default="npz", type=str,
+                        help="Dataset format")
+    parser.add_argument("-d", "--data-folder", default="data/generation_benchmark", type=str,
+                        help="Folder the dataset is generated in")
+    parser.add_argument("-n", "--num-files", default=64, type=int,
+                        help="Number of training files")
+    parser.add_argument("-s", "--num-samples-per-file", default=8, type=int,
+                        help="Samples per file")
+    parser.add_argument("-r", "--record-length", default=4194304, type=int,
+                        help="Mean bytes per sample")
+    parser.add_argument("--record-length-stdev", default=3145728, type=int,
+                        help="Standard deviation of the bytes per sample")
+    parser.add_argument("-p", "--processes", default=[1, 2, 4], type=int, nargs="+",
+                        help="generation_processes values to sweep")
+    args = parser.parse_args()
+
+    DLIOMPI.get_instance().initialize()
+    overrides = ['++workload.framework=tensorflow',
+                 '++workload.reader.data_loader=tensorflow',
+                 '++workload.workflow.generate_data=True',
+                 '++workload.workflow.train=False',
+                 '++workload.workflow.checkpoint=False',
+                 '++workload.workflow.evaluation=False',
+                 f"++workload.dataset.format={args.format}",
+                 f"++workload.dataset.data_folder={args.data_folder}",
+                 f"++workload.dataset.num_files_train={args.num_files}",
+                 '++workload.dataset.num_files_eval=0',
+                 '++workload.dataset.num_subfolders_train=0',
+                 f"++workload.dataset.num_samples_per_file={args.num_samples_per_file}",
+                 f"++workload.dataset.record_length_bytes={args.record_length}",
+                 f"++workload.dataset.record_length_bytes_stdev={args.record_length_stdev}",
+                 '++workload.dataset.use_manifest=False']
+    results = []
+    for processes in args.processes:
+        for schedule in ["static", "dynamic"]:
+            results.append((schedule, processes, run(overrides + [f"++workload.dataset.generation_schedule={schedule}",
+                                                                 f"++workload.dataset.generation_processes={processes}"])))
+    if DLIOMPI.get_instance().rank() == 0:
+        print(f"{'schedule':>9} {'processes':>10} {'GB':>8} {'seconds':>9} {'GB/s':>8} {'rank GB/s':>10} "
+              f"{'min rank':>9} {'imbalance':>10}")
+        for schedule, processes, generation in results:
+            rank_bandwidth = generation['rank_GB_per_second']
+            print(f"{schedule:>9} {processes:>10} {generation['bytes'] / 1024 ** 3:>8.3f} "
+                  f"{generation['duration_seconds']:>9.3f} {generation['GB_per_second']:>8.3f} "
+                  f"{sum(rank_bandwidth) / len(rank_bandwidth):>10.3f} {min(rank_bandwidth):>9.3f} "
+                  f"{generation['imbalance']:>10.2f}")
+    DLIOMPI.get_instance().finalize()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+"""
+Microbenchmark of writing one indexed binary file (data, offsets and sizes) the way
+IndexedBinaryGenerator used to, packing every byte with struct.pack (struct), and the way it
+does now, writing the random buffer through a memoryview and the index with ndarray.tofile,
+with a new random buffer per file (buffer) or a view of a random pool made once (pool,
+dataset.generation_random_pool).
+
+Prints the MB/s of every mode and the peak memory it allocated with tracemalloc, which tracks
+the NumPy buffers and the Python objects struct.pack needs.
+
+    python benchmarks/indexed_binary_generation_benchmark.py --file-sizes 16777216 134217728 --sample-size 1048576
+"""
+import argparse
+import os
+import struct
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+
+from dlio_benchmark.data_generator.indexed_binary_generator import write_records
+
+
+def write_struct(path, sample_size, num_samples, buffer_size):
+    total_size = sample_size * num_samples
+    write_size = min(total_size, buffer_size - buffer_size % sample_size)
+    records = np.random.randint(255, size=write_size, dtype=np.uint8)
+    with open(path, "wb") as data_file, open(path + ".off.idx", "wb") as off_file, \
+            open(path + ".sz.idx", "wb") as sz_file:
+        written_bytes = 0
+        while written_bytes < total_size:
+            data_to_write = min(write_size, total_size - written_bytes)
+            samples_to_write = data_to_write // sample_size
+            data_file.write(struct.pack('B' * data_to_write, *records[:data_to_write]))
+            struct._clearcache()
+            off_file.write(struct.pack('Q' * samples_to_write, *range(0, data_to_write, sample_size)[:samples_to_write]))
+            sz_file.write(struct.pack('Q' * samples_to_write, *[sample_size] * samples_to_write))
+            written_bytes += data_to_write
+
+
+def write_buffer(path, sample_size, num_samples, buffer_size, pool=None):
+    total_size = sample_size * num_samples
+    (np.arange(num_samples, dtype=np.uint64) * np.uint64(sample_size)).tofile(path + ".off.idx")
+    np.full(num_samples, sample_size, dtype=np.uint64).tofile(path + ".sz.idx")
+    if pool is not None:
+        records, position = pool, np.random.randint(len(pool))
+    else:
+        write_size = min(total_size, max(buffer_size - buffer_size % sample_size, sample_size))
+        records, position = np.random.randint(255, size=write_size, dtype=np.uint8), 0
+    with open(path, "wb") as data_file:
+        write_records(data_file, records, position, total_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DLIO indexed binary generation microbenchmark')
+    parser.add_argument("-f", "--file-sizes", default=[16777216, 134217728], type=int, nargs="+",
+                        help="Bytes per file")
+    parser.add_argument("-s", "--sample-size", default=1048576, type=int,
+                        help="Bytes per sample")
+    parser.add_argument("-b", "--buffer-size", default=2 * 1073741824, type=int,
+                        help="dataset.generation_buffer_size")
+    parser.add_argument("-p", "--pool-size", default=67108864, type=int,
+                        help="dataset.generation_random_pool")
+    parser.add_argument("--struct-limit", default=16777216, type=int,
+                        help="Largest file written with struct.pack, which takes minutes per GB")
+    parser.add_argument("-d", "--directory", default=None, type=str,
+                        help="Folder the files are written in (a temporary folder by default)")
+    args = parser.parse_args()
+
+    pool = np.random.randint(255, size=args.pool_size, dtype=np.uint8)
+    print(f"{'file MB':>8} {'mode':>7} {'MB/s':>10} {'peak MB':>9}")
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        path = os.path.join(directory, "img.indexed_binary")
+        for file_size in args.file_sizes:
+            num_samples = max(file_size // args.sample_size, 1)
+            for mode in ["struct", "buffer", "pool"]:
+                if mode == "struct" and file_size > args.struct_limit:
+                    continue
+                tracemalloc.start()
+                start = perf_counter()
+                if mode == "struct":
+                    write_struct(path, args.sample_size, num_samples, args.buffer_size)
+                else:
+                    write_buffer(path, args.sample_size, num_samples, args.buffer_size, pool if mode == "pool" else None)
+                elapsed = perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                written = args.sample_size * num_samples
+                print(f"{written / 1024 ** 2:>8.0f} {mode:>7} {written / elapsed / 1024 ** 2:>10.1f} {peak / 1024 ** 2:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+"""
+Finds where the host CPU saturates when the readers decode and preprocess the samples.
+
+For every format, the dataset is generated once, then one training epoch without emulated
+compute or preprocess_time is run per read_threads value with reader.faithful_decode and a
+reader.transforms chain (random crop, flip, normalize, cast to float16). Prints the train
+throughput from summary.json, the speedup and parallel efficiency over the first thread count,
+and the cores the epoch kept busy (cpu_cores of rank 0 in {rank}_output.json). Throughput stops
+following the thread count once cpu_cores reaches the cores available to the rank.
+
+    mpirun -np 1 python benchmarks/preprocess_scaling_benchmark.py --formats npz hdf5 --read-threads 1 2 4 8
+"""
+import argparse
+import json
+import os
+
+from hydra import initialize_config_dir, compose
+
+import dlio_benchmark
+from dlio_benchmark.main import DLIOBenchmark
+from dlio_benchmark.utils.config import ConfigArguments
+from dlio_benchmark.utils.utility import DLIOMPI
+
+config_dir = os.path.dirname(dlio_benchmark.__file__) + "/configs/"
+
+
+def run(overrides, generate):
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=overrides + [f"++workload.workflow.generate_data={generate}"])
+    ConfigArguments.reset()
+    benchmark = DLIOBenchmark(cfg['workload'])
+    benchmark.initialize()
+    benchmark.run()
+    benchmark.finalize()
+    if DLIOMPI.get_instance().rank() == 0:
+        with open(os.path.join(benchmark.output_folder, "summary.json")) as f:
+            throughput = json.load(f)['metric']['train_throughput_mean_samples_per_second']
+        with open(os.path.join(benchmark.output_folder, "0_output.json")) as f:
+            cpu_cores = json.load(f)['1'].get('cpu_cores', 0.0)
+        return throughput, cpu_cores
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DLIO preprocessing read_threads scaling benchmark')
+    parser.add_argument("-f", "--formats", default=["npz", "hdf5", "indexed_binary"], type=str, nargs="+",
+                        help="Dataset formats")
+    parser.add_argument("-d", "--data-folder", default="data/preprocess_scaling_benchmark", type=str,
+                        help="Folder the datasets are generated in")
+    parser.add_argument("-n", "--num-files", default=32, type=int,
+                        help="Number of training files")
+    parser.add_argument("-s", "--num-samples-per-file", default=64, type=int,
+                        help="Samples per file")
+    parser.add_argument("-r", "--record-length", default=262144, type=int,
+                        help="Bytes per sample")
+    parser.add_argument("-b", "--batch-size", default=16, type=int,
+                        help="Batch size")
+    parser.add_argument("-c", "--crop", default=224, type=int,
+                        help="Size of the random crop of the transform chain")
+    parser.add_argument("-t", "--read-threads", default=[1, 2, 4, 8], type=int, nargs="+",
+                        help="read_threads values to sweep")
+    args = parser.parse_args()
+
+    DLIOMPI.get_instance().initialize()
+    results = []
+    for fmt in args.formats:
+        overrides = ['++workload.framework=tensorflow',
+                     '++workload.reader.data_loader=tensorflow',
+                     '++workload.workflow.train=True',
+                     '++workload.workflow.checkpoint=False',
+                     '++workload.workflow.evaluation=False',
+                     f"++workload.dataset.format={fmt}",
+                     f"++workload.dataset.data_folder={args.data_folder}/{fmt}",
+                     f"++workload.dataset.num_files_train={args.num_files}",
+                     '++workload.dataset.num_files_eval=0',
+                     f"++workload.dataset.num_samples_per_file={args.num_samples_per_file}",
+                     f"++workload.dataset.record_length_bytes={args.record_length}",
+                     '++workload.dataset.record_length_bytes_stdev=0',
+                     f"++workload.dataset.record_length_resize={args.record_length}",
+                     f"++workload.reader.batch_size={args.batch_size}",
+                     '++workload.reader.faithful_decode=True',
+                     '++workload.reader.preprocess_time=0.0',
+                     f"++workload.reader.transforms=[{{type:random_crop,size:{args.crop}}},{{type:flip}},"
+                     f"{{type:normalize}},{{type:cast,dtype:float16}}]",
+                     '++workload.train.computation_time=0.0',
+                     '++workload.train.epochs=1']
+        for i, read_threads in enumerate(args.read_threads):
+            result = run(overrides + [f"++workload.reader.read_threads={read_threads}"], i == 0)
+            results.append((fmt, read_threads, result))
+    if DLIOMPI.get_instance().rank() == 0:
+        print(f"{'format':>16} {'threads':>8} {'samples/s':>12} {'speedup':>8} {'efficiency':>11} {'cpu cores':>10}")
+        base = {}
+        for fmt, read_threads, (throughput, cpu_cores) in results:
+            base.setdefault(fmt, (read_threads, throughput))
+            speedup = throughput / base[fmt][1]
+            efficiency = speedup * base[fmt][0] / read_threads
+            print(f"{fmt:>16} {read_threads:>8} {throughput:>12.1f} {speedup:>8.2f} {efficiency:>11.2f} "
+                  f"{cpu_cores:>10.2f}")
+    DLIOMPI.get_instance().finalize()
+
+
+if __name__ == '__main__':
+    main()
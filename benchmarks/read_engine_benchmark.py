@@ -0,0 +1,101 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+"""
+Microbenchmark of the read engines of the indexed binary reader.
+
+Writes one file of fixed size records, then reads it batch by batch with the per-sample seek and
+readinto of the posix engine, with preadv and with io_uring, and prints the requests, mean batch
+latency, IOPS and bandwidth of each. Batches are consecutive samples with --order sequential and
+random samples with --order random. With --gaps, samples of a batch up to that many bytes apart are
+merged into one request, and the merge column gives the sample reads saved per request.
+
+    python benchmarks/read_engine_benchmark.py --record-sizes 4096 65536 --order random --gaps 0 65536
+"""
+import argparse
+import os
+from time import perf_counter
+
+import numpy as np
+
+from dlio_benchmark.common.enumerations import ReadEngine
+from dlio_benchmark.reader.read_engine import get_read_engine
+
+
+def read_posix(filename, offsets, sizes):
+    with open(filename, "rb") as file:
+        for offset, size in zip(offsets.tolist(), sizes.tolist()):
+            file.seek(offset)
+            image = np.empty(size, dtype=np.uint8)
+            file.readinto(image)
+    return len(offsets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DLIO indexed binary read engine microbenchmark')
+    parser.add_argument("-f", "--file", default="read_engine_benchmark.bin", type=str,
+                        help="File the records are written to")
+    parser.add_argument("-r", "--record-sizes", default=[4096, 65536], type=int, nargs="+",
+                        help="Record sizes in bytes")
+    parser.add_argument("-n", "--num-records", default=16384, type=int,
+                        help="Records in the file")
+    parser.add_argument("-b", "--batch-size", default=64, type=int,
+                        help="Samples per batch")
+    parser.add_argument("-q", "--queue-depth", default=32, type=int,
+                        help="io_uring queue depth")
+    parser.add_argument("-g", "--gaps", default=[0], type=int, nargs="+",
+                        help="Gap tolerances in bytes of the preadv and io_uring engines")
+    parser.add_argument("-o", "--order", default="random", choices=["sequential", "random"],
+                        help="Order the samples are read in")
+    args = parser.parse_args()
+
+    print(f"{'record':>8} {'engine':>9} {'gap':>8} {'requests':>9} {'merge':>7} {'latency (ms)':>13} {'IOPS':>10} {'MB/s':>9}")
+    for record_size in args.record_sizes:
+        np.random.randint(0, 255, args.num_records * record_size, dtype=np.uint8).tofile(args.file)
+        offsets = np.arange(args.num_records, dtype=np.int64) * record_size
+        sizes = np.full(args.num_records, record_size, dtype=np.int64)
+        samples = np.arange(args.num_records)
+        if args.order == "random":
+            np.random.shuffle(samples)
+        batches = [samples[i:i + args.batch_size] for i in range(0, args.num_records, args.batch_size)]
+        runs = [(ReadEngine.POSIX, 0)] + [(read_engine, gap) for read_engine in [ReadEngine.PREADV, ReadEngine.IO_URING]
+                                          for gap in args.gaps]
+        for read_engine, gap in runs:
+            engine = get_read_engine(read_engine, args.queue_depth, gap)
+            fd = os.open(args.file, os.O_RDONLY)
+            requests = 0
+            latencies = []
+            start = perf_counter()
+            for batch in batches:
+                batch_start = perf_counter()
+                if engine is None:
+                    requests += read_posix(args.file, offsets[batch], sizes[batch])
+                else:
+                    plan = engine.plan(np.zeros(len(batch), dtype=np.int64), offsets[batch], sizes[batch])
+                    requests += engine.read([fd], plan)
+                latencies.append(perf_counter() - batch_start)
+            elapsed = perf_counter() - start
+            os.close(fd)
+            if engine is not None:
+                engine.close()
+            print(f"{record_size:>8} {str(read_engine):>9} {gap:>8} {requests:>9} {args.num_records / requests:>6.1f}x "
+                  f"{np.mean(latencies) * 1000:>13.3f} {requests / elapsed:>10.0f} "
+                  f"{args.num_records * record_size / elapsed / 1024 / 1024:>9.1f}")
+    os.remove(args.file)
+
+
+if __name__ == '__main__':
+    main()
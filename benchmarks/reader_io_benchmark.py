@@ -0,0 +1,106 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+"""
+Compares the read modes of FormatReader.next on the same dataset: sequential reads, read ahead
+on a thread pool (reader.prefetch_files / reader.io_threads) and asyncio reads
+(reader.async_io / reader.io_queue_depth).
+
+The dataset is generated once, then one training epoch without emulated compute is run per
+mode and the train throughput reported in summary.json is printed.
+
+    mpirun -np 2 python benchmarks/reader_io_benchmark.py --format indexed_binary --depths 4 16 64
+"""
+import argparse
+import json
+import os
+
+from hydra import initialize_config_dir, compose
+
+import dlio_benchmark
+from dlio_benchmark.main import DLIOBenchmark
+from dlio_benchmark.utils.config import ConfigArguments
+from dlio_benchmark.utils.utility import DLIOMPI
+
+config_dir = os.path.dirname(dlio_benchmark.__file__) + "/configs/"
+
+
+def run(overrides, generate):
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=overrides + [f"++workload.workflow.generate_data={generate}"])
+    ConfigArguments.reset()
+    benchmark = DLIOBenchmark(cfg['workload'])
+    benchmark.initialize()
+    benchmark.run()
+    benchmark.finalize()
+    if DLIOMPI.get_instance().rank() == 0:
+        with open(os.path.join(benchmark.output_folder, "summary.json")) as f:
+            return json.load(f)['metric']['train_throughput_mean_samples_per_second']
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DLIO reader I/O mode benchmark')
+    parser.add_argument("-f", "--format", default="indexed_binary", type=str,
+                        help="Dataset format")
+    parser.add_argument("-d", "--data-folder", default="data/reader_io_benchmark", type=str,
+                        help="Folder the dataset is generated in")
+    parser.add_argument("-n", "--num-files", default=64, type=int,
+                        help="Number of training files")
+    parser.add_argument("-s", "--num-samples-per-file", default=64, type=int,
+                        help="Samples per file")
+    parser.add_argument("-r", "--record-length", default=65536, type=int,
+                        help="Bytes per sample")
+    parser.add_argument("-b", "--batch-size", default=16, type=int,
+                        help="Batch size")
+    parser.add_argument("-t", "--read-threads", default=1, type=int,
+                        help="Reader threads of the data loader")
+    parser.add_argument("--depths", default=[4, 16, 64], type=int, nargs="+",
+                        help="Thread counts of the threaded mode and queue depths of the async mode")
+    args = parser.parse_args()
+
+    DLIOMPI.get_instance().initialize()
+    overrides = ['++workload.framework=tensorflow',
+                 '++workload.reader.data_loader=tensorflow',
+                 '++workload.workflow.train=True',
+                 '++workload.workflow.checkpoint=False',
+                 '++workload.workflow.evaluation=False',
+                 f"++workload.dataset.format={args.format}",
+                 f"++workload.dataset.data_folder={args.data_folder}",
+                 f"++workload.dataset.num_files_train={args.num_files}",
+                 '++workload.dataset.num_files_eval=0',
+                 f"++workload.dataset.num_samples_per_file={args.num_samples_per_file}",
+                 f"++workload.dataset.record_length_bytes={args.record_length}",
+                 '++workload.dataset.record_length_bytes_stdev=0',
+                 f"++workload.reader.batch_size={args.batch_size}",
+                 f"++workload.reader.read_threads={args.read_threads}",
+                 '++workload.train.computation_time=0.0',
+                 '++workload.train.epochs=1']
+    results = [("sequential", "-", run(overrides, True))]
+    for depth in args.depths:
+        results.append(("threaded", depth, run(overrides + [f"++workload.reader.prefetch_files={depth}",
+                                                            f"++workload.reader.io_threads={depth}"], False)))
+        results.append(("async", depth, run(overrides + ['++workload.reader.async_io=True',
+                                                         f"++workload.reader.io_queue_depth={depth}"], False)))
+    if DLIOMPI.get_instance().rank() == 0:
+        print(f"{'mode':>12} {'depth':>6} {'samples/s':>12} {'MB/s':>10}")
+        for mode, depth, throughput in results:
+            print(f"{mode:>12} {depth:>6} {throughput:>12.1f} {throughput * args.record_length / 1024 / 1024:>10.1f}")
+    DLIOMPI.get_instance().finalize()
+
+
+if __name__ == '__main__':
+    main()
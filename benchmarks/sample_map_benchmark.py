@@ -0,0 +1,105 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+"""
+Microbenchmark of the sample map construction done by ConfigArguments.reconfigure at every epoch.
+
+Times build_sample_map_iter (ITERATIVE sampler) and get_global_map_index (INDEX sampler) for a
+growing number of samples on one emulated rank, and the per-sample loop they replaced for the
+sizes given with --legacy-max-samples.
+
+    python benchmarks/sample_map_benchmark.py --samples 10000 100000 1000000 10000000
+"""
+import argparse
+import math
+import os
+from time import perf_counter
+
+import numpy as np
+
+from dlio_benchmark.common.enumerations import Shuffle
+from dlio_benchmark.utils.config import ConfigArguments
+from dlio_benchmark.utils.utility import DLIOMPI
+
+
+def legacy_build_sample_map_iter(args, file_list, total_samples, epoch_number):
+    num_files = len(file_list)
+    num_threads = max(args.read_threads, 1)
+    samples_per_proc = int(math.ceil(total_samples / args.comm_size))
+    samples_per_thread = samples_per_proc // num_threads
+    start_sample_index = samples_per_proc * args.my_rank
+    end_sample_index = min(samples_per_proc * (args.my_rank + 1) - 1, total_samples - 1)
+    sample_list = np.arange(start_sample_index, end_sample_index + 1)
+    if args.sample_shuffle is not Shuffle.OFF:
+        np.random.seed(args.seed + epoch_number if args.seed_change_epoch else args.seed)
+        np.random.shuffle(sample_list)
+    process_thread_file_map = {thread_index: [] for thread_index in range(num_threads)}
+    file_index = args.my_rank * ((num_files // args.comm_size) % num_files)
+    samples_sum = 0
+    sample_index = 0
+    for sample in sample_list:
+        samples_sum += sample
+        thread_index = (sample_index // samples_per_thread) % num_threads
+        process_thread_file_map[thread_index].append((sample, os.path.abspath(file_list[file_index]),
+                                                      sample_list[sample_index] % args.num_samples_per_file))
+        sample_index += 1
+        file_index = (sample_index // args.num_samples_per_file) % num_files
+    return process_thread_file_map, samples_sum
+
+
+def timed(function, *arguments):
+    start = perf_counter()
+    function(*arguments)
+    return perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DLIO sample map microbenchmark')
+    parser.add_argument("-s", "--samples", default=[10**4, 10**5, 10**6, 10**7], type=int, nargs="+",
+                        help="Number of samples owned by the emulated rank")
+    parser.add_argument("-n", "--num-samples-per-file", default=16, type=int,
+                        help="Samples per file")
+    parser.add_argument("-t", "--read-threads", default=4, type=int,
+                        help="Reader threads the samples are split across")
+    parser.add_argument("-l", "--legacy-max-samples", default=10**6, type=int,
+                        help="Largest sample count the per-sample loop is timed for")
+    args = parser.parse_args()
+
+    DLIOMPI.get_instance().initialize()
+    config = ConfigArguments.get_instance()
+    config.comm_size = 1
+    config.my_rank = 0
+    config.read_threads = args.read_threads
+    config.num_samples_per_file = args.num_samples_per_file
+    config.sample_shuffle = Shuffle.SEED
+
+    print(f"{'samples':>12} {'files':>10} {'iter (s)':>10} {'index (s)':>10} {'legacy (s)':>11} {'speedup':>8}")
+    for total_samples in args.samples:
+        num_files = int(math.ceil(total_samples / args.num_samples_per_file))
+        file_list = [f"data/train/img_{i}_of_{num_files}.npz" for i in range(num_files)]
+        iter_time = timed(config.build_sample_map_iter, file_list, total_samples, 1)
+        index_time = timed(config.get_global_map_index, file_list, total_samples, 1)
+        legacy = "-"
+        speedup = "-"
+        if total_samples <= args.legacy_max_samples:
+            legacy_time = timed(legacy_build_sample_map_iter, config, file_list, total_samples, 1)
+            legacy = f"{legacy_time:.4f}"
+            speedup = f"{legacy_time / iter_time:.1f}x"
+        print(f"{total_samples:>12} {num_files:>10} {iter_time:>10.4f} {index_time:>10.4f} {legacy:>11} {speedup:>8}")
+
+
+if __name__ == '__main__':
+    main()
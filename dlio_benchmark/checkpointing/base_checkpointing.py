@@ -14,65 +14,64 @@
    See the License for the specific language governing permissions and
    limitations under the License.
 """
+import glob
 import logging
 import math
 import os
 import platform
 import time
 import ctypes
+import copy
 import psutil
 import mmap
+import numpy as np
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 
-from dlio_benchmark.common.enumerations import CheckpointLocationType, CheckpointModeType
+from dlio_benchmark.checkpointing.checkpoint_layout import CheckpointLayout, get_datatype_size
+from dlio_benchmark.checkpointing.raw_checkpoint_io import file_crc32, readahead_files
+from dlio_benchmark.common.enumerations import CheckpointLocationType, CheckpointModeType, CheckpointTensorProviderType
 from dlio_benchmark.storage.storage_factory import StorageFactory
 from dlio_benchmark.utils.config import ConfigArguments
 from dlio_benchmark.utils.utility import DLIOMPI, utcnow
 
 
-def get_datatype_size(datatype):
-    if datatype == "int8" or datatype == "uint8":
-        return 1
-    elif datatype == "fp16" or datatype == "bf16":
-        return 2
-    elif datatype == "fp32":
-        return 4
-    elif datatype == "fp64":
-        return 8
-    else:
-        raise Exception("Unsupported datatype {datatype}")
+# bytes of the shared random buffer beyond the tensor it is generated for, the range of its offset
+SHARED_BUFFER_SLACK = 1024 * 1024
 
-class BaseCheckpointing(ABC):
+class BaseCheckpointing(CheckpointLayout, ABC):
 
     def __init__(self, ext):
         #TODO(Huihuo): Add support for checkpointing rng states for transformer type of architecture
         self.ext = ext
-        self.args = ConfigArguments.get_instance()
+        super().__init__(ConfigArguments.get_instance())
         self.checkpoint_storage = StorageFactory().get_storage(self.args.storage_type, self.args.checkpoint_folder,
                                                           self.args.framework)
         self.logger = self.args.logger
         self.MPI = DLIOMPI.get_instance()
         self.comm = self.MPI.comm()
-        # define parallelism
-        self.model_parallelism = self.args.pipeline_parallelism*self.args.tensor_parallelism
-        if self.args.data_parallelism < 0:
-            self.data_parallelism = self.args.comm_size//self.model_parallelism
-        else:
-            if self.comm.rank == 0:
-                self.logger.output(f"{utcnow()} Performing subset checkpointing: {self.comm.size} of {self.args.data_parallelism*self.args.tensor_parallelism*self.args.pipeline_parallelism}")
-            self.data_parallelism = self.args.data_parallelism
-        self.pipeline_parallism_rank = (self.args.my_rank // self.args.tensor_parallelism) % self.args.pipeline_parallelism
-        self.tensor_parallism_rank = self.args.my_rank % self.args.tensor_parallelism
-        self.data_parallelism_rank = self.args.my_rank // self.model_parallelism
-        self.model_parallelism_rank = self.args.my_rank%self.model_parallelism
-        self.optimization_groups_predefined = False
-        self.layer_parameters_predefined = False
+        if self.args.data_parallelism >= 0 and self.comm.rank == 0:
+            self.logger.output(f"{utcnow()} Performing subset checkpointing: {self.comm.size} of {self.args.data_parallelism*self.args.tensor_parallelism*self.args.pipeline_parallelism}")
         self.checkpoint_storage.create_namespace(exist_ok=True)
         self.rank_to_checkpoint = self.args.my_rank
         self.num_parameters = self.get_num_parameters()
         self.checkpoint_size = 0.0
         self.randomize_tensor = self.args.checkpoint_randomize_tensor
 
+        # asynchronous checkpointing: the states are staged and persisted by background threads
+        self.checkpoint_async = self.args.checkpoint_async
+        self.async_executor = None
+        self.pending_checkpoints = []
+        self.async_checkpoints = []
+        self.blocked_intervals = []
+        # the files read by every checkpoint load of the rank
+        self.checkpoint_loads = []
+
+        # shared tensors: views over one random buffer of the rank instead of a buffer each
+        self.shared_tensors = self.args.checkpoint_tensor_provider == CheckpointTensorProviderType.SHARED
+        self.shared_buffer = None
+        self.shared_rng = np.random.default_rng(self.args.my_rank)
+
         # KSM optim
         self.madvise_initialized = False
         self.madvise_ready = False
@@ -96,16 +95,6 @@ class BaseCheckpointing(ABC):
             else:
                 self.rank_to_checkpoint = 0
         if self.rank_to_checkpoint == self.args.my_rank:
-            if len(self.args.optimization_groups) > 0:
-                self.optimization_groups_predefined = True
-            else:
-                self.optimization_groups_predefined = False
-            if len(self.args.layer_parameters) > 0:
-                self.layer_parameters_predefined = True
-            else:
-                self.layer_parameters_predefined = False
-
-
             self.layer_state = None
             start_layer, end_layer = self.get_layer_index()
             if self.layer_parameters_predefined:
@@ -161,6 +150,8 @@ class BaseCheckpointing(ABC):
                 if self.args.my_rank == 0:
                     self.logger.info(f"{utcnow()} Model state defined")
 
+        if self.shared_tensors and self.shared_buffer is not None and self.args.my_rank == 0:
+            self.logger.info(f"{utcnow()} Shared tensor buffer: {len(self.shared_buffer)/1024./1024./1024.} GB per rank")
         model_checkpoint_size = self.comm.allreduce(model_checkpoint_size)/1024./1024./1024.
         optimizer_checkpoint_size = self.comm.allreduce(optimizer_checkpoint_size)/1024./1024./1024.
 
@@ -235,17 +226,51 @@ class BaseCheckpointing(ABC):
         self.madvise_ready = True
         return True
 
+    def madvise_region(self, ptr_addr, size_bytes):
+        """
+        Apply MADV_MERGEABLE to the pages fully inside a memory region.
+        """
+        if not self.madvise_ready or ptr_addr == 0 or size_bytes <= 0:
+            return False
+
+        page_size = self.madvise_page_size
+        start_addr = ptr_addr
+        end_addr = ptr_addr + size_bytes
+
+        aligned_start_addr = (start_addr + page_size - 1) // page_size * page_size
+        aligned_end_addr = end_addr // page_size * page_size
+        aligned_size = aligned_end_addr - aligned_start_addr
+
+        if aligned_size <= 0:
+            return False
+
+        try:
+            c_ptr = ctypes.c_void_p(aligned_start_addr)
+            c_size = ctypes.c_size_t(aligned_size)
+            ret = self.madvise_func(c_ptr, c_size, self.madvise_mergeable)
+
+            if ret == 0:
+                return True
+            else:
+                return False
+
+        except Exception:
+            return False
+
     def get_tensor(self, length, datatype="int8"):
         """
         Create a tensor using the underlying framework and prepare for KSM page coalescing if enabled.
 
-        1. Creates a tensor of the specified length and data type using the framework's native method
+        1. Creates a tensor of the specified length and data type using the framework's native method,
+           or a view over the shared random buffer with checkpoint.tensor_provider shared
         2. If KSM and madvise are active:
            - Sets the mergeable attribute on virtual memory pages
            - Waits for RAM to reach a threshold to allow KSM to coalesce identical pages
 
         The KSM option is useful *only* if self.randomize_tensor is false
         """
+        if self.shared_tensors:
+            return self.get_shared_tensor(length, datatype)
 
         tensor = self.get_tensor_core(length, datatype, self.randomize_tensor)
 
@@ -257,6 +282,29 @@ class BaseCheckpointing(ABC):
 
         return tensor
 
+    def get_shared_tensor(self, length, datatype="int8"):
+        """
+        A tensor of length elements viewing the shared random buffer of the rank at a random offset,
+        so that the tensors hold different bytes at the same offsets of their pages. The buffer is
+        regenerated, at least twice as large, when a tensor does not fit in it.
+        """
+        itemsize = get_datatype_size(datatype)
+        nbytes = length * itemsize
+        if self.shared_buffer is None or len(self.shared_buffer) < nbytes:
+            size = nbytes + SHARED_BUFFER_SLACK
+            if self.shared_buffer is not None:
+                size = max(size, 2 * len(self.shared_buffer))
+            self.shared_buffer = self.shared_rng.integers(0, 256, size=size, dtype=np.uint8)
+        offset = int(self.shared_rng.integers(0, (len(self.shared_buffer) - nbytes) // itemsize + 1)) * itemsize
+        return self.get_tensor_view(self.shared_buffer[offset:offset + nbytes], datatype)
+
+    def get_tensor_view(self, array, datatype="int8"):
+        """
+        A tensor of the framework sharing the memory of the uint8 numpy array, frameworks which
+        cannot share memory with numpy allocate a tensor instead.
+        """
+        return self.get_tensor_core(len(array) // get_datatype_size(datatype), datatype, self.randomize_tensor)
+
     def await_ram_threshold(self):
         check_interval_seconds = 10
         current_ram_usage = psutil.virtual_memory().percent
@@ -270,6 +318,28 @@ class BaseCheckpointing(ABC):
                     break
                 time.sleep(check_interval_seconds)
 
+    def copy_tensor(self, tensor):
+        """
+        Copy of a tensor to stage, frameworks with a cheaper copy override it.
+        """
+        return copy.deepcopy(tensor)
+
+    def stage_state(self, state, staged=None):
+        """
+        Copies the tensors of a nested state dict, keeping the dicts shared between layers shared.
+        """
+        if staged is None:
+            staged = dict()
+        if state is None:
+            return None
+        if id(state) in staged:
+            return staged[id(state)]
+        if isinstance(state, dict):
+            staged[id(state)] = {key: self.stage_state(value, staged) for key, value in state.items()}
+        else:
+            staged[id(state)] = self.copy_tensor(state)
+        return staged[id(state)]
+
     @abstractmethod
     def save_state(self, suffix, state, fsync=False):
         pass
@@ -281,52 +351,42 @@ class BaseCheckpointing(ABC):
     def get_name(self, suffix):
         return os.path.join(self.args.checkpoint_folder, f"{suffix}.{self.ext}")
 
-    def get_num_parameters(self):
-        if self.args.num_layers <= 0:
-            return 0
-        head_size = self.args.hidden_size//self.args.num_attention_heads
-        # column dimension of K & V matrix
-        dim_kv = head_size * self.args.num_kv_heads        
-        embedding = self.args.vocab_size*self.args.hidden_size
-        input_norm = self.args.hidden_size
-        # number of elements in Q, K, V attention matrices
-        qkv = self.args.hidden_size * (self.args.hidden_size + 2*dim_kv)
-        dense = self.args.hidden_size*self.args.hidden_size
-        layer_norm = self.args.hidden_size
-        # number of parameters from the two MLP layers: h_to_4h and 4h_to_h
-        mlp_h_to_4h = self.args.ffn_hidden_size*2*self.args.hidden_size # the factor of 2 is because of gated linear unit                                                                           
-        mlp_4h_to_h = self.args.ffn_hidden_size*self.args.hidden_size
-        weight = self.args.hidden_size
-        # number of parameters from the lm_head layer
-        lm_head = embedding
-        return embedding  + (input_norm + qkv + dense + layer_norm + mlp_h_to_4h + mlp_4h_to_h)*self.args.num_layers + weight + lm_head
-
-    def get_layer_parameters(self, layer_index):
-        head_size = self.args.hidden_size//self.args.num_attention_heads
-        # column dimension of K and V matrix
-        dim_kv = head_size * self.args.num_kv_heads
-        if len(self.args.layer_parameters) > 0:
-            self.layer_parameters_predefined = True
-            return self.args.layer_parameters
-        else:
-            if self.args.num_layers <= 0:
-                return []
-            if self.args.zero_stage < 3:
-                sharding_factor = 1
-            else:
-                sharding_factor = self.data_parallelism
-            if layer_index == 0 or layer_index == self.args.num_layers + 1:
-                return [self.args.hidden_size * self.args.vocab_size // self.args.tensor_parallelism // sharding_factor] # embedding or lm_head
-            elif layer_index == self.args.num_layers + 2:
-                return [self.args.hidden_size //sharding_factor]
-            else:
-                return [ self.args.hidden_size // sharding_factor, # input_norm, 
-                        self.args.hidden_size*(self.args.hidden_size+2*dim_kv)//self.args.tensor_parallelism//sharding_factor, # self_attn - this is the 
-                        self.args.hidden_size*self.args.hidden_size//self.args.tensor_parallelism//sharding_factor, # dense - this is the o matrix
-                        self.args.hidden_size//sharding_factor, # layer_norm
-                        self.args.hidden_size*2*self.args.ffn_hidden_size//self.args.tensor_parallelism//sharding_factor, # ffn_h_to_4h, 2 is from gated linear unit
-                        self.args.hidden_size*self.args.ffn_hidden_size//self.args.tensor_parallelism//sharding_factor, # ffn_4h_to_h
-                ]
+    def get_paths(self, suffix):
+        """
+        The files saving a state wrote, the frameworks writing several files with the name as prefix.
+        """
+        name = self.get_name(suffix)
+        if os.path.isfile(name):
+            return [name]
+        return sorted(path for path in glob.glob(f"{glob.escape(name)}*") if not path.endswith(".crc32"))
+
+    def save_file(self, suffix, state):
+        """
+        Saves a state and, with checkpoint.checksum, the CRC32 of the files written next to them.
+        """
+        self.save_state(suffix=suffix, state=state, fsync=self.args.checkpoint_fsync)
+        if self.args.checkpoint_checksum:
+            with open(f"{self.get_name(suffix)}.crc32", "w") as f:
+                f.write(f"{file_crc32(self.get_paths(suffix), self.args.checkpoint_write_size):08x}")
+
+    def load_file(self, suffix, state):
+        """
+        Loads a state, first validating the checksum of its files with checkpoint.checksum, and
+        returns the bytes read and the time it took.
+        """
+        start_time = time.time()
+        paths = self.get_paths(suffix)
+        if self.args.checkpoint_checksum:
+            with open(f"{self.get_name(suffix)}.crc32", "r") as f:
+                expected = f.read().strip()
+            crc = f"{file_crc32(paths, self.args.checkpoint_write_size):08x}"
+            if crc != expected:
+                raise Exception(f"Checksum mismatch for {self.get_name(suffix)}: {crc} instead of {expected}")
+        self.load_state(suffix=suffix, state=state)
+        seconds = time.time() - start_time
+        nbytes = sum(os.path.getsize(path) for path in paths)
+        return {'file': suffix, 'bytes': nbytes, 'seconds': seconds}
+
     def get_layer_state(self, layer_index):
         layer_parameters = self.get_layer_parameters(layer_index)
         layer_state = dict()
@@ -337,85 +397,131 @@ class BaseCheckpointing(ABC):
                 size += state*get_datatype_size(self.args.model_datatype)
         return layer_state, size
 
-    def get_optimization_groups(self):
-        if len(self.args.optimization_groups) > 0:
-            self.optimization_groups_predefined = True
-            return self.args.optimization_groups
-        else:
-            if self.args.num_layers <= 0:
-                return []
-            if self.args.zero_stage > 0:
-                # zero stage 1, 2, 3
-                num_parameters = self.get_num_parameters() // (self.data_parallelism * self.model_parallelism)
-            else:
-                # if zero is not used. Only the first data parallel instance will save the optimizer states
-                num_parameters= self.get_num_parameters() // self.model_parallelism
-            if num_parameters> 0:
-                return [num_parameters, self.args.hidden_size*5, 
-                        num_parameters, self.args.hidden_size*5, 
-                        num_parameters, self.args.hidden_size*5]   
-            else:
-                return []                                                                                                           
-
-    def get_layer_index(self):
-        '''
-        The layers indcies are [0, 1, ..., l, l+1, l+2], where l is the total number of transformer layers.                                               
-        Layer 0, and layer l+1, l+2 are embedding, lm_head, and weight layers, respectively, they are not part of the transformer layers.                 
-        The transformer layers are from 1 to l. We only distribute the transformer layers among the ranks.                                                
-        We assume layer 0 is always on rank 0, and l+1 and l+2 are on the last rank.                                                                      
-        '''
-        pipeline_rank = self.pipeline_parallism_rank
-        num_layers_per_pipeline_group = self.args.num_layers//self.args.pipeline_parallelism
-        remainder = self.args.num_layers%self.args.pipeline_parallelism
-        if pipeline_rank < remainder:
-            start_layer = pipeline_rank * (num_layers_per_pipeline_group + 1) + 1
-            end_layer = start_layer + num_layers_per_pipeline_group
-        else:
-            start_layer = remainder * (num_layers_per_pipeline_group + 1) + (pipeline_rank - remainder) * num_layers_per_pipeline_group + 1
-            end_layer = start_layer + num_layers_per_pipeline_group - 1
-        if not self.layer_parameters_predefined: 
-            # will turn this on for all the cases in future
-            if pipeline_rank == self.args.pipeline_parallelism - 1:
-                end_layer = self.args.num_layers + 2
-            if pipeline_rank == 0:
-                start_layer = 0
-        return start_layer, end_layer
-    
     @abstractmethod
     def save_checkpoint(self, epoch, step_number):
         my_rank = DLIOMPI.get_instance().rank()
-        start_layer, end_layer = self.get_layer_index()
         # create a specifc folder for each step
         checkpoint_id = f"global_epoch{epoch}_step{step_number}"
         self.checkpoint_storage.create_node(checkpoint_id, exist_ok=True)
+        if self.checkpoint_async:
+            self.save_checkpoint_async(checkpoint_id)
+        elif self.rank_to_checkpoint == my_rank:
+            self.persist_checkpoint(checkpoint_id, self.model_state, self.layer_state, self.optimization_state)
+
+    def save_checkpoint_async(self, checkpoint_id):
+        """
+        Stages a copy of the states and returns while a background thread persists it, as async
+        checkpointing does. Saving blocks until fewer than checkpoint.max_concurrent checkpoints
+        are being persisted, and then for the time of the copy.
+        """
+        my_rank = DLIOMPI.get_instance().rank()
+        start_time = time.time()
+        self.wait_pending_checkpoints(self.args.checkpoint_max_concurrent - 1)
+        staging_start_time = time.time()
+        states = None
         if self.rank_to_checkpoint == my_rank:
-            if self.model_state:
-                self.save_state(suffix=f"{checkpoint_id}/model_states-{my_rank}", state=self.model_state, fsync = self.args.checkpoint_fsync)
-
-            if self.layer_state:
-                start_time = time.time()
-                if self.args.zero_stage < 3 and self.args.zero_stage > 0:
-                    # if pp is turned on, we assume that the model is sharded across the pipeline stages
-                    if self.data_parallelism_rank == 0 and self.args.num_layers > 0:
-                        # in this case, model is saved layer by layer
-                        if self.args.pipeline_parallelism > 1:
-                            for layer_index in range(start_layer, end_layer + 1):
-                                self.save_state(suffix=f"{checkpoint_id}/layer_{layer_index}-model_{self.model_parallelism_rank}_model_states", state=self.layer_state[str(layer_index)], fsync = self.args.checkpoint_fsync)
-                        else:
-                            self.save_state(suffix=f"{checkpoint_id}/model_{self.model_parallelism_rank}_model_states", state=self.layer_state, fsync = self.args.checkpoint_fsync)
-                else:
-                    # in this case, model is sharded across the data parallel ranks
-                    self.save_state(suffix=f"{checkpoint_id}/zero_pp_rank_{self.data_parallelism_rank}_mp_rank_{self.model_parallelism_rank}_model_states", state=self.layer_state, fsync = self.args.checkpoint_fsync)
-                save_model_time = time.time() - start_time
-                if my_rank == 0:
-                    self.logger.output(f"{utcnow()} Saved model checkpoint in {save_model_time:.4f} seconds")
-                
-            if self.optimization_state:
-                start_time = time.time()
-                self.save_state(suffix=f"{checkpoint_id}/zero_pp_rank_{self.data_parallelism_rank}_mp_rank_{self.model_parallelism_rank}_optim_states", state=self.optimization_state, fsync = self.args.checkpoint_fsync)
-                save_optimizer_time = time.time() - start_time
-                if my_rank == 0:
-                    self.logger.output(f"{utcnow()} Saved optimizer checkpoint in {save_optimizer_time:.4f} seconds")
+            staged = dict()
+            states = [self.stage_state(state, staged) for state in [self.model_state, self.layer_state, self.optimization_state]]
+        end_time = time.time()
+        record = {'checkpoint': checkpoint_id, 'blocked': end_time - start_time, 'staging': end_time - staging_start_time,
+                  'persist_start': end_time, 'persist_end': end_time}
+        self.async_checkpoints.append(record)
+        self.blocked_intervals.append((start_time, end_time))
+        if states is not None:
+            if self.async_executor is None:
+                self.async_executor = ThreadPoolExecutor(max_workers=self.args.checkpoint_max_concurrent)
+            self.pending_checkpoints.append(self.async_executor.submit(self.persist_checkpoint_async, record, checkpoint_id, *states))
+
+    def persist_checkpoint_async(self, record, checkpoint_id, model_state, layer_state, optimization_state):
+        record['persist_start'] = time.time()
+        self.persist_checkpoint(checkpoint_id, model_state, layer_state, optimization_state)
+        record['persist_end'] = time.time()
+
+    def wait_pending_checkpoints(self, limit):
+        """
+        Waits until at most limit checkpoints are being persisted, raising the errors of the
+        background threads.
+        """
+        while len(self.pending_checkpoints) > limit or (len(self.pending_checkpoints) > 0 and self.pending_checkpoints[0].done()):
+            self.pending_checkpoints.pop(0).result()
+
+    def wait_checkpoints(self):
+        """
+        Waits for the checkpoints being persisted and returns the asynchronous checkpoints of the
+        rank, with the time training was blocked saving them, the time of the copy, the time to
+        persist them and the part of it not spent with training blocked.
+        """
+        if not self.checkpoint_async:
+            return []
+        start_time = time.time()
+        self.wait_pending_checkpoints(0)
+        self.blocked_intervals.append((start_time, time.time()))
+        for record in self.async_checkpoints:
+            record['persist'] = record['persist_end'] - record['persist_start']
+            blocked = sum(max(0.0, min(end, record['persist_end']) - max(start, record['persist_start']))
+                          for start, end in self.blocked_intervals)
+            record['overlap'] = record['persist'] - blocked
+        return self.async_checkpoints
+
+    def persist_checkpoint(self, checkpoint_id, model_state, layer_state, optimization_state):
+        my_rank = DLIOMPI.get_instance().rank()
+        start_layer, end_layer = self.get_layer_index()
+        if model_state:
+            self.save_file(suffix=f"{checkpoint_id}/model_states-{my_rank}", state=model_state)
+
+        if layer_state:
+            start_time = time.time()
+            if self.args.zero_stage < 3 and self.args.zero_stage > 0:
+                # if pp is turned on, we assume that the model is sharded across the pipeline stages
+                if self.data_parallelism_rank == 0 and self.args.num_layers > 0:
+                    # in this case, model is saved layer by layer
+                    if self.args.pipeline_parallelism > 1:
+                        for layer_index in range(start_layer, end_layer + 1):
+                            self.save_file(suffix=f"{checkpoint_id}/layer_{layer_index}-model_{self.model_parallelism_rank}_model_states", state=layer_state[str(layer_index)])
+                    else:
+                        self.save_file(suffix=f"{checkpoint_id}/model_{self.model_parallelism_rank}_model_states", state=layer_state)
+            else:
+                # in this case, model is sharded across the data parallel ranks
+                self.save_file(suffix=f"{checkpoint_id}/zero_pp_rank_{self.data_parallelism_rank}_mp_rank_{self.model_parallelism_rank}_model_states", state=layer_state)
+            save_model_time = time.time() - start_time
+            if my_rank == 0:
+                self.logger.output(f"{utcnow()} Saved model checkpoint in {save_model_time:.4f} seconds")
+
+        if optimization_state:
+            start_time = time.time()
+            self.save_file(suffix=f"{checkpoint_id}/zero_pp_rank_{self.data_parallelism_rank}_mp_rank_{self.model_parallelism_rank}_optim_states", state=optimization_state)
+            save_optimizer_time = time.time() - start_time
+            if my_rank == 0:
+                self.logger.output(f"{utcnow()} Saved optimizer checkpoint in {save_optimizer_time:.4f} seconds")
+
+    def checkpoint_files(self, checkpoint_id, rank):
+        """
+        The files rank saves for a checkpoint, as (suffix, state) pairs, the state being the one of
+        this rank for the file if it has it.
+        """
+        states = {'model': getattr(self, 'model_state', None), 'layers': getattr(self, 'layer_state', None),
+                  'optimizer': getattr(self, 'optimization_state', None)}
+        files = []
+        for suffix, state, layer_index in self.checkpoint_shards(checkpoint_id, rank):
+            state = states[state]
+            if layer_index is not None:
+                state = (state or {}).get(str(layer_index))
+            files.append((suffix, state))
+        return files
+
+    def load_files(self, files):
+        """
+        Loads the (suffix, state) files of a checkpoint with checkpoint.reader_threads threads,
+        after asking the kernel to read them ahead with checkpoint.readahead, and returns the bytes
+        and time of every file.
+        """
+        if self.args.checkpoint_readahead:
+            readahead_files([path for suffix, _ in files for path in self.get_paths(suffix)])
+        threads = min(self.args.checkpoint_reader_threads, len(files))
+        if threads <= 1:
+            return [self.load_file(suffix, state) for suffix, state in files]
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            return list(executor.map(lambda file: self.load_file(*file), files))
 
     @abstractmethod
     def load_checkpoint(self, epoch, step_number):
@@ -425,40 +531,24 @@ class BaseCheckpointing(ABC):
             if DLIOMPI.get_instance().size() // DLIOMPI.get_instance().npernode() < 2:
                 if self.comm.rank == 0:
                     self.logger.warning(f"This run is on single client; checkpoint_recovery_rank_shift does not apply.")
-        start_layer, end_layer = self.get_layer_index()
         # create a specifc folder for each step
         checkpoint_id = f"global_epoch{epoch}_step{step_number}"
         self.checkpoint_storage.create_node(checkpoint_id, exist_ok=True)
-        if self.rank_to_checkpoint == my_rank:
-            if self.model_state:
-                self.load_state(suffix=f"{checkpoint_id}/model_states-{my_rank}", state=self.model_state, fsync = self.args.checkpoint_fsync)
-            
-            if self.layer_state:
-                start_time = time.time()
-                if self.args.zero_stage < 3 and self.args.zero_stage > 0:
-                    # if pp is turned on, we assume that the model is sharded across the pipeline stages
-                    if self.data_parallelism_rank == 0 and self.args.num_layers > 0:
-                        # in this case, model is saved layer by layer
-                        if self.args.pipeline_parallelism > 1:
-                            for layer_index in range(start_layer, end_layer + 1):
-                                self.load_state(suffix=f"{checkpoint_id}/layer_{layer_index}-model_{self.model_parallelism_rank}_model_states", state=self.layer_state[str(layer_index)])
-                        else:
-                            self.load_state(suffix=f"{checkpoint_id}/model_{self.model_parallelism_rank}_model_states", state=self.layer_state, fsync = self.args.checkpoint_fsync)
-                else:
-                    # in this case, model is sharded across the data parallel ranks
-                    assert(self.args.pipeline_parallelism == 1)
-                    self.load_state(suffix=f"{checkpoint_id}/zero_pp_rank_{self.data_parallelism_rank}_mp_rank_{self.model_parallelism_rank}_model_states", state=self.layer_state)
-                load_model_time = time.time() - start_time
-                if my_rank == 0:
-                    self.logger.output(f"{utcnow()} Loaded model checkpoint in {load_model_time:.4f} seconds")
-                
-            if self.optimization_state:
-                start_time = time.time()
-                self.load_state(suffix=f"{checkpoint_id}/zero_pp_rank_{self.data_parallelism_rank}_mp_rank_{self.model_parallelism_rank}_optim_states", state=self.optimization_state)   
-                load_optimizer_time = time.time() - start_time
-                if my_rank == 0:
-                    self.logger.output(f"{utcnow()} Loaded optimizer checkpoint in {load_optimizer_time:.4f} seconds")
+        # with the rank shift, the rank loads the files the shifted rank saved
+        if not self.checkpoint_rank(my_rank):
+            return
+        start_time = time.time()
+        files = self.load_files(self.checkpoint_files(checkpoint_id, my_rank))
+        seconds = time.time() - start_time
+        nbytes = sum(file['bytes'] for file in files)
+        self.checkpoint_loads.append({'checkpoint': checkpoint_id, 'rank': my_rank, 'bytes': nbytes, 'seconds': seconds, 'files': files})
+        if self.comm.rank == 0:
+            self.logger.output(f"{utcnow()} Loaded {len(files)} checkpoint files ({nbytes/1024./1024./1024.:.4f} GB) "
+                               f"in {seconds:.4f} seconds: {nbytes/1024./1024./1024./max(seconds, 1e-9):.4f} GB/s")
 
     @abstractmethod
     def finalize(self):
-        pass
+        if self.async_executor is not None:
+            self.wait_pending_checkpoints(0)
+            self.async_executor.shutdown()
+            self.async_executor = None
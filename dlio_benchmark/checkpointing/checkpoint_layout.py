@@ -0,0 +1,214 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+
+def get_datatype_size(datatype):
+    if datatype == "int8" or datatype == "uint8":
+        return 1
+    elif datatype == "fp16" or datatype == "bf16":
+        return 2
+    elif datatype == "fp32":
+        return 4
+    elif datatype == "fp64":
+        return 8
+    else:
+        raise Exception("Unsupported datatype {datatype}")
+
+
+class CheckpointLayout(object):
+    """
+    How the checkpoints of a model are sharded over the ranks: the files every rank saves and the
+    tensors in them, computed from the configuration alone, without allocating them.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        # define parallelism
+        self.model_parallelism = self.args.pipeline_parallelism*self.args.tensor_parallelism
+        if self.args.data_parallelism < 0:
+            self.data_parallelism = self.args.comm_size//self.model_parallelism
+        else:
+            self.data_parallelism = self.args.data_parallelism
+        self.pipeline_parallism_rank = (self.args.my_rank // self.args.tensor_parallelism) % self.args.pipeline_parallelism
+        self.tensor_parallism_rank = self.args.my_rank % self.args.tensor_parallelism
+        self.data_parallelism_rank = self.args.my_rank // self.model_parallelism
+        self.model_parallelism_rank = self.args.my_rank%self.model_parallelism
+        self.optimization_groups_predefined = len(self.args.optimization_groups) > 0
+        self.layer_parameters_predefined = len(self.args.layer_parameters) > 0
+
+    def get_num_parameters(self):
+        if self.args.num_layers <= 0:
+            return 0
+        head_size = self.args.hidden_size//self.args.num_attention_heads
+        # column dimension of K & V matrix
+        dim_kv = head_size * self.args.num_kv_heads        
+        embedding = self.args.vocab_size*self.args.hidden_size
+        input_norm = self.args.hidden_size
+        # number of elements in Q, K, V attention matrices
+        qkv = self.args.hidden_size * (self.args.hidden_size + 2*dim_kv)
+        dense = self.args.hidden_size*self.args.hidden_size
+        layer_norm = self.args.hidden_size
+        # number of parameters from the two MLP layers: h_to_4h and 4h_to_h
+        mlp_h_to_4h = self.args.ffn_hidden_size*2*self.args.hidden_size # the factor of 2 is because of gated linear unit                                                                           
+        mlp_4h_to_h = self.args.ffn_hidden_size*self.args.hidden_size
+        weight = self.args.hidden_size
+        # number of parameters from the lm_head layer
+        lm_head = embedding
+        return embedding  + (input_norm + qkv + dense + layer_norm + mlp_h_to_4h + mlp_4h_to_h)*self.args.num_layers + weight + lm_head
+
+    def get_layer_parameters(self, layer_index):
+        head_size = self.args.hidden_size//self.args.num_attention_heads
+        # column dimension of K and V matrix
+        dim_kv = head_size * self.args.num_kv_heads
+        if len(self.args.layer_parameters) > 0:
+            self.layer_parameters_predefined = True
+            return self.args.layer_parameters
+        else:
+            if self.args.num_layers <= 0:
+                return []
+            if self.args.zero_stage < 3:
+                sharding_factor = 1
+            else:
+                sharding_factor = self.data_parallelism
+            if layer_index == 0 or layer_index == self.args.num_layers + 1:
+                return [self.args.hidden_size * self.args.vocab_size // self.args.tensor_parallelism // sharding_factor] # embedding or lm_head
+            elif layer_index == self.args.num_layers + 2:
+                return [self.args.hidden_size //sharding_factor]
+            else:
+                return [ self.args.hidden_size // sharding_factor, # input_norm, 
+                        self.args.hidden_size*(self.args.hidden_size+2*dim_kv)//self.args.tensor_parallelism//sharding_factor, # self_attn - this is the 
+                        self.args.hidden_size*self.args.hidden_size//self.args.tensor_parallelism//sharding_factor, # dense - this is the o matrix
+                        self.args.hidden_size//sharding_factor, # layer_norm
+                        self.args.hidden_size*2*self.args.ffn_hidden_size//self.args.tensor_parallelism//sharding_factor, # ffn_h_to_4h, 2 is from gated linear unit
+                        self.args.hidden_size*self.args.ffn_hidden_size//self.args.tensor_parallelism//sharding_factor, # ffn_4h_to_h
+                ]
+    def get_optimization_groups(self):
+        if len(self.args.optimization_groups) > 0:
+            self.optimization_groups_predefined = True
+            return self.args.optimization_groups
+        else:
+            if self.args.num_layers <= 0:
+                return []
+            if self.args.zero_stage > 0:
+                # zero stage 1, 2, 3
+                num_parameters = self.get_num_parameters() // (self.data_parallelism * self.model_parallelism)
+            else:
+                # if zero is not used. Only the first data parallel instance will save the optimizer states
+                num_parameters= self.get_num_parameters() // self.model_parallelism
+            if num_parameters> 0:
+                return [num_parameters, self.args.hidden_size*5, 
+                        num_parameters, self.args.hidden_size*5, 
+                        num_parameters, self.args.hidden_size*5]   
+            else:
+                return []                                                                                                           
+
+    def get_layer_index(self, pipeline_rank=None):
+        '''
+        The layers indcies are [0, 1, ..., l, l+1, l+2], where l is the total number of transformer layers.                                               
+        Layer 0, and layer l+1, l+2 are embedding, lm_head, and weight layers, respectively, they are not part of the transformer layers.                 
+        The transformer layers are from 1 to l. We only distribute the transformer layers among the ranks.                                                
+        We assume layer 0 is always on rank 0, and l+1 and l+2 are on the last rank.                                                                      
+        '''
+        if pipeline_rank is None:
+            pipeline_rank = self.pipeline_parallism_rank
+        num_layers_per_pipeline_group = self.args.num_layers//self.args.pipeline_parallelism
+        remainder = self.args.num_layers%self.args.pipeline_parallelism
+        if pipeline_rank < remainder:
+            start_layer = pipeline_rank * (num_layers_per_pipeline_group + 1) + 1
+            end_layer = start_layer + num_layers_per_pipeline_group
+        else:
+            start_layer = remainder * (num_layers_per_pipeline_group + 1) + (pipeline_rank - remainder) * num_layers_per_pipeline_group + 1
+            end_layer = start_layer + num_layers_per_pipeline_group - 1
+        if not self.layer_parameters_predefined: 
+            # will turn this on for all the cases in future
+            if pipeline_rank == self.args.pipeline_parallelism - 1:
+                end_layer = self.args.num_layers + 2
+            if pipeline_rank == 0:
+                start_layer = 0
+        return start_layer, end_layer
+
+    def checkpoint_rank(self, rank):
+        """
+        Whether rank saves checkpoints: without ZeRO, only the first model parallel group does.
+        """
+        return self.args.zero_stage != 0 or rank < self.model_parallelism
+
+
+    def checkpoint_shards(self, checkpoint_id, rank):
+        """
+        The files rank saves for a checkpoint, as (suffix, state, layer_index) triples, state being
+        model, layers or optimizer, and layer_index the layer of the layer state in the file when the
+        model is saved layer by layer.
+        """
+        data_parallelism_rank = rank // self.model_parallelism
+        model_parallelism_rank = rank % self.model_parallelism
+        pipeline_rank = (rank // self.args.tensor_parallelism) % self.args.pipeline_parallelism
+        start_layer, end_layer = self.get_layer_index(pipeline_rank)
+        shards = []
+        if self.args.model_size > 0 and self.args.model_type != "transformer":
+            shards.append((f"{checkpoint_id}/model_states-{rank}", "model", None))
+        if (self.layer_parameters_predefined and start_layer <= end_layer) or self.args.num_layers > 0:
+            if self.args.zero_stage < 3 and self.args.zero_stage > 0:
+                # if pp is turned on, the model is saved layer by layer
+                if data_parallelism_rank == 0 and self.args.num_layers > 0:
+                    if self.args.pipeline_parallelism > 1:
+                        for layer_index in range(start_layer, end_layer + 1):
+                            shards.append((f"{checkpoint_id}/layer_{layer_index}-model_{model_parallelism_rank}_model_states", "layers", layer_index))
+                    else:
+                        shards.append((f"{checkpoint_id}/model_{model_parallelism_rank}_model_states", "layers", None))
+            else:
+                # in this case, model is sharded across the data parallel ranks
+                shards.append((f"{checkpoint_id}/zero_pp_rank_{data_parallelism_rank}_mp_rank_{model_parallelism_rank}_model_states", "layers", None))
+        optimization_groups = self.get_optimization_groups()
+        if len(optimization_groups) > 0 and (self.optimization_groups_predefined or max(optimization_groups) > 0):
+            shards.append((f"{checkpoint_id}/zero_pp_rank_{data_parallelism_rank}_mp_rank_{model_parallelism_rank}_optim_states", "optimizer", None))
+        return shards
+
+    def layer_tensors(self, layer_index):
+        """
+        The tensors of a layer, as (name, length, datatype) triples.
+        """
+        if self.layer_parameters_predefined:
+            return [(str(index), length // self.args.tensor_parallelism, "int8")
+                    for index, length in enumerate(self.args.layer_parameters) if length > 0]
+        return [(str(index), length, self.args.model_datatype)
+                for index, length in enumerate(self.get_layer_parameters(layer_index)) if length > 0]
+
+    def shard_tensors(self, state, rank, layer_index=None):
+        """
+        The tensors of a state of rank, or of one layer of its layer state, as (name, length,
+        datatype) triples named as the keys of the flattened state.
+        """
+        if state == "model":
+            return [("a", self.args.model_size, "int8")]
+        if state == "optimizer":
+            optimization_groups = self.get_optimization_groups()
+            if not self.optimization_groups_predefined:
+                return [(str(index), length, self.args.optimizer_datatype)
+                        for index, length in enumerate(optimization_groups) if length > 0]
+            tensors = []
+            for index, length in enumerate(optimization_groups):
+                if length > 0:
+                    tensors += [(f"{index}/a", length, "int8"), (f"{index}/b", length, "int8")]
+            tensors.append(("combined", sum(length for length in optimization_groups if length > 0), "int8"))
+            return tensors
+        if layer_index is not None:
+            return self.layer_tensors(layer_index)
+        pipeline_rank = (rank // self.args.tensor_parallelism) % self.args.pipeline_parallelism
+        start_layer, end_layer = self.get_layer_index(pipeline_rank)
+        return [(f"{index}/{name}", length, datatype) for index in range(start_layer, end_layer + 1)
+                for name, length, datatype in self.layer_tensors(index)]
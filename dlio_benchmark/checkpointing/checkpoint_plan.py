@@ -0,0 +1,168 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+from omegaconf import OmegaConf
+
+from dlio_benchmark.checkpointing.checkpoint_layout import CheckpointLayout, get_datatype_size
+from dlio_benchmark.common.enumerations import CheckpointMechanismType, CheckpointModeType, FrameworkType
+from dlio_benchmark.utils.config import ConfigArguments, LoadConfig
+
+GB = 1024. * 1024. * 1024.
+CHECKPOINT_EXTENSIONS = {CheckpointMechanismType.TF_SAVE: "pb", CheckpointMechanismType.PT_SAVE: "pt",
+                         CheckpointMechanismType.RAW_WRITE: "raw"}
+
+
+def load_workload(workload):
+    """
+    Loads the workload configuration of a YAML file, or of the workload of that name of the
+    benchmark.
+    """
+    path = workload
+    if not os.path.isfile(path):
+        path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "configs", "workload", f"{workload}.yaml")
+    if not os.path.isfile(path):
+        raise Exception(f"No workload configuration {workload}")
+    return OmegaConf.load(path)
+
+
+def plan_arguments(config, ranks):
+    """
+    The configuration of a workload run on ranks processes, outside of the singleton of the
+    benchmark and without MPI.
+    """
+    args = ConfigArguments.__new__(ConfigArguments)
+    args.comm_size = ranks
+    args.my_rank = 0
+    LoadConfig(args, config)
+    if args.checkpoint_mode == CheckpointModeType.DEFAULT and ranks % (args.pipeline_parallelism * args.tensor_parallelism) != 0:
+        raise Exception(f"Number of processes {ranks} is not a multiple of model parallelism size: {args.pipeline_parallelism * args.tensor_parallelism}")
+    return args
+
+
+def plan_checkpoint(config, ranks, checkpoint_id="global_epoch1_step1"):
+    """
+    The files every rank saves for a checkpoint of a workload run on ranks processes, with the
+    tensors in each and their bytes, as sized by the checkpointing of the benchmark.
+    """
+    args = plan_arguments(config, ranks)
+    layout = CheckpointLayout(args)
+    mechanism = args.checkpoint_mechanism
+    if mechanism == CheckpointMechanismType.NONE:
+        mechanism = CheckpointMechanismType.TF_SAVE if args.framework == FrameworkType.TENSORFLOW else CheckpointMechanismType.PT_SAVE
+    ext = CHECKPOINT_EXTENSIONS.get(mechanism)
+    rank_plans = []
+    for rank in range(ranks):
+        if not layout.checkpoint_rank(rank):
+            continue
+        files = []
+        for suffix, state, layer_index in layout.checkpoint_shards(checkpoint_id, rank):
+            tensors = [{'name': name, 'length': length, 'datatype': datatype, 'bytes': length * get_datatype_size(datatype)}
+                       for name, length, datatype in layout.shard_tensors(state, rank, layer_index)]
+            files.append({'file': f"{suffix}.{ext}" if ext else suffix, 'bytes': sum(tensor['bytes'] for tensor in tensors),
+                          'tensors': tensors})
+        rank_plans.append({'rank': rank, 'bytes': sum(file['bytes'] for file in files), 'files': files})
+    return {'model': args.model, 'ranks': ranks, 'mechanism': str(mechanism), 'checkpoint_folder': args.checkpoint_folder,
+            'zero_stage': args.zero_stage, 'tensor_parallelism': args.tensor_parallelism,
+            'pipeline_parallelism': args.pipeline_parallelism, 'data_parallelism': layout.data_parallelism,
+            'num_parameters': layout.get_num_parameters(),
+            'checkpointing_ranks': len(rank_plans),
+            'files': sum(len(rank_plan['files']) for rank_plan in rank_plans),
+            'bytes': sum(rank_plan['bytes'] for rank_plan in rank_plans),
+            'max_rank_bytes': max([rank_plan['bytes'] for rank_plan in rank_plans], default=0),
+            'rank_plans': rank_plans}
+
+
+def predict_time(plan, bandwidth, rank_bandwidth=None):
+    """
+    Predicts the seconds to write or read a checkpoint of plan with an aggregate storage bandwidth,
+    and optionally a bandwidth per rank, in GB/s: the slower of the storage and of the rank with
+    the most bytes.
+    """
+    seconds = plan['bytes'] / GB / bandwidth
+    if rank_bandwidth is not None:
+        seconds = max(seconds, plan['max_rank_bytes'] / GB / rank_bandwidth)
+    return seconds
+
+
+def main():
+    """
+    Plans the checkpoints of a workload for a number of ranks, without allocating the tensors or
+    starting MPI.
+    """
+    parser = argparse.ArgumentParser(description='DLIO checkpoint planner')
+    parser.add_argument("workload", type=str,
+                        help="Workload YAML file, or name of a workload of the benchmark (e.g. llama_405b).")
+    parser.add_argument("-n", "--ranks", required=True, type=int,
+                        help="Number of ranks (accelerators) of the run.")
+    parser.add_argument("-z", "--zero-stage", default=None, type=int,
+                        help="ZeRO stage, overriding the one of the workload.")
+    parser.add_argument("-t", "--tensor-parallelism", default=None, type=int,
+                        help="Tensor parallelism, overriding the one of the workload.")
+    parser.add_argument("-p", "--pipeline-parallelism", default=None, type=int,
+                        help="Pipeline parallelism, overriding the one of the workload.")
+    parser.add_argument("-d", "--data-parallelism", default=None, type=int,
+                        help="Data parallelism of a subset checkpoint, overriding the one of the workload.")
+    parser.add_argument("-b", "--bandwidth", default=None, type=float,
+                        help="Aggregate storage bandwidth in GB/s to predict the checkpoint time with.")
+    parser.add_argument("-r", "--rank-bandwidth", default=None, type=float,
+                        help="Bandwidth of a rank in GB/s to predict the checkpoint time with.")
+    parser.add_argument("-o", "--output", default=None, type=str,
+                        help="CSV (one row per file) or JSON file to save the plan to, by extension.")
+    args = parser.parse_args()
+
+    config = load_workload(args.workload)
+    overrides = {"model.parallelism.zero_stage": args.zero_stage, "model.parallelism.tensor": args.tensor_parallelism,
+                 "model.parallelism.pipeline": args.pipeline_parallelism, "model.parallelism.data": args.data_parallelism}
+    for key, value in overrides.items():
+        if value is not None:
+            OmegaConf.update(config, key, value, force_add=True)
+    if args.data_parallelism is not None:
+        OmegaConf.update(config, "checkpoint.mode", str(CheckpointModeType.SUBSET), force_add=True)
+    plan = plan_checkpoint(config, args.ranks)
+    if args.bandwidth is not None:
+        plan['bandwidth_GB_per_second'] = args.bandwidth
+        plan['rank_bandwidth_GB_per_second'] = args.rank_bandwidth
+        plan['predicted_seconds'] = predict_time(plan, args.bandwidth, args.rank_bandwidth)
+
+    print(f"Model: {plan['model']}, {plan['num_parameters']} parameters")
+    print(f"Layout: {plan['ranks']} ranks, ZeRO stage {plan['zero_stage']}, TP {plan['tensor_parallelism']}, "
+          f"PP {plan['pipeline_parallelism']}, DP {plan['data_parallelism']}")
+    print(f"Checkpoint: {plan['files']} {plan['mechanism']} files from {plan['checkpointing_ranks']} ranks, "
+          f"{plan['bytes'] / GB:.4f} GB, at most {plan['max_rank_bytes'] / GB:.4f} GB per rank")
+    if 'predicted_seconds' in plan:
+        print(f"Predicted time at {args.bandwidth} GB/s: {plan['predicted_seconds']:.4f} seconds")
+    if args.output is not None:
+        with open(args.output, 'w') as outfile:
+            if args.output.endswith('.json'):
+                json.dump(plan, outfile, indent=4)
+            else:
+                writer = csv.DictWriter(outfile, fieldnames=['rank', 'file', 'tensors', 'bytes'])
+                writer.writeheader()
+                for rank_plan in plan['rank_plans']:
+                    for file in rank_plan['files']:
+                        writer.writerow({'rank': rank_plan['rank'], 'file': file['file'],
+                                         'tensors': len(file['tensors']), 'bytes': file['bytes']})
+
+
+if __name__ == '__main__':
+    main()
+    sys.exit(0)
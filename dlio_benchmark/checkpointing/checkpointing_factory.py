@@ -40,5 +40,8 @@ class CheckpointingFactory(object):
         elif checkpoint_mechanism_type == CheckpointMechanismType.PT_SAVE:
             from dlio_benchmark.checkpointing.pytorch_checkpointing import PyTorchCheckpointing
             return PyTorchCheckpointing.get_instance()
+        elif checkpoint_mechanism_type == CheckpointMechanismType.RAW_WRITE:
+            from dlio_benchmark.checkpointing.raw_checkpointing import RawCheckpointing
+            return RawCheckpointing.get_instance()
         else:
             raise Exception(str(ErrorCodes.EC1005))
\ No newline at end of file
@@ -75,6 +75,9 @@ class PyTorchCheckpointing(BaseCheckpointing):
         else:
             return torch.ones(length, dtype=torch_dtype)
 
+    def get_tensor_view(self, array, datatype="int8"):
+        return torch.from_numpy(array).view(get_torch_datatype(datatype))
+
     @dlp.log
     def set_madvise_mergeable(self, tensor):
         """
@@ -104,29 +107,10 @@ class PyTorchCheckpointing(BaseCheckpointing):
         except Exception:
             return False
 
-        page_size = self.madvise_page_size
-        start_addr = ptr_addr
-        end_addr = ptr_addr + size_bytes
-
-        aligned_start_addr = (start_addr + page_size - 1) // page_size * page_size
-        aligned_end_addr = end_addr // page_size * page_size
-        aligned_size = aligned_end_addr - aligned_start_addr
-
-        if aligned_size <= 0:
-            return False
-
-        try:
-            c_ptr = ctypes.c_void_p(aligned_start_addr)
-            c_size = ctypes.c_size_t(aligned_size)
-            ret = self.madvise_func(c_ptr, c_size, self.madvise_mergeable)
-
-            if ret == 0:
-                return True
-            else:
-                return False
+        return self.madvise_region(ptr_addr, size_bytes)
 
-        except Exception:
-            return False
+    def copy_tensor(self, tensor):
+        return tensor.clone()
 
     @dlp.log
     def save_state(self, suffix, state, fsync = False):
@@ -140,7 +124,11 @@ class PyTorchCheckpointing(BaseCheckpointing):
     def load_state(self, suffix, state):
         name = self.get_name(suffix)
         state = dict() # clear up
-        state = torch.load(name)
+        if self.args.checkpoint_load_mmap:
+            # the tensors map the file, copying them reads it
+            state = self.stage_state(torch.load(name, mmap=True))
+        else:
+            state = torch.load(name)
         self.logger.debug(f"checkpoint state loaded: {state}")
         assert(len(state.keys())>0)
 
@@ -0,0 +1,312 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import argparse
+import csv
+import errno
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from dlio_benchmark.utils.utility import str2bool
+
+# A raw checkpoint file is the magic, the length of the JSON index of the tensors, the index, padding
+# up to ALIGNMENT and the bytes of the tensors back to back, at the offsets of the index
+MAGIC = b'DLIORAW1'
+ALIGNMENT = 4096
+MiB = 1024 * 1024
+
+
+def align(value, alignment=ALIGNMENT):
+    return (value + alignment - 1) // alignment * alignment
+
+
+def flatten_state(state, prefix=''):
+    """
+    Returns the tensors of a nested state dict as (name, array) pairs, the names joining the keys
+    with '/'.
+    """
+    tensors = []
+    for key, value in state.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            tensors += flatten_state(value, f"{name}/")
+        else:
+            tensors.append((name, np.ascontiguousarray(value)))
+    return tensors
+
+
+def raw_header(tensors):
+    """
+    Returns the header of the raw checkpoint file of tensors, padded to ALIGNMENT, and the size of
+    the file.
+    """
+    index = {}
+    offset = 0
+    for name, array in tensors:
+        index[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset, 'nbytes': int(array.nbytes)}
+        offset += int(array.nbytes)
+    encoded = json.dumps(index).encode()
+    header = bytearray(align(len(MAGIC) + 8 + len(encoded)))
+    header[:len(MAGIC) + 8] = MAGIC + struct.pack('<Q', len(encoded))
+    header[len(MAGIC) + 8:len(MAGIC) + 8 + len(encoded)] = encoded
+    return header, len(header) + offset
+
+
+def split_chunks(views, write_size):
+    """
+    Splits the bytes of views, laid out back to back, into chunks of write_size bytes, each a list
+    of slices of the views; chunk i starts at offset i * write_size.
+    """
+    chunks = []
+    current, filled = [], 0
+    for view in views:
+        position = 0
+        while position < len(view):
+            length = min(write_size - filled, len(view) - position)
+            current.append(view[position:position + length])
+            position += length
+            filled += length
+            if filled == write_size:
+                chunks.append(current)
+                current, filled = [], 0
+    if len(current) > 0:
+        chunks.append(current)
+    return chunks
+
+
+def pwrite_all(fd, view, offset):
+    while len(view) > 0:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+def write_chunks(fd, chunks, first, step, write_size, odirect):
+    """
+    Writes every step-th chunk from first, each with one write of write_size bytes: chunks made of
+    one slice are written from the tensor itself, the others are gathered in an aligned buffer, as
+    are all of them with O_DIRECT, whose last write is padded to ALIGNMENT.
+    """
+    buffer = mmap.mmap(-1, write_size)
+    try:
+        for i in range(first, len(chunks), step):
+            if len(chunks[i]) == 1 and not odirect:
+                pwrite_all(fd, chunks[i][0], i * write_size)
+                continue
+            length = 0
+            for view in chunks[i]:
+                buffer[length:length + len(view)] = view
+                length += len(view)
+            with memoryview(buffer) as view:
+                pwrite_all(fd, view[:align(length) if odirect else length], i * write_size)
+    finally:
+        buffer.close()
+
+
+def open_for_write(name, odirect):
+    """
+    Opens name for writing, with O_DIRECT if asked for and supported by the file system. Returns the
+    descriptor and whether O_DIRECT is used.
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    if odirect and hasattr(os, 'O_DIRECT'):
+        try:
+            return os.open(name, flags | os.O_DIRECT, 0o644), True
+        except OSError as e:
+            if e.errno != errno.EINVAL:
+                raise
+    return os.open(name, flags, 0o644), False
+
+
+def write_raw_file(name, tensors, write_size=4 * MiB, odirect=False, threads=1, fsync=False):
+    """
+    Streams tensors, (name, array) pairs, to the raw checkpoint file name with writes of write_size
+    bytes, optionally with O_DIRECT and from several threads writing interleaved chunks. Returns
+    the bytes written, the seconds it took and whether O_DIRECT was used.
+    """
+    if odirect and write_size % ALIGNMENT != 0:
+        raise Exception(f"The write size {write_size} should be a multiple of {ALIGNMENT} for O_DIRECT")
+    start_time = time.time()
+    header, size = raw_header(tensors)
+    views = [memoryview(header)] + [memoryview(array.reshape(-1).view(np.uint8)) for _, array in tensors]
+    chunks = split_chunks(views, write_size)
+    fd, odirect = open_for_write(name, odirect)
+    try:
+        threads = max(min(threads, len(chunks)), 1)
+        if threads == 1:
+            write_chunks(fd, chunks, 0, 1, write_size, odirect)
+        else:
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                for future in [executor.submit(write_chunks, fd, chunks, first, threads, write_size, odirect)
+                               for first in range(threads)]:
+                    future.result()
+        if odirect:
+            # drop the padding of the last write
+            os.ftruncate(fd, size)
+        if fsync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+    return {'bytes': size, 'seconds': time.time() - start_time, 'odirect': odirect}
+
+
+def read_raw_index(f):
+    """
+    Reads the index of a raw checkpoint file opened in f and returns it with the offset of the data.
+    """
+    prefix = f.read(len(MAGIC) + 8)
+    if prefix[:len(MAGIC)] != MAGIC:
+        raise Exception(f"{f.name} is not a raw checkpoint file")
+    length = struct.unpack('<Q', prefix[len(MAGIC):])[0]
+    index = json.loads(f.read(length))
+    return index, align(len(MAGIC) + 8 + length)
+
+
+def read_raw_file(name, read_size=4 * MiB, use_mmap=False):
+    """
+    Reads the raw checkpoint file name with reads of read_size bytes, or by copying it from a memory
+    map, and returns its tensors by name.
+    """
+    with open(name, 'rb', buffering=0) as f:
+        index, data_offset = read_raw_index(f)
+        nbytes = sum(entry['nbytes'] for entry in index.values())
+        data = np.empty(nbytes, dtype=np.uint8)
+        if use_mmap:
+            if nbytes > 0:
+                # the copy faults the pages of the map in
+                data[:] = np.memmap(f, dtype=np.uint8, mode='r', offset=data_offset, shape=(nbytes,))
+        else:
+            f.seek(data_offset)
+            with memoryview(data) as view:
+                position = 0
+                while position < nbytes:
+                    read = f.readinto(view[position:position + read_size])
+                    if read == 0:
+                        raise Exception(f"{name} is truncated: {position} of {nbytes} bytes")
+                    position += read
+    return {key: data[entry['offset']:entry['offset'] + entry['nbytes']].view(np.dtype(entry['dtype'])).reshape(entry['shape'])
+            for key, entry in index.items()}
+
+
+def readahead_files(paths):
+    """
+    Asks the kernel to start reading the files in paths into the page cache, where supported.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def file_crc32(paths, read_size=4 * MiB):
+    """
+    Returns the CRC32 of the bytes of the files in paths, one after the other, read with reads of
+    read_size bytes.
+    """
+    crc = 0
+    buffer = bytearray(read_size)
+    with memoryview(buffer) as view:
+        for path in paths:
+            with open(path, 'rb', buffering=0) as f:
+                while True:
+                    read = f.readinto(view)
+                    if read == 0:
+                        break
+                    crc = zlib.crc32(view[:read], crc)
+    return crc
+
+
+def sweep(folder, size, write_sizes, threads, odirect=False, fsync=True, repeat=1, num_tensors=8):
+    """
+    Writes a raw checkpoint file of size random bytes split into num_tensors tensors with every
+    write size and number of writer threads, repeat times, and returns the bandwidth of each write.
+    """
+    data = np.random.default_rng().integers(0, 256, size=size, dtype=np.uint8)
+    tensors = [(str(i), array) for i, array in enumerate(np.array_split(data, num_tensors))]
+    os.makedirs(folder, exist_ok=True)
+    results = []
+    for write_size in write_sizes:
+        for num_threads in threads:
+            for iteration in range(repeat):
+                name = os.path.join(folder, f"sweep_{write_size}_{num_threads}_{iteration}.raw")
+                stats = write_raw_file(name, tensors, write_size, odirect, num_threads, fsync)
+                os.remove(name)
+                results.append({'write_size': write_size, 'threads': num_threads, 'iteration': iteration,
+                                'odirect': stats['odirect'], 'bytes': stats['bytes'], 'seconds': stats['seconds'],
+                                'GB_per_second': stats['bytes'] / stats['seconds'] / 1024. / 1024. / 1024.})
+                logging.info(f"write size {write_size}, {num_threads} threads: {results[-1]['GB_per_second']:.4f} GB/s")
+    return results
+
+
+def main():
+    """
+    Sweeps the write size and the number of writer threads of the raw checkpoint writer.
+    """
+    parser = argparse.ArgumentParser(description='DLIO raw checkpoint write sweep')
+    parser.add_argument("-f", "--folder", default="./checkpoints", type=str,
+                        help="Folder to write the checkpoint files to.")
+    parser.add_argument("-s", "--size", default=1024, type=int,
+                        help="Size of the checkpoint file in MiB.")
+    parser.add_argument("-w", "--write-sizes", default="1,4,16,64", type=str,
+                        help="Comma separated write sizes in MiB.")
+    parser.add_argument("-t", "--threads", default="1,2,4,8", type=str,
+                        help="Comma separated numbers of writer threads.")
+    parser.add_argument("-d", "--odirect", default=False, type=str2bool,
+                        help="Write with O_DIRECT.")
+    parser.add_argument("--fsync", default=True, type=str2bool,
+                        help="Fsync the file after writing it.")
+    parser.add_argument("-r", "--repeat", default=1, type=int,
+                        help="Number of writes of every configuration.")
+    parser.add_argument("-o", "--output", default=None, type=str,
+                        help="CSV or JSON file to save the results to, by extension.")
+    args = parser.parse_args()
+    logging.basicConfig(format='%(asctime)s %(message)s', level=logging.INFO)
+
+    write_sizes = [int(float(value) * MiB) for value in args.write_sizes.split(",")]
+    threads = [int(value) for value in args.threads.split(",")]
+    results = sweep(args.folder, args.size * MiB, write_sizes, threads, args.odirect, args.fsync, args.repeat)
+
+    print(f"{'write size (MiB)':>16} {'threads':>8} {'O_DIRECT':>8} {'seconds':>10} {'GB/s':>10}")
+    for result in results:
+        print(f"{result['write_size'] / MiB:>16g} {result['threads']:>8} {str(result['odirect']):>8} "
+              f"{result['seconds']:>10.4f} {result['GB_per_second']:>10.4f}")
+    if args.output is not None:
+        with open(args.output, 'w') as outfile:
+            if args.output.endswith('.json'):
+                json.dump(results, outfile, indent=4)
+            else:
+                writer = csv.DictWriter(outfile, fieldnames=list(results[0].keys()))
+                writer.writeheader()
+                writer.writerows(results)
+
+
+if __name__ == '__main__':
+    main()
+    sys.exit(0)
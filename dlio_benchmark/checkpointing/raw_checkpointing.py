@@ -0,0 +1,111 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import numpy as np
+
+from dlio_benchmark.checkpointing.base_checkpointing import BaseCheckpointing
+from dlio_benchmark.checkpointing.raw_checkpoint_io import flatten_state, read_raw_file, write_raw_file
+from dlio_benchmark.common.constants import MODULE_CHECKPOINT
+from dlio_benchmark.utils.utility import DLIOMPI, Profile, utcnow
+
+
+def get_numpy_datatype(datatype):
+    if datatype == "fp32":
+        return np.dtype(np.float32)
+    elif datatype == "fp16":
+        return np.dtype(np.float16)
+    elif datatype == "fp64":
+        return np.dtype(np.float64)
+    elif datatype == "bf16": # no numpy bfloat16, stored as its bits
+        return np.dtype(np.uint16)
+    elif datatype == "int8":
+        return np.dtype(np.int8)
+    elif datatype == "uint8":
+        return np.dtype(np.uint8)
+    else:
+        raise Exception(f"Invalid datatype {datatype}")
+
+dlp = Profile(MODULE_CHECKPOINT)
+
+
+class RawCheckpointing(BaseCheckpointing):
+    """
+    Framework independent checkpointing: the tensors are numpy arrays whose buffers are streamed to
+    disk with writes of checkpoint.write_size bytes, optionally with O_DIRECT and several writer
+    threads, without any serialization.
+    """
+    __instance = None
+
+    @staticmethod
+    def get_instance():
+        """ Static access method. """
+        if RawCheckpointing.__instance is None:
+            RawCheckpointing.__instance = RawCheckpointing()
+        return RawCheckpointing.__instance
+
+    @dlp.log_init
+    def __init__(self):
+        # the tensors are generated by the base class
+        self.rng = np.random.default_rng(DLIOMPI.get_instance().rank())
+        self.odirect_warned = False
+        super().__init__("raw")
+
+    @dlp.log
+    def get_tensor_core(self, length, datatype="int8", randomize=True):
+        dtype = get_numpy_datatype(datatype)
+        if randomize:
+            return self.rng.integers(0, 256, size=length * dtype.itemsize, dtype=np.uint8).view(dtype)
+        elif datatype == "bf16":
+            return np.full(length, 0x3F80, dtype=dtype)
+        return np.ones(length, dtype=dtype)
+
+    def get_tensor_view(self, array, datatype="int8"):
+        return array.view(get_numpy_datatype(datatype))
+
+    @dlp.log
+    def set_madvise_mergeable(self, tensor):
+        return self.madvise_region(tensor.ctypes.data, tensor.nbytes)
+
+    def copy_tensor(self, tensor):
+        return tensor.copy()
+
+    @dlp.log
+    def save_state(self, suffix, state, fsync = False):
+        name = self.get_name(suffix)
+        stats = write_raw_file(name, flatten_state(state), self.args.checkpoint_write_size, self.args.checkpoint_odirect,
+                               self.args.checkpoint_writer_threads, fsync)
+        if self.args.checkpoint_odirect and not stats['odirect'] and not self.odirect_warned:
+            self.odirect_warned = True
+            self.logger.warning(f"{utcnow()} O_DIRECT is not supported for {name}, writing through the page cache")
+
+    @dlp.log
+    def load_state(self, suffix, state):
+        name = self.get_name(suffix)
+        state = read_raw_file(name, self.args.checkpoint_write_size, self.args.checkpoint_load_mmap)
+        self.logger.debug(f"{utcnow()} Checkpoint state loaded: {list(state.keys())}")
+        assert(len(state.keys())>0)
+
+    @dlp.log
+    def save_checkpoint(self, epoch, step_number):
+        super().save_checkpoint(epoch, step_number)
+
+    @dlp.log
+    def load_checkpoint(self, epoch, step_number):
+        super().load_checkpoint(epoch, step_number)
+
+    @dlp.log
+    def finalize(self):
+        super().finalize()
@@ -73,10 +73,18 @@ class TFCheckpointing(BaseCheckpointing):
                  raise Exception(f"Datatype {tf_dtype} cannot be randomized for random tensor generation.")
         return tf.ones((length), dtype=tf_dtype)
 
+    def get_tensor_view(self, array, datatype="int8"):
+        # tensorflow tensors cannot share the memory of the view, it is copied
+        return tf.constant(array.view(get_tf_datatype(datatype).as_numpy_dtype))
+
     @dlp.log
     def set_madvise_mergeable(self, tensor):
         return False
 
+    def copy_tensor(self, tensor):
+        # tensors are immutable, an identity is a consistent snapshot
+        return tf.identity(tensor)
+
     @dlp.log
     def save_state(self, suffix, state, fsync = False):
         name = self.get_name(suffix)
@@ -88,9 +96,11 @@ class TFCheckpointing(BaseCheckpointing):
     def load_state(self, suffix, state):
         name = self.get_name(suffix)
         state = dict() # clear up
-        state = tf.train.load_checkpoint(name)
-        self.logger.debug(f"{utcnow()} Checkpoint state loaded: {state}")
-        assert(len(state.keys)!=0)
+        # save numbers the checkpoint of a new tf.train.Checkpoint 1
+        reader = tf.train.load_checkpoint(f"{name}-1")
+        state = {key: reader.get_tensor(key) for key in reader.get_variable_to_shape_map()}
+        self.logger.debug(f"{utcnow()} Checkpoint state loaded: {list(state.keys())}")
+        assert(len(state.keys())!=0)
         
     @dlp.log
     def save_checkpoint(self, epoch, step_number):
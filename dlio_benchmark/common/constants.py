@@ -24,4 +24,10 @@ MODULE_DATA_READER = "reader"
 MODULE_DATA_GENERATOR = "generator"
 MODULE_STORAGE = "storage"
 MODULE_CONFIG = "config"
-MODULE_DLIO_BENCHMARK = "dlio_benchmark"
\ No newline at end of file
+MODULE_DLIO_BENCHMARK = "dlio_benchmark"
+
+'''
+Dataset manifest written by the data generator
+'''
+DATASET_MANIFEST = "manifest.json"
+DATASET_MANIFEST_VERSION = 1
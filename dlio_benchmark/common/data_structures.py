@@ -0,0 +1,191 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+
+def attach_shared_memory(name):
+    """
+    Attaches to a shared memory block owned by another process without registering it with the
+    resource tracker of this one, which would otherwise unlink it when this process exits.
+    """
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def index_dtype(max_value):
+    """
+    Smallest signed integer dtype used for the id columns of a SampleIndex.
+    """
+    if max_value < np.iinfo(np.int32).max:
+        return np.int32
+    return np.int64
+
+
+class SampleIndex(object):
+    """
+    Compact index of the samples read by a rank or by one of its reader threads.
+    Rows are kept in read order as NumPy columns: global sample index, file id and
+    sample index within the file. File ids point into a path table shared by all the
+    indices built from the same file list.
+    Indices built with a start offset cover the contiguous range of global samples
+    [start, start + len) and resolve a global sample index to its row in O(1).
+    Once shared, the columns live in a shared memory block and pickling only sends
+    its name, so worker processes attach to it instead of receiving a copy.
+    """
+    # the shared memory block goes last so the column views are released before it is closed
+    __slots__ = ('paths', 'start', 'global_index', 'file_id', 'sample_index', 'row', '_owner', '_shm')
+    COLUMNS = ('global_index', 'file_id', 'sample_index', 'row')
+
+    def __init__(self, paths, global_index, file_id, sample_index, start=None):
+        self.paths = paths
+        self.start = start
+        self.global_index = global_index
+        self.file_id = file_id
+        self.sample_index = sample_index
+        self.row = None
+        self._owner = False
+        self._shm = None
+        if start is not None and len(global_index) > 0:
+            position = global_index - start
+            if not np.array_equal(position, np.arange(len(global_index))):
+                self.row = np.empty(len(global_index), dtype=index_dtype(len(global_index)))
+                self.row[position] = np.arange(len(global_index))
+
+    @staticmethod
+    def empty():
+        return SampleIndex([], np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32),
+                           np.empty(0, dtype=np.int32), start=0)
+
+    def __len__(self):
+        return len(self.global_index)
+
+    def __iter__(self):
+        paths = self.paths
+        for global_index, file_id, sample_index in zip(self.global_index.tolist(), self.file_id.tolist(),
+                                                        self.sample_index.tolist()):
+            yield global_index, paths[file_id], sample_index
+
+    def items(self):
+        for global_index, filename, sample_index in self:
+            yield global_index, (filename, sample_index)
+
+    def __contains__(self, global_sample_index):
+        return self.start is not None and 0 <= global_sample_index - self.start < len(self)
+
+    def __getitem__(self, global_sample_index):
+        if global_sample_index not in self:
+            raise KeyError(global_sample_index)
+        position = global_sample_index - self.start
+        if self.row is not None:
+            position = self.row[position]
+        return self.paths[self.file_id[position]], int(self.sample_index[position])
+
+    def get(self, global_sample_index, default=None):
+        if global_sample_index in self:
+            return self[global_sample_index]
+        return default
+
+    def filenames(self):
+        return [self.paths[file_id] for file_id in np.unique(self.file_id).tolist()]
+
+    def _columns(self):
+        # widest columns first keeps every column aligned inside a shared memory block
+        columns = [(name, getattr(self, name)) for name in self.COLUMNS if getattr(self, name) is not None]
+        return sorted(columns, key=lambda column: -column[1].itemsize)
+
+    def _layout(self):
+        return [(name, column.dtype.str, len(column)) for name, column in self._columns()]
+
+    def _attach(self, shm, layout):
+        offset = 0
+        for name, dtype, length in layout:
+            column = np.ndarray((length,), dtype=dtype, buffer=shm.buf, offset=offset)
+            setattr(self, name, column)
+            offset += column.nbytes
+        self._shm = shm
+
+    def share(self):
+        """
+        Moves the columns to a shared memory block owned by this process.
+        """
+        if self._shm is not None:
+            return
+        columns = self._columns()
+        layout = self._layout()
+        shm = SharedMemory(create=True, size=max(sum(column.nbytes for _, column in columns), 1))
+        offset = 0
+        for _, column in columns:
+            np.ndarray(column.shape, dtype=column.dtype, buffer=shm.buf, offset=offset)[:] = column
+            offset += column.nbytes
+        self._attach(shm, layout)
+        self._owner = True
+
+    def release(self):
+        """
+        Unlinks the shared memory block; mappings already attached stay valid until they are closed.
+        """
+        if self._owner:
+            self._shm.unlink()
+            self._owner = False
+
+    def close(self):
+        """
+        Closes the mapping of a shared memory block this process attached to, such as in a data
+        loader worker. The index cannot be used anymore.
+        """
+        if self._shm is None or self._owner:
+            return
+        for name in self.COLUMNS:
+            setattr(self, name, None)
+        self._shm.close()
+        self._shm = None
+
+    def __getstate__(self):
+        state = {'paths': self.paths, 'start': self.start}
+        if self._shm is not None:
+            state['shm'] = self._shm.name
+            state['layout'] = self._layout()
+        else:
+            state['columns'] = self._columns()
+        return state
+
+    def __setstate__(self, state):
+        self.paths = state['paths']
+        self.start = state['start']
+        self.row = None
+        self._owner = False
+        self._shm = None
+        if 'shm' in state:
+            self._attach(attach_shared_memory(state['shm']), state['layout'])
+        else:
+            for name, column in state['columns']:
+                setattr(self, name, column)
+
+    def __repr__(self):
+        return f"SampleIndex(samples={len(self)}, files={len(self.paths)}, start={self.start}, " \
+               f"shared={self._shm is not None})"
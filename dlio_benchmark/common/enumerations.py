@@ -26,6 +26,17 @@ class CheckpointMechanismType(Enum):
     CUSTOM = 'custom'
     TF_SAVE = 'tf_save'
     PT_SAVE = 'pt_save'
+    RAW_WRITE = 'raw'
+
+    def __str__(self):
+        return self.value
+
+class CheckpointTensorProviderType(Enum):
+    """
+    How the tensors of the checkpoints are generated.
+    """
+    EAGER = 'eager'
+    SHARED = 'shared'
 
     def __str__(self):
         return self.value
@@ -50,6 +61,94 @@ class CheckpointModeType(Enum):
     def __str__(self):
         return self.value
 
+class FileDiscoveryType(Enum):
+    """
+    Ranks that list the dataset files
+    """
+    RANK_ZERO = 'rank_zero'
+    NODE = 'node'
+    ALL_RANKS = 'all_ranks'
+
+    def __str__(self):
+        return self.value
+
+class RecordLengthDistribution(Enum):
+    """
+    Distribution of the sizes of the samples within an indexed binary file
+    - fixed: every sample of a file has the same size, drawn per file from record_length_bytes_stdev
+    - normal: normal sizes of mean record_length_bytes and standard deviation record_length_bytes_stdev
+    - lognormal: lognormal sizes of mean record_length_bytes and standard deviation record_length_bytes_stdev
+    - histogram: sizes drawn from the histogram in record_length_bytes_histogram
+    """
+    FIXED = 'fixed'
+    NORMAL = 'normal'
+    LOGNORMAL = 'lognormal'
+    HISTOGRAM = 'histogram'
+
+    def __str__(self):
+        return self.value
+
+class OutputFormat(Enum):
+    """
+    Format of the statistics of the ranks
+    - json: {rank}_output.json and {rank}_per_epoch_stats.json written by every rank
+    - npz: columnar stats_{aggregator}.npz files written by output.aggregators ranks
+    """
+    JSON = 'json'
+    NPZ = 'npz'
+
+    def __str__(self):
+        return self.value
+
+class GenerationSchedule(Enum):
+    """
+    How the files of the dataset are assigned to the ranks generating them
+    - static: rank r generates files r, r + comm_size, r + 2 * comm_size, ...
+    - dynamic: ranks take the next file from a shared MPI work queue when they are ready
+    """
+    STATIC = 'static'
+    DYNAMIC = 'dynamic'
+
+    def __str__(self):
+        return self.value
+
+class ReadEngine(Enum):
+    """
+    How the indexed binary reader issues the reads of a batch
+    - posix: one seek and read per sample
+    - preadv: one preadv per run of adjacent samples
+    - io_uring: the runs of a batch submitted together through io_uring
+    """
+    POSIX = 'posix'
+    PREADV = 'preadv'
+    IO_URING = 'io_uring'
+
+    def __str__(self):
+        return self.value
+
+class BufferBacking(Enum):
+    """
+    Memory backing the batch buffers of the readers
+    """
+    HEAP = 'heap'
+    PINNED = 'pinned'
+    SHARED = 'shared'
+
+    def __str__(self):
+        return self.value
+
+class CachePolicy(Enum):
+    """
+    Eviction policy of the sample caches
+    """
+    LRU = 'lru'
+    CLOCK = 'clock'
+    LFU = 'lfu'
+    FIFO = 'fifo'
+
+    def __str__(self):
+        return self.value
+
 class StorageType(Enum):
     """
     Different types of underlying storage
@@ -39,28 +39,35 @@ class CSVGenerator(DataGenerator):
         """
         super().generate()
         np.random.seed(10)
-        record_label = 0
         dim = self.get_dimension(self.total_files_to_generate)
-        for i in range(self.my_rank, int(self.total_files_to_generate), self.comm_size):
-            progress(i+1, self.total_files_to_generate, "Generating CSV Data")
-            dim1 = dim[2*i]
-            dim2 = dim[2*i+1]
-            record = np.random.randint(255, size=dim1*dim2, dtype=np.uint8)
-            records = [record]*self.num_samples
-            df = pd.DataFrame(data=records)
-            out_path_spec = self.storage.get_uri(self._file_list[i])
-            compression = None
-            if self.compression != Compression.NONE:
-                compression = {
-                    "method": str(self.compression)
-                }
-                if self.compression == Compression.GZIP:
-                    out_path_spec = out_path_spec + ".gz"
-                elif self.compression == Compression.BZIP2:
-                    out_path_spec = out_path_spec + ".bz2"
-                elif self.compression == Compression.ZIP:
-                    out_path_spec = out_path_spec + ".zip"
-                elif self.compression == Compression.XZ:
-                    out_path_spec = out_path_spec + ".xz"
-            df.to_csv(out_path_spec, compression=compression)
+        self.generate_files(dim, "Generating CSV Data")
         np.random.seed()
+
+    def get_output_path(self, filename):
+        """
+        Path of the generated file, which carries the extension of the compression.
+        """
+        if self.compression == Compression.GZIP:
+            return filename + ".gz"
+        elif self.compression == Compression.BZIP2:
+            return filename + ".bz2"
+        elif self.compression == Compression.ZIP:
+            return filename + ".zip"
+        elif self.compression == Compression.XZ:
+            return filename + ".xz"
+        return filename
+
+    def get_file_size(self, file_index):
+        return self.storage.get_size(self.get_output_path(self._file_list[file_index]))
+
+    def generate_file(self, i, dim1, dim2):
+        record = np.random.randint(255, size=dim1*dim2, dtype=np.uint8)
+        records = [record]*self.num_samples
+        df = pd.DataFrame(data=records)
+        out_path_spec = self.get_output_path(self.storage.get_uri(self._file_list[i]))
+        compression = None
+        if self.compression != Compression.NONE:
+            compression = {
+                "method": str(self.compression)
+            }
+        df.to_csv(out_path_spec, compression=compression)
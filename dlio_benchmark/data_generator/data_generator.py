@@ -16,14 +16,65 @@
 """
 
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from time import time
 
+from dlio_benchmark.common.constants import DATASET_MANIFEST, DATASET_MANIFEST_VERSION, MODULE_DATA_GENERATOR
+from dlio_benchmark.common.enumerations import GenerationSchedule
 from dlio_benchmark.utils.config import ConfigArguments
 from dlio_benchmark.storage.storage_factory import StorageFactory
+import json
 import math
+import multiprocessing
+import os
 from shutil import copyfile
 import numpy as np
 import logging
-from dlio_benchmark.utils.utility import utcnow, add_padding, DLIOMPI
+from mpi4py import MPI
+from dlio_benchmark.utils.utility import utcnow, add_padding, progress, DLIOMPI, Profile
+
+dlp = Profile(MODULE_DATA_GENERATOR)
+
+# generator of the rank, inherited by the forked generation processes
+_generator = None
+
+
+def _init_generation_process(generator):
+    global _generator
+    _generator = generator
+
+
+def _generate_file_in_process(file_index):
+    return _generator.generate_indexed_file(file_index)
+
+
+class FileQueue(object):
+    """
+    Work queue of the files to generate shared by all the ranks: a counter held by rank 0 that
+    every rank atomically fetches and increments, without rank 0 having to serve requests.
+    """
+
+    def __init__(self, comm, num_files):
+        self.num_files = num_files
+        self.window = MPI.Win.Allocate(np.dtype(np.int64).itemsize if comm.rank == 0 else 0,
+                                       np.dtype(np.int64).itemsize, comm=comm)
+        if comm.rank == 0:
+            np.frombuffer(self.window.tomemory(), dtype=np.int64)[0] = 0
+        comm.Barrier()
+        self.one = np.ones(1, dtype=np.int64)
+        self.result = np.zeros(1, dtype=np.int64)
+
+    def __iter__(self):
+        while True:
+            self.window.Lock(0)
+            self.window.Fetch_and_op(self.one, self.result, 0, 0, MPI.SUM)
+            self.window.Unlock(0)
+            if self.result[0] >= self.num_files:
+                return
+            yield int(self.result[0])
+
+    def free(self):
+        self.window.Free()
 
 
 class DataGenerator(ABC):
@@ -51,6 +102,15 @@ class DataGenerator(ABC):
         self.logger = self._args.logger
         self.storage = StorageFactory().get_storage(self._args.storage_type, self._args.storage_root,
                                                                         self._args.framework)
+        self.generation_processes = self._args.generation_processes
+        self.generation_schedule = self._args.generation_schedule
+        if self.generation_processes < 1:
+            raise Exception(f"workload.dataset.generation_processes should be at least 1, got {self.generation_processes}")
+        self.dim = None
+        self.generated_files = 0
+        self.generated_bytes = 0
+        self.generation_time = 0.0
+
     def get_dimension(self, num_samples=1):
         if (self._dimension_stdev>0):
             dim = [max(int(d), 1) for d in np.random.normal(self._dimension, self._dimension_stdev, 2*num_samples)]
@@ -107,3 +167,117 @@ class DataGenerator(ABC):
             for i in range(self.num_files_eval):
                 file_spec = "{}/valid/{}_{}_of_{}.{}".format(self.data_dir, self.file_prefix, add_padding(i, nd_f_eval), self.num_files_eval, self.format)
                 self._file_list.append(file_spec)
+
+    @abstractmethod
+    def generate_file(self, file_index, dim1, dim2):
+        """
+        Writes file file_index of the file list with samples of dim1 x dim2. It runs in the
+        generation processes of the rank.
+        """
+        pass
+
+    @dlp.log
+    def generate_indexed_file(self, file_index):
+        # every file has its own seed, so its content does not depend on which rank or process makes it
+        np.random.seed([10, file_index])
+        self.generate_file(file_index, self.dim[2 * file_index], self.dim[2 * file_index + 1])
+        np.random.seed()
+        return self.get_file_size(file_index)
+
+    def get_file_size(self, file_index):
+        """
+        Bytes written for file file_index, index files included, or None when the storage cannot
+        tell.
+        """
+        filename = self._file_list[file_index]
+        return self.total_size([filename] + self.get_index_files(filename))
+
+    def total_size(self, paths):
+        sizes = [self.storage.get_size(path) for path in paths]
+        if any(size is None for size in sizes):
+            return None
+        return sum(sizes)
+
+    def count_generated(self, sizes):
+        """
+        Adds generated files of sizes bytes; the generated bytes become unknown (None) as soon as
+        the size of one file is.
+        """
+        sizes = list(sizes)
+        self.generated_files += len(sizes)
+        if self.generated_bytes is None or any(size is None for size in sizes):
+            self.generated_bytes = None
+        else:
+            self.generated_bytes += sum(sizes)
+
+    def generate_files(self, dim, description):
+        """
+        Generates the files of this rank: statically strided over the ranks or taken from a work
+        queue shared with the other ranks (generation_schedule), one after the other or on a
+        pool of generation_processes forked processes. Records the files, bytes and time spent.
+        """
+        self.dim = dim
+        start = time()
+        queue = None
+        if self.generation_schedule is GenerationSchedule.DYNAMIC:
+            queue = FileQueue(DLIOMPI.get_instance().comm(), self.total_files_to_generate)
+            file_indices = iter(queue)
+        else:
+            file_indices = iter(range(self.my_rank, int(self.total_files_to_generate), self.comm_size))
+        if self.generation_processes == 1:
+            for i in file_indices:
+                progress(i + 1, self.total_files_to_generate, description)
+                self.count_generated([self.generate_indexed_file(i)])
+        else:
+            with ProcessPoolExecutor(max_workers=self.generation_processes,
+                                     mp_context=multiprocessing.get_context("fork"),
+                                     initializer=_init_generation_process, initargs=(self,)) as pool:
+                pending = set()
+                for i in file_indices:
+                    progress(i + 1, self.total_files_to_generate, description)
+                    pending.add(pool.submit(_generate_file_in_process, i))
+                    # take the next file only once a process is free, so the queue balances the ranks
+                    if len(pending) == self.generation_processes:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        self.count_generated(future.result() for future in done)
+                self.count_generated(future.result() for future in pending)
+        self.generation_time = time() - start
+        if queue is not None:
+            queue.free()
+
+    def get_index_files(self, filename):
+        """
+        Index files written next to a generated file, for formats that have them.
+        """
+        return []
+
+    def write_manifest(self):
+        """
+        Writes the manifest of the generated dataset: file list, sizes, sample counts and index files.
+        Every rank stats a share of the files and rank 0 writes the manifest in the data folder.
+        """
+        sizes = {}
+        for file_index in range(self.my_rank, self.total_files_to_generate, self.comm_size):
+            sizes[file_index] = self.storage.get_size(self._file_list[file_index])
+        sizes = DLIOMPI.get_instance().comm().gather(sizes, root=0)
+        if self.my_rank != 0:
+            return
+        all_sizes = {}
+        for rank_sizes in sizes:
+            all_sizes.update(rank_sizes)
+        manifest = {'version': DATASET_MANIFEST_VERSION,
+                    'format': str(self.format),
+                    'num_samples_per_file': self.num_samples,
+                    'num_subfolders_train': self.num_subfolders_train,
+                    'num_subfolders_eval': self.num_subfolders_eval,
+                    'train': [],
+                    'valid': []}
+        for file_index, filename in enumerate(self._file_list):
+            dataset_type = 'train' if file_index < self.num_files_train else 'valid'
+            manifest[dataset_type].append({'path': os.path.relpath(filename, self.data_dir),
+                                           'size': all_sizes[file_index],
+                                           'samples': self.num_samples,
+                                           'index_files': [os.path.relpath(index_file, self.data_dir)
+                                                           for index_file in self.get_index_files(filename)]})
+        self.storage.put_data(os.path.join(self.data_dir, DATASET_MANIFEST), json.dumps(manifest))
+        self.logger.info(f"{utcnow()} Wrote manifest of {len(self._file_list)} files in {self.data_dir}")
@@ -45,8 +45,12 @@ class HDF5Generator(DataGenerator):
         """
         super().generate()
         np.random.seed(10)
-        record_labels = [0] * self.num_samples
         dim = self.get_dimension(self.total_files_to_generate)
+        self.generate_files(dim, "Generating HDF5 Data")
+        np.random.seed()
+
+    def generate_file(self, i, dim1, dim2):
+        record_labels = [0] * self.num_samples
         chunks = None
         if self.enable_chunking:
             chunk_dimension = int(math.ceil(math.sqrt(self.chunk_size)))
@@ -59,15 +63,10 @@ class HDF5Generator(DataGenerator):
             compression = str(self.compression)
             if self.compression == Compression.GZIP:
                 compression_level = self.compression_level
-        for i in dlp.iter(range(self.my_rank, int(self.total_files_to_generate), self.comm_size)):
-            dim1 = dim[2*i]
-            dim2 = dim[2*i+1]
-            records = np.random.randint(255, size=(dim1, dim2, self.num_samples), dtype=np.uint8)
-            out_path_spec = self.storage.get_uri(self._file_list[i])
-            progress(i+1, self.total_files_to_generate, "Generating HDF5 Data")
-            hf = h5py.File(out_path_spec, 'w')
-            hf.create_dataset('records', (self.num_samples, dim1, dim2), chunks=chunks, compression=compression,
-                                    compression_opts=compression_level, dtype=np.uint8, data=records)
-            hf.create_dataset('labels', data=record_labels)
-            hf.close()
-        np.random.seed()
+        records = np.random.randint(255, size=(dim1, dim2, self.num_samples), dtype=np.uint8)
+        out_path_spec = self.storage.get_uri(self._file_list[i])
+        hf = h5py.File(out_path_spec, 'w')
+        hf.create_dataset('records', (self.num_samples, dim1, dim2), chunks=chunks, compression=compression,
+                                compression_opts=compression_level, dtype=np.uint8, data=records)
+        hf.create_dataset('labels', data=record_labels)
+        hf.close()
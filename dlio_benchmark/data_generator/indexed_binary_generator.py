@@ -15,7 +15,7 @@
    limitations under the License.
 """
 
-from dlio_benchmark.common.enumerations import Compression
+from dlio_benchmark.common.enumerations import Compression, RecordLengthDistribution
 from dlio_benchmark.data_generator.data_generator import DataGenerator
 
 import logging
@@ -25,7 +25,7 @@ from dlio_benchmark.utils.utility import progress, utcnow, DLIOMPI
 from dlio_benchmark.utils.utility import Profile
 from shutil import copyfile
 from dlio_benchmark.common.constants import MODULE_DATA_GENERATOR
-import struct
+from time import time
 from mpi4py import MPI
 
 dlp = Profile(MODULE_DATA_GENERATOR)
@@ -36,6 +36,11 @@ Generator for creating data in NPZ format.
 class IndexedBinaryGenerator(DataGenerator):
     def __init__(self):
         super().__init__()
+        self.random_pool = None
+        self.distribution = self._args.record_length_distribution
+        self.histogram = None
+        if self.distribution is RecordLengthDistribution.HISTOGRAM:
+            self.histogram = load_size_histogram(self._args.record_length_histogram)
 
     def index_file_path_off(self, prefix_path):
         return prefix_path + '.off.idx'
@@ -43,6 +48,9 @@ class IndexedBinaryGenerator(DataGenerator):
     def index_file_path_size(self, prefix_path):
         return prefix_path + '.sz.idx'
 
+    def get_index_files(self, filename):
+        return [self.index_file_path_off(filename), self.index_file_path_size(filename)]
+
     @dlp.log
     def generate(self):
         """
@@ -55,10 +63,12 @@ class IndexedBinaryGenerator(DataGenerator):
         total_samples = self.total_files_to_generate * self.num_samples
         dim = self.get_dimension(self.total_files_to_generate)
         # self.logger.info(dim)
-        if self.total_files_to_generate <= self.comm_size:
+        # collective I/O writes samples of the same size
+        if self.total_files_to_generate <= self.comm_size and self.distribution is RecordLengthDistribution.FIXED:
             # Use collective I/O
             # we need even number os samples for collective I/O
             samples_per_rank = (self.num_samples + (self.num_samples % self.comm_size)) // self.comm_size
+            start = time()
             for file_index in dlp.iter(range(int(self.total_files_to_generate))):
                 amode = MPI.MODE_WRONLY | MPI.MODE_CREATE
                 comm = MPI.COMM_WORLD
@@ -76,15 +86,15 @@ class IndexedBinaryGenerator(DataGenerator):
                 off_type = np.uint64
                 elements_per_loop = min(int(GB / np.dtype(off_type).itemsize), samples_per_rank)
                 offsets_processed=0
-                for element_index in range(self.my_rank*samples_per_rank, samples_per_rank*(self.my_rank+1), elements_per_loop):
-                    offsets = np.array(range(self.my_rank * elements_per_loop * sample_size, 
-                                    (self.my_rank + 1) * elements_per_loop * sample_size, 
-                                    sample_size), dtype=off_type)
-                    
-                    sizes = np.array([sample_size] * elements_per_loop, dtype=off_type)
+                last_element = samples_per_rank*(self.my_rank+1)
+                for element_index in range(self.my_rank*samples_per_rank, last_element, elements_per_loop):
+                    elements = min(elements_per_loop, last_element - element_index)
+                    offsets = np.arange(element_index, element_index + elements, dtype=off_type) * off_type(sample_size)
+                    sizes = np.full(elements, sample_size, dtype=off_type)
                     offset = element_index * np.dtype(off_type).itemsize
                     fh_off.Write_at_all(offset, offsets)
                     fh_sz.Write_at_all(offset, sizes)
+                    self.generated_bytes += offsets.nbytes + sizes.nbytes
                     offsets_processed += elements_per_loop
                     progress(offsets_processed * self.comm_size, total_samples, "Generating Indexed Binary Data Index for Samples")
                 fh_off.Close()
@@ -101,55 +111,86 @@ class IndexedBinaryGenerator(DataGenerator):
                     #self.logger.info(f"{utcnow()} rank {self.my_rank} writing {sample_index} * {samples_per_loop} for {samples_per_rank} samples")
                     offset = sample_index * sample_size
                     fh.Write_at_all(offset, records)
+                    self.generated_bytes += records.nbytes
                     samples_processed += samples_per_loop
                     progress(samples_processed * self.comm_size, total_samples, "Generating Indexed Binary Data Samples")
                 fh.Close()
+                # every rank writes a part of the file, count it once
+                if self.my_rank == 0:
+                    self.generated_files += 1
+            self.generation_time = time() - start
         else:
-            for i in dlp.iter(range(self.my_rank, int(self.total_files_to_generate), self.comm_size)):
-                dim1 = dim[2*i]
-                dim2 = dim[2*i + 1]
-                sample_size = dim1 * dim2
-                total_size = sample_size * self.num_samples
-                write_size = total_size
-                memory_size = self._args.generation_buffer_size
-                if total_size > memory_size:
-                    write_size = memory_size - (memory_size % sample_size)
-                out_path_spec = self.storage.get_uri(self._file_list[i])
-                out_path_spec_off_idx = self.index_file_path_off(out_path_spec)
-                out_path_spec_sz_idx = self.index_file_path_size(out_path_spec)
-                progress(i + 1, self.total_files_to_generate, "Generating Indexed Binary Data")
-                prev_out_spec = out_path_spec
-                written_bytes = 0
-                data_file = open(out_path_spec, "wb")
-                off_file = open(out_path_spec_off_idx, "wb")
-                sz_file = open(out_path_spec_sz_idx, "wb")
-                records = np.random.randint(255, size=write_size, dtype=np.uint8)
-                while written_bytes < total_size:
-                    data_to_write = write_size if written_bytes + write_size <= total_size else total_size - written_bytes
-                    samples_to_write = data_to_write // sample_size
-
-                    # Write data
-                    myfmt = 'B' * data_to_write
-                    binary_data = struct.pack(myfmt, *records[:data_to_write])
-                    data_file.write(binary_data)
-                    struct._clearcache()
-
-                    # Write offsets
-                    myfmt = 'Q' * samples_to_write
-                    offsets = range(0, data_to_write, sample_size)
-                    offsets = offsets[:samples_to_write]
-                    binary_offsets = struct.pack(myfmt, *offsets)
-                    off_file.write(binary_offsets)
-
-                    # Write sizes
-                    myfmt = 'Q' * samples_to_write
-                    sample_sizes = [sample_size] * samples_to_write
-                    binary_sizes = struct.pack(myfmt, *sample_sizes)
-                    sz_file.write(binary_sizes)
-
-                    written_bytes = written_bytes + data_to_write
-                data_file.close()
-                off_file.close()
-                sz_file.close()
+            if self._args.generation_random_pool > 0:
+                # made once per rank, the generation processes share it
+                self.random_pool = np.random.randint(255, size=self._args.generation_random_pool, dtype=np.uint8)
+            self.generate_files(dim, "Generating Indexed Binary Data")
+            self.random_pool = None
             np.random.seed()
         DLIOMPI.get_instance().comm().Barrier()
+
+    def get_sample_sizes(self, dim1, dim2):
+        """
+        Sizes of the samples of a file: dim1 x dim2 for all of them with the fixed distribution,
+        drawn for every sample otherwise.
+        """
+        mean, stdev = self._args.record_length, self._args.record_length_stdev
+        if self.distribution is RecordLengthDistribution.NORMAL:
+            sizes = np.random.normal(mean, stdev, self.num_samples)
+        elif self.distribution is RecordLengthDistribution.LOGNORMAL:
+            # parameters of the underlying normal giving the requested mean and standard deviation
+            sigma = np.sqrt(np.log1p((stdev / mean) ** 2))
+            sizes = np.random.lognormal(np.log(mean) - sigma ** 2 / 2, sigma, self.num_samples)
+        elif self.distribution is RecordLengthDistribution.HISTOGRAM:
+            sizes = np.random.choice(self.histogram[0], size=self.num_samples, p=self.histogram[1])
+        else:
+            return np.full(self.num_samples, dim1 * dim2, dtype=np.uint64)
+        return np.maximum(np.rint(sizes), 1).astype(np.uint64)
+
+    def generate_file(self, i, dim1, dim2):
+        sizes = self.get_sample_sizes(dim1, dim2)
+        total_size = int(sizes.sum())
+        out_path_spec = self.storage.get_uri(self._file_list[i])
+        # offsets and sizes of all the samples of the file, as little endian uint64
+        offsets = np.zeros(self.num_samples, dtype=np.uint64)
+        np.cumsum(sizes[:-1], out=offsets[1:])
+        offsets.tofile(self.index_file_path_off(out_path_spec))
+        sizes.tofile(self.index_file_path_size(out_path_spec))
+        if self.random_pool is not None:
+            # every file starts at its own place of the pool, so no two files are the same
+            records = self.random_pool
+            position = np.random.randint(len(records))
+        else:
+            write_size = min(total_size, self._args.generation_buffer_size)
+            records = np.random.randint(255, size=write_size, dtype=np.uint8)
+            position = 0
+        with open(out_path_spec, "wb") as data_file:
+            write_records(data_file, records, position, total_size)
+
+
+def load_size_histogram(path):
+    """
+    Loads a histogram of sample sizes: one "size count" pair per line, separated by spaces or a
+    comma, with # comments. Returns the sizes and the probability of each.
+    """
+    with open(path) as f:
+        histogram = np.loadtxt((line.replace(',', ' ') for line in f), ndmin=2)
+    if histogram.shape[1] != 2 or len(histogram) == 0:
+        raise Exception(f"Record length histogram {path} should have a size and a count on every line")
+    sizes, counts = histogram[:, 0], histogram[:, 1]
+    if np.any(sizes < 1) or np.any(counts < 0) or counts.sum() <= 0:
+        raise Exception(f"Record length histogram {path} should have positive sizes and non-negative counts")
+    return sizes.astype(np.int64), counts / counts.sum()
+
+
+def write_records(data_file, records, position, total_size):
+    """
+    Writes total_size bytes of the records buffer to data_file, starting at position and
+    wrapping around the end of the buffer, without copying it.
+    """
+    records = memoryview(records).cast('B')
+    written_bytes = 0
+    while written_bytes < total_size:
+        data_to_write = min(total_size - written_bytes, len(records) - position)
+        data_file.write(records[position:position + data_to_write])
+        written_bytes += data_to_write
+        position = (position + data_to_write) % len(records)
@@ -40,19 +40,16 @@ class PNGGenerator(DataGenerator):
         """
         super().generate()
         np.random.seed(10)
-        record_labels = [0] 
         dim = self.get_dimension(self.total_files_to_generate)
-        for i in dlp.iter(range(self.my_rank, int(self.total_files_to_generate), self.comm_size)):
-            dim1 = dim[2*i]
-            dim2 = dim[2*i+1]
-            if self.my_rank==0:
-                self.logger.debug(f"{utcnow()} Dimension of images: {dim1} x {dim2}")
-            out_path_spec = self.storage.get_uri(self._file_list[i])
-            records = np.random.randint(255, size=(dim1, dim2), dtype=np.uint8)
-            img = im.fromarray(records)
-            if self.my_rank == 0 and i % 100 == 0:
-                self.logger.info(f"Generated file {i}/{self.total_files_to_generate}")
-            progress(i+1, self.total_files_to_generate, "Generating PNG Data")
-            prev_out_spec = out_path_spec
-            img.save(out_path_spec, format='PNG', bits=8)
+        self.generate_files(dim, "Generating PNG Data")
         np.random.seed()
+
+    def generate_file(self, i, dim1, dim2):
+        if self.my_rank==0:
+            self.logger.debug(f"{utcnow()} Dimension of images: {dim1} x {dim2}")
+        out_path_spec = self.storage.get_uri(self._file_list[i])
+        records = np.random.randint(255, size=(dim1, dim2), dtype=np.uint8)
+        img = im.fromarray(records)
+        if self.my_rank == 0 and i % 100 == 0:
+            self.logger.info(f"Generated file {i}/{self.total_files_to_generate}")
+        img.save(out_path_spec, format='PNG', bits=8)
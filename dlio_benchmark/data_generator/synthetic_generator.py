@@ -40,14 +40,13 @@ class SyntheticGenerator(DataGenerator):
         """
         super().generate()
         np.random.seed(10)
-        record_labels = [0] 
         dim = self.get_dimension(self.total_files_to_generate)
-        for i in dlp.iter(range(self.my_rank, int(self.total_files_to_generate), self.comm_size)):
-            out_path_spec = self.storage.get_uri(self._file_list[i])
-            if self.my_rank == 0 and i % 100 == 0:
-                self.logger.info(f"Generated file {i}/{self.total_files_to_generate}")
-            progress(i+1, self.total_files_to_generate, "Generating Synethic Data (Empty)")
-            prev_out_spec = out_path_spec
-            with open(out_path_spec, 'w') as f:
-                f.write(f"{i}")
-        np.random.seed()
\ No newline at end of file
+        self.generate_files(dim, "Generating Synethic Data (Empty)")
+        np.random.seed()
+
+    def generate_file(self, i, dim1, dim2):
+        out_path_spec = self.storage.get_uri(self._file_list[i])
+        if self.my_rank == 0 and i % 100 == 0:
+            self.logger.info(f"Generated file {i}/{self.total_files_to_generate}")
+        with open(out_path_spec, 'w') as f:
+            f.write(f"{i}")
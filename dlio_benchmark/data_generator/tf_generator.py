@@ -34,6 +34,11 @@ class TFRecordGenerator(DataGenerator):
     """
     def __init__(self):
         super().__init__()
+
+    def get_index_files(self, filename):
+        folder = "valid" if "valid" in filename else "train"
+        return [f"{self._args.data_folder}/index/{folder}/{os.path.basename(filename)}.idx"]
+
     @dlp.log
     def generate(self):
         """
@@ -43,40 +48,43 @@ class TFRecordGenerator(DataGenerator):
         """
         super().generate()
         np.random.seed(10)
-        # This creates a 2D image representing a single record
-        record_label = 0
         dim = self.get_dimension(self.total_files_to_generate)
-        for i in dlp.iter(range(self.my_rank, self.total_files_to_generate, self.comm_size)):
-            progress(i+1, self.total_files_to_generate, "Generating TFRecord Data")
-            out_path_spec = self.storage.get_uri(self._file_list[i])
-            dim1 = dim[2*i]
-            dim2 = dim[2*i+1]
-            # Open a TFRecordWriter for the output-file.
-            with tf.io.TFRecordWriter(out_path_spec) as writer:
-                for i in range(0, self.num_samples):
-                    # This creates a 2D image representing a single record
-                    record = np.random.randint(255, size=(dim1, dim2), dtype=np.uint8)
-                    img_bytes = record.tobytes()
-                    data = {
-                        'image': tf.train.Feature(bytes_list=tf.train.BytesList(value=[img_bytes])),
-                        'size': tf.train.Feature(int64_list=tf.train.Int64List(value=[self._dimension]))
-                    }
-                    # Wrap the data as TensorFlow Features.
-                    feature = tf.train.Features(feature=data)
-                    # Wrap again as a TensorFlow Example.
-                    example = tf.train.Example(features=feature)
-                    # Serialize the data.
-                    serialized = example.SerializeToString()
-                    # Write the serialized data to the TFRecords file.
-                    writer.write(serialized)
-            tfrecord2idx_script = "tfrecord2idx"
-            folder = "train"
-            if "valid" in out_path_spec:
-                folder = "valid"
-            index_folder = f"{self._args.data_folder}/index/{folder}"
-            filename = os.path.basename(out_path_spec)
-            self.storage.create_node(index_folder, exist_ok=True)
-            tfrecord_idx = f"{index_folder}/{filename}.idx"
-            if not self.storage.isfile(tfrecord_idx):
-                call([tfrecord2idx_script, out_path_spec, self.storage.get_uri(tfrecord_idx)])
+        self.generate_files(dim, "Generating TFRecord Data")
         np.random.seed()
+
+    def get_file_size(self, file_index):
+        # tfrecord2idx may not be installed, in which case there is no index file
+        filename = self._file_list[file_index]
+        return self.total_size([path for path in [filename] + self.get_index_files(filename)
+                                if self.storage.isfile(path)])
+
+    def generate_file(self, i, dim1, dim2):
+        out_path_spec = self.storage.get_uri(self._file_list[i])
+        # Open a TFRecordWriter for the output-file.
+        with tf.io.TFRecordWriter(out_path_spec) as writer:
+            for i in range(0, self.num_samples):
+                # This creates a 2D image representing a single record
+                record = np.random.randint(255, size=(dim1, dim2), dtype=np.uint8)
+                img_bytes = record.tobytes()
+                data = {
+                    'image': tf.train.Feature(bytes_list=tf.train.BytesList(value=[img_bytes])),
+                    'size': tf.train.Feature(int64_list=tf.train.Int64List(value=[self._dimension]))
+                }
+                # Wrap the data as TensorFlow Features.
+                feature = tf.train.Features(feature=data)
+                # Wrap again as a TensorFlow Example.
+                example = tf.train.Example(features=feature)
+                # Serialize the data.
+                serialized = example.SerializeToString()
+                # Write the serialized data to the TFRecords file.
+                writer.write(serialized)
+        tfrecord2idx_script = "tfrecord2idx"
+        folder = "train"
+        if "valid" in out_path_spec:
+            folder = "valid"
+        index_folder = f"{self._args.data_folder}/index/{folder}"
+        filename = os.path.basename(out_path_spec)
+        self.storage.create_node(index_folder, exist_ok=True)
+        tfrecord_idx = f"{index_folder}/{filename}.idx"
+        if not self.storage.isfile(tfrecord_idx):
+            call([tfrecord2idx_script, out_path_spec, self.storage.get_uri(tfrecord_idx)])
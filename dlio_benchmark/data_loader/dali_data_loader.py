@@ -55,16 +55,16 @@ class DaliIndexDataset(object):
         if end_sample > total_num_samples - 1:
             end_sample = total_num_samples - 1
         if not hasattr(self, 'indices'):
-            self.indices = list(range(start_sample, end_sample + 1))
+            self.indices = np.arange(start_sample, end_sample + 1)
         self.samples_per_worker = len(self.indices)
     def __call__(self, sample_info):
         DLIOLogger.get_instance().debug(
-            f"{utcnow()} Reading {sample_info.idx_in_epoch} out of {self.samples_per_worker} by worker {self.worker_index} with {self.indices} indices")
+            f"{utcnow()} Reading {sample_info.idx_in_epoch} out of {self.samples_per_worker} by worker {self.worker_index}")
         step = sample_info.iteration       
         if step >= self.total_num_steps or sample_info.idx_in_epoch >= self.samples_per_worker:
             # Indicate end of the epoch
             raise StopIteration()
-        sample_idx = self.indices[sample_info.idx_in_epoch]
+        sample_idx = int(self.indices[sample_info.idx_in_epoch])
         with Profile(MODULE_DATA_LOADER, epoch=self.epoch, image_idx=sample_idx, step=step):
             image = self.reader.read_index(sample_idx, step)
         return image, np.uint8([sample_idx])
@@ -111,6 +111,9 @@ class DaliDataLoader(BaseDataLoader):
         if self._args.prefetch_size > 0:
             prefetch_size = self._args.prefetch_size
         num_pipelines = 1
+        if parallel:
+            # python workers attach to the sample maps instead of unpickling a copy of them
+            self._args.share_sample_maps()
         samples_per_worker = int(math.ceil(self.num_samples/num_pipelines/self._args.comm_size))
         for worker_index in range(num_pipelines):
             global_worker_index = self._args.my_rank * num_pipelines + worker_index
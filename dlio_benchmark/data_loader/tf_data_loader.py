@@ -24,6 +24,7 @@ from dlio_benchmark.common.constants import MODULE_DATA_LOADER
 from dlio_benchmark.common.enumerations import DataLoaderType, Shuffle, FormatType, DatasetType
 from dlio_benchmark.data_loader.base_data_loader import BaseDataLoader
 from dlio_benchmark.reader.reader_factory import ReaderFactory
+from dlio_benchmark.reader.transforms import TransformChain
 from dlio_benchmark.utils.utility import utcnow
 from dlio_benchmark.utils.utility import Profile, DLIOLogger
 
@@ -47,10 +48,10 @@ class TensorflowDataset(tf.data.Dataset):
             yield batch
 
     @dlp.log
-    def __new__(cls, format_type, dataset_type, epoch, shape, thread_index):
+    def __new__(cls, format_type, dataset_type, epoch, shape, thread_index, dtype=np.uint8):
         dataset = tf.data.Dataset.from_generator(
             cls._generator,
-            output_types=tf.uint8,
+            output_types=tf.as_dtype(dtype),
             output_shapes=shape,
             args=(format_type.value, dataset_type.value, epoch, thread_index,),
         )
@@ -81,12 +82,14 @@ class TFDataLoader(BaseDataLoader):
             options.experimental_threading.private_threadpool_size = read_threads
             options.experimental_threading.max_intra_op_parallelism = read_threads
         if self.format_type != FormatType.TFRECORD:
+            shape, dtype = (self._args.max_dimension, self._args.max_dimension), np.uint8
+            if len(self._args.transforms) > 0:
+                shape, dtype = TransformChain(self._args.transforms).output_spec(self._args.resized_image)
             self._dataset = tf.data.Dataset.from_tensor_slices(np.arange(read_threads)).with_options(options)
             self._dataset = self._dataset.interleave(lambda x: TensorflowDataset(self.format_type, self.dataset_type,
-                                                                                self.epoch_number, (
-                                                                                self.batch_size,
-                                                                                self._args.max_dimension,
-                                                                                self._args.max_dimension), x),
+                                                                                self.epoch_number,
+                                                                                (self.batch_size,) + tuple(shape),
+                                                                                x, dtype),
                                                                                 cycle_length=read_threads,
                                                                                 num_parallel_calls=read_threads)
             if self._args.prefetch_size > 0:
@@ -18,8 +18,9 @@ from time import time
 import logging
 import math
 import pickle
+from multiprocessing.util import Finalize
 import torch
-from torch.utils.data import Dataset, DataLoader, RandomSampler, SequentialSampler
+from torch.utils.data import Dataset, DataLoader, RandomSampler, SequentialSampler, BatchSampler
 from torch.utils.data.sampler import Sampler
 import numpy as np
 
@@ -50,6 +51,9 @@ class TorchDataset(Dataset):
         self.num_images_read = 0
         self.batch_size = batch_size
         args = ConfigArguments.get_instance()
+        if num_workers > 0:
+            # workers attach to the sample maps instead of unpickling a copy of them
+            args.share_sample_maps()
         self.serial_args = pickle.dumps(args)
         self.logger = args.logger
         self.dlp_logger = None
@@ -62,6 +66,9 @@ class TorchDataset(Dataset):
         _args = ConfigArguments.get_instance()
         _args.configure_dlio_logging(is_child=True)
         self.dlp_logger = _args.configure_dftracer(is_child=True, use_pid=True)
+        if worker_id >= 0:
+            # the worker closes its mappings of the shared sample maps when it exits
+            Finalize(None, _args.close_sample_maps, exitpriority=0)
         self.logger.debug(f"{utcnow()} worker initialized {worker_id} with format {self.format_type}")
         self.reader = ReaderFactory.get_reader(type=self.format_type,
                                                dataset_type=self.dataset_type,
@@ -78,6 +85,13 @@ class TorchDataset(Dataset):
 
     @dlp.log
     def __getitem__(self, image_idx):
+        if isinstance(image_idx, list):
+            # with batch buffers the batch sampler hands over the indices of a whole batch
+            self.num_images_read += len(image_idx)
+            step = int(math.ceil(self.num_images_read / self.batch_size))
+            self.logger.debug(f"{utcnow()} Rank {DLIOMPI.get_instance().rank()} reading a batch of {len(image_idx)} samples")
+            dlp.update(step = step)
+            return self.reader.read_index_batch(image_idx, step)
         self.num_images_read += 1
         step = int(math.ceil(self.num_images_read / self.batch_size))
         self.logger.debug(f"{utcnow()} Rank {DLIOMPI.get_instance().rank()} reading {image_idx} sample")
@@ -96,7 +110,7 @@ class dlio_sampler(Sampler):
         end_sample = (self.rank + 1) * samples_per_proc - 1
         if end_sample > num_samples - 1:
             end_sample = num_samples - 1
-        self.indices = list(range(start_sample, end_sample + 1))
+        self.indices = range(start_sample, end_sample + 1)
 
 
     def __len__(self):
@@ -137,26 +151,25 @@ class TorchDataLoader(BaseDataLoader):
                     'prefetch_factor': prefetch_factor}
             if torch.__version__ != '1.3.1':       
                 kwargs['persistent_workers'] = True
+        if self._args.batch_buffers > 0:
+            # the dataset assembles every batch in its ring of batch buffers, so torch does not collate
+            batching = {'batch_size': None, 'sampler': BatchSampler(sampler, self.batch_size, drop_last=True)}
+        else:
+            batching = {'batch_size': self.batch_size, 'sampler': sampler, 'drop_last': True}
         if torch.__version__ == '1.3.1':
             if 'prefetch_factor' in kwargs:
                 del kwargs['prefetch_factor']
             self._dataset = DataLoader(dataset,
-                                       batch_size=self.batch_size,
-                                       sampler=sampler,
                                        num_workers=self._args.read_threads,
                                        pin_memory=self._args.pin_memory,
-                                       drop_last=True,
                                        worker_init_fn=dataset.worker_init, 
-                                       **kwargs)
+                                       **batching, **kwargs)
         else: 
             self._dataset = DataLoader(dataset,
-                                       batch_size=self.batch_size,
-                                       sampler=sampler,
                                        num_workers=self._args.read_threads,
                                        pin_memory=self._args.pin_memory,
-                                       drop_last=True,
                                        worker_init_fn=dataset.worker_init,
-                                       **kwargs)  # 2 is the default value
+                                       **batching, **kwargs)  # 2 is the default value
         self.logger.debug(f"{utcnow()} Rank {self._args.my_rank} will read {len(self._dataset) * self.batch_size} files")
 
         # self._dataset.sampler.set_epoch(epoch_number)
@@ -25,7 +25,7 @@ import numpy as np
 from numpy import random
 
 from dlio_benchmark.checkpointing.checkpointing_factory import CheckpointingFactory
-from dlio_benchmark.common.constants import MODULE_DLIO_BENCHMARK
+from dlio_benchmark.common.constants import MODULE_DLIO_BENCHMARK, DATASET_MANIFEST, DATASET_MANIFEST_VERSION
 
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 os.environ['AUTOGRAPH_VERBOSITY'] = '0'
@@ -40,11 +40,14 @@ from omegaconf import DictConfig, OmegaConf
 from dlio_benchmark.utils.statscounter import StatsCounter
 from hydra.core.config_store import ConfigStore
 from dlio_benchmark.utils.config import LoadConfig, ConfigArguments, GetConfig
-from dlio_benchmark.common.enumerations import Profiler, DatasetType, StorageType, MetadataType, FormatType
+from dlio_benchmark.common.enumerations import Profiler, DatasetType, StorageType, MetadataType, FormatType, \
+    FileDiscoveryType
 from dlio_benchmark.profiler.profiler_factory import ProfilerFactory
 from dlio_benchmark.framework.framework_factory import FrameworkFactory
 from dlio_benchmark.data_generator.generator_factory import GeneratorFactory
 from dlio_benchmark.storage.storage_factory import StorageFactory
+from dlio_benchmark.reader.sample_cache import NodeSampleCache, SampleCache, CacheCounters
+from dlio_benchmark.reader.read_counters import ReadCounters
 from dlio_benchmark.utils.utility import Profile, PerfTrace, DLIOLogger
 
 dlp = Profile(MODULE_DLIO_BENCHMARK)
@@ -152,6 +155,104 @@ class DLIOBenchmark(object):
             self.epochs_between_evals = self.args.epochs_between_evals
         self.stats = StatsCounter()
 
+    def load_manifest(self):
+        """
+        Loads the dataset manifest written by the generator on rank 0 and broadcasts it.
+        Returns None when there is no manifest or when it does not match the configured dataset.
+        """
+        manifest = None
+        if self.my_rank == 0:
+            manifest_path = os.path.join(self.args.data_folder, DATASET_MANIFEST)
+            if self.storage.get_node(manifest_path) == MetadataType.FILE:
+                manifest = json.loads(self.storage.get_data(manifest_path, None))
+                expected = {'version': DATASET_MANIFEST_VERSION,
+                            'format': str(self.args.format),
+                            'num_samples_per_file': self.num_samples,
+                            'num_subfolders_train': self.num_subfolders_train,
+                            'num_subfolders_eval': self.num_subfolders_eval}
+                mismatch = [key for key, value in expected.items() if manifest.get(key) != value]
+                if len(mismatch) > 0:
+                    self.logger.warning(f"{utcnow()} Ignoring manifest {manifest_path}; {mismatch} do not match the configuration")
+                    manifest = None
+        return self.comm.bcast(manifest, root=0)
+
+    def walk_dataset(self, dataset_type, num_subfolders):
+        filenames = self.storage.walk_node(os.path.join(self.args.data_folder, f"{dataset_type}"))
+        if (len(filenames) == 0):
+            return []
+        if self.storage.get_node(
+                os.path.join(self.args.data_folder, f"{dataset_type}",
+                            filenames[0])) == MetadataType.DIRECTORY:
+            assert (num_subfolders == len(filenames))
+            fullpaths = self.storage.walk_node(
+                os.path.join(self.args.data_folder, f"{dataset_type}/*/*.{self.args.format}"),
+                use_pattern=True)
+        else:
+            assert (num_subfolders == 0)
+            fullpaths = [self.storage.get_uri(os.path.join(self.args.data_folder, f"{dataset_type}", entry))
+                        for entry in filenames if entry.endswith(f'{self.args.format}')]
+        return fullpaths
+
+    def sort_file_list(self, fullpaths, num_subfolders):
+        if num_subfolders > 1:
+            files = [self.storage.get_basename(f) for f in fullpaths]
+            idx = np.argsort(files)
+            return [fullpaths[i] for i in idx]
+        return sorted(fullpaths)
+
+    def walk_datasets(self):
+        """
+        Walks the train and valid folders on the ranks selected by file_discovery and broadcasts
+        the sorted file lists to the others.
+        """
+        if self.args.file_discovery is FileDiscoveryType.ALL_RANKS:
+            comm = None
+        elif self.args.file_discovery is FileDiscoveryType.NODE:
+            comm = DLIOMPI.get_instance().node_comm()
+        else:
+            comm = self.comm
+        file_lists = None
+        if comm is None or comm.rank == 0:
+            try:
+                file_lists = [self.sort_file_list(self.walk_dataset(DatasetType.TRAIN, self.num_subfolders_train),
+                                                  self.num_subfolders_train),
+                              self.sort_file_list(self.walk_dataset(DatasetType.VALID, self.num_subfolders_eval),
+                                                  self.num_subfolders_eval)]
+            except Exception as e:
+                # the other ranks would otherwise wait forever in the broadcast
+                file_lists = e
+        if comm is not None:
+            file_lists = comm.bcast(file_lists, root=0)
+        if isinstance(file_lists, Exception):
+            raise file_lists
+        return file_lists
+
+    @dlp.log
+    def discover_files(self):
+        """
+        Lists the train and valid files, from the manifest when there is one or by walking the data folder.
+        """
+        start = time()
+        manifest = None
+        if self.args.use_manifest:
+            manifest = self.load_manifest()
+        if manifest is not None:
+            file_lists = []
+            for dataset_type, num_subfolders in [(DatasetType.TRAIN, self.num_subfolders_train),
+                                                 (DatasetType.VALID, self.num_subfolders_eval)]:
+                fullpaths = [self.storage.get_uri(os.path.join(self.args.data_folder, entry['path']))
+                             for entry in manifest[f"{dataset_type}"]]
+                file_lists.append(self.sort_file_list(fullpaths, num_subfolders))
+            source = "manifest"
+            if self.args.format in [FormatType.INDEXED_BINARY, FormatType.MMAP_INDEXED_BINARY]:
+                self.stats.record_sample_sizes(manifest)
+        else:
+            file_lists = self.walk_datasets()
+            source = f"{self.args.file_discovery} walk"
+        self.logger.debug(f"fullpaths train {file_lists[0]} valid {file_lists[1]}")
+        self.stats.record_file_discovery(source, time() - start)
+        return file_lists
+
     @dlp.log
     def initialize(self):
         """
@@ -167,6 +268,9 @@ class DLIOBenchmark(object):
             self.data_generator.generate()
             # important to have this barrier to ensure that the data generation is done for all the ranks
             self.comm.barrier()
+            self.stats.record_generation(self.data_generator)
+            if self.args.use_manifest:
+                self.data_generator.write_manifest()
             if self.args.my_rank == 0:
                 self.logger.output(f"{utcnow()} Generation done")
 
@@ -179,36 +283,8 @@ class DLIOBenchmark(object):
         self.comm.barrier()
         file_list_train = []
         file_list_eval = []
-        num_subfolders = 0
         if self.args.do_train:
-            for dataset_type in [DatasetType.TRAIN, DatasetType.VALID]:
-                if dataset_type == DatasetType.TRAIN:
-                    num_subfolders = self.num_subfolders_train
-                else:
-                    num_subfolders = self.num_subfolders_eval
-                filenames = self.storage.walk_node(os.path.join(self.args.data_folder, f"{dataset_type}"))
-                if (len(filenames) == 0):
-                    continue
-                if self.storage.get_node(
-                        os.path.join(self.args.data_folder, f"{dataset_type}",
-                                    filenames[0])) == MetadataType.DIRECTORY:
-                    assert (num_subfolders == len(filenames))
-                    fullpaths = self.storage.walk_node(
-                        os.path.join(self.args.data_folder, f"{dataset_type}/*/*.{self.args.format}"),
-                        use_pattern=True)
-                    files = [self.storage.get_basename(f) for f in fullpaths]
-                    idx = np.argsort(files)
-                    fullpaths = [fullpaths[i] for i in idx]
-                else:
-                    assert (num_subfolders == 0)
-                    fullpaths = [self.storage.get_uri(os.path.join(self.args.data_folder, f"{dataset_type}", entry))
-                                for entry in filenames if entry.endswith(f'{self.args.format}')]
-                    fullpaths = sorted(fullpaths)
-                self.logger.debug(f"subfolder {num_subfolders} fullpaths {fullpaths}")
-                if dataset_type is DatasetType.TRAIN:
-                    file_list_train = fullpaths
-                elif dataset_type is DatasetType.VALID:
-                    file_list_eval = fullpaths
+            file_list_train, file_list_eval = self.discover_files()
             if not self.generate_only and self.num_files_train > len(file_list_train):
                 raise Exception(
                     "Not enough training dataset is found; Please run the code with ++workload.workflow.generate_data=True")
@@ -225,6 +301,18 @@ class DLIOBenchmark(object):
                 file_list_eval = file_list_eval[:self.num_files_eval]
         self.args.derive_configurations(file_list_train, file_list_eval)
         self.args.validate()
+        self.node_cache = None
+        if not self.generate_only and self.args.do_train and self.args.node_cache_size > 0:
+            self.setup_node_cache()
+        self.sample_cache_counters = None
+        if not self.generate_only and self.args.do_train and self.args.sample_cache_size > 0:
+            self.sample_cache_counters = CacheCounters(num_rows=CacheCounters.num_rows(self.args.read_threads))
+            self.args.sample_cache_counters_name = self.sample_cache_counters.name
+        self.read_counters = None
+        if not self.generate_only and (self.args.do_train or self.args.do_eval):
+            self.read_counters = ReadCounters(num_rows=ReadCounters.num_rows(self.args.read_threads))
+            self.args.read_counters_name = self.read_counters.name
+        self.stats.read_counters = self.read_counters
         self.checkpointing_mechanism = None
         self.stats.checkpoint_size = 0
         if (not self.generate_only) and (self.do_checkpoint):
@@ -232,6 +320,30 @@ class DLIOBenchmark(object):
             self.stats.checkpoint_size = self.checkpointing_mechanism.checkpoint_size    
         self.comm.barrier()
 
+    def setup_node_cache(self):
+        """
+        Creates the shared memory sample cache of the node on its local rank 0 and attaches the
+        other ranks of the node to it. Every rank gets its own row of counters, which the reader
+        threads and workers of the rank use through args.node_cache_name and args.node_cache_row.
+        """
+        node_comm = DLIOMPI.get_instance().node_comm()
+        slot_size = self.args.node_cache_slot_size
+        if slot_size == 0:
+            slot_size = int(self.args.record_length + 3 * self.args.record_length_stdev)
+        if node_comm.rank == 0:
+            name = NodeSampleCache.new_name()
+            self.node_cache = NodeSampleCache(name, 0, self.args.node_cache_policy, create=True,
+                                              capacity=self.args.node_cache_size, slot_size=slot_size,
+                                              num_rows=node_comm.size)
+        name = node_comm.bcast(name if node_comm.rank == 0 else None, root=0)
+        if node_comm.rank != 0:
+            self.node_cache = NodeSampleCache(name, node_comm.rank, self.args.node_cache_policy)
+        self.args.node_cache_name = name
+        self.args.node_cache_row = node_comm.rank
+        if self.my_rank == 0:
+            self.logger.output(f"{utcnow()} Node sample cache of {self.node_cache.num_slots} slots of "
+                               f"{self.node_cache.slot_size} bytes with {self.args.node_cache_policy} eviction")
+
     @dlp.log
     def _eval(self, epoch):
         """
@@ -287,6 +399,9 @@ class DLIOBenchmark(object):
             self.stats.end_save_ckpt(epoch, block)
             block = block+1
             overall_step = overall_step + 1
+        # the checkpoints to read have to be complete
+        self.checkpointing_mechanism.wait_checkpoints()
+        self.comm.barrier()
         if self.comm.rank == 0:
             self.logger.output(f"{utcnow()} Checkpointing write finished")
     @dlp.log
@@ -414,10 +529,15 @@ class DLIOBenchmark(object):
                     self.stats.end_eval(epoch)
                     self.framework.get_loader(DatasetType.VALID).finalize()
                 self.args.reconfigure(epoch + 1) # reconfigure once per epoch
+                if self.sample_cache_counters is not None:
+                    self.stats.record_sample_cache(epoch, self.sample_cache_counters)
                 self.stats.end_epoch(epoch)
 
         if (self.args.checkpoint_only):
             self._checkpoint()            
+        if self.checkpointing_mechanism is not None:
+            self.stats.record_async_checkpoints(self.checkpointing_mechanism.wait_checkpoints())
+            self.stats.record_checkpoint_loads(self.checkpointing_mechanism.checkpoint_loads)
         self.stats.end_run()
 
     @dlp.log
@@ -446,6 +566,24 @@ class DLIOBenchmark(object):
                         self.storage.delete_node(self.args.data_folder)
                         self.logger.info(f"{utcnow()} Deleted data files")
 
+            self.args.release_sample_maps()
+            if self.node_cache is not None:
+                self.stats.record_node_cache(self.node_cache)
+                self.comm.barrier()
+                self.node_cache.release()
+                self.node_cache.close()
+                self.node_cache = None
+            if self.sample_cache_counters is not None:
+                SampleCache.reset()
+                self.sample_cache_counters.release()
+                self.sample_cache_counters.close()
+                self.sample_cache_counters = None
+            if self.read_counters is not None:
+                ReadCounters.reset()
+                self.stats.read_counters = None
+                self.read_counters.release()
+                self.read_counters.close()
+                self.read_counters = None
             # Save collected stats to disk
             self.stats.finalize()
             self.stats.save_data()
@@ -23,6 +23,7 @@ import pandas as pd
 from dlio_benchmark.utils.utility import str2bool
 from statistics import mean, median, stdev, quantiles
 from dlio_benchmark.utils.config import ConfigArguments, LoadConfig
+from dlio_benchmark.utils.columnar_stats import FILE_PATTERN, STEP_COLUMNS, read_columnar_stats, step_columns
 import hydra
 from omegaconf import DictConfig, OmegaConf
 from hydra import initialize, compose
@@ -30,6 +31,10 @@ import yaml
 import glob
 import numpy as np
 
+# Columns of the Dataframes built from the iostat trace, besides the timestamp, host and disk
+IOSTAT_CPU_STATS = ['user', 'system', 'iowait', 'steal', 'idle']
+IOSTAT_DISK_STATS = ['r/s', 'w/s', 'rMB/s', 'wMB/s', 'r_await', 'w_await', 'aqu-sz']
+
 
 class DLIOPostProcessor:
     def __init__(self, args) -> None:
@@ -82,12 +87,20 @@ class DLIOPostProcessor:
             self.iotrace = None
             print(f"WARNING: missing necessary file: {os.path.join(self.outdir, 'iostat.json')}")
 
+        # with output.format=npz, the stats of all the ranks are in a few stats_{group}.npz files
+        self.columnar_stats = None
+        if len(glob.glob(os.path.join(self.outdir, FILE_PATTERN))) > 0:
+            self.columnar_stats = read_columnar_stats(self.outdir)
+
         try:
             with open(os.path.join(self.outdir, 'per_epoch_stats.json'), 'r') as per_epoch_stats_file:
                 self.per_epoch_stats = json.load(per_epoch_stats_file)
         except: 
             self.per_epoch_stats = None
-            print(f"WARNING: missing necessary file: {os.path.join(self.outdir, 'per_epoch_stats.json')}")
+            if self.columnar_stats is not None and 0 in self.columnar_stats[2]:
+                self.per_epoch_stats = self.columnar_stats[2][0]
+            else:
+                print(f"WARNING: missing necessary file: {os.path.join(self.outdir, 'per_epoch_stats.json')}")
 
         # These ones will be loaded in later
         self.load_and_proc_time_files = [os.path.join(self.outdir, f) for f in load_and_proc_time_files]
@@ -115,77 +128,40 @@ class DLIOPostProcessor:
         all_sample_bandwidth = []
         self.epoch_sample_latencies = {}
         self.epoch_sample_bandwidth = {}
-        self.num_files = len(self.load_and_proc_time_files)
-        # There is one file per worker process, with data
-        # separated by epoch and by phase of training (block, eval)
-        # First, we will combine the different workers' data before
-        # computing overall and per training phase statistics.
-        for file in self.load_and_proc_time_files:
-            logging.info(f"Reading from {file}")
-            with open(file, 'r') as infile:
-                load_and_proc_times = json.load(infile)
-
-                for epoch in self.epochs_list:
-                    logging.debug(f"Processing loading and processing times for epoch {epoch}")
-                    loading_data = load_and_proc_times[epoch]['load']
-
-                    if epoch not in self.epoch_loading_times:
-                        # Initialize structures to hold the data
-                        self.epoch_loading_times[epoch] = {}
-
-                    for phase, phase_loading_times in loading_data.items():
-                        assert isinstance(phase_loading_times, list)
-                        logging.debug(f"Processing loading times for phase {phase}")
-
-                        # The batch size might be different for training vs evals
-                        if re.match(r'eval', phase):
-                            effective_batch_size = self.batch_size_eval
-                        else:
-                            effective_batch_size = self.batch_size
-                        
-                        all_loading_times.extend(phase_loading_times)
-
-
-                        if phase not in self.epoch_loading_times[epoch]:
-                            self.epoch_loading_times[epoch][phase] = phase_loading_times
-                        else:
-                            self.epoch_loading_times[epoch][phase].extend(phase_loading_times)
-
-                    # Same thing for processing times
-                    processing_data = load_and_proc_times[epoch]['proc']
-
-                    if epoch not in self.epoch_sample_latencies:
-                        self.epoch_processing_times[epoch] = {}
-                        self.epoch_sample_latencies[epoch] = {}
-                        self.epoch_sample_bandwidth[epoch] = {}
-
-                    # For each training phase, fetch the loading times and combine them
-                    for phase, phase_processing_times in processing_data.items():
-                        assert isinstance(phase_processing_times, list)
-                        logging.debug(f"Processing processing times for phase {phase}")
-
-                        # The batch size might be different for training vs evals
-                        if re.match(r'eval', phase):
-                            effective_batch_size = self.batch_size_eval
-                        else:
-                            effective_batch_size = self.batch_size
-                        
-                        all_processing_times.extend(phase_processing_times)
-
-                        phase_sample_latencies = [effective_batch_size / time for time in phase_processing_times]
-                        phase_sample_bandwidth = list(np.array(phase_sample_latencies)*self.record_size / 1024./1024)
-                        all_sample_latencies.extend(phase_sample_latencies)
-                        all_sample_bandwidth.extend(phase_sample_bandwidth)
-                        if phase not in self.epoch_sample_latencies[epoch]:
-                            self.epoch_processing_times[epoch][phase] = phase_processing_times
-                            self.epoch_sample_latencies[epoch][phase] = phase_sample_latencies
-                            self.epoch_sample_bandwidth[epoch][phase] = phase_sample_bandwidth 
-                        else:
-                            self.epoch_processing_times[epoch][phase].extend(phase_processing_times)
-                            self.epoch_sample_latencies[epoch][phase].extend(phase_sample_latencies)
-                            self.epoch_sample_bandwidth[epoch][phase].extend(phase_sample_bandwidth)
-
-
+        # One row per step of every rank, epoch and phase of training (block, eval), the rows
+        # of every rank following each other in rank order, as get_stats expects.
+        columns = self.load_step_columns()
+        self.num_files = len(np.unique(columns['rank']))
+        for epoch in self.epochs_list:
+            logging.debug(f"Processing loading and processing times for epoch {epoch}")
+            in_epoch = columns['epoch'] == int(epoch)
+            self.epoch_loading_times[epoch] = {}
+            self.epoch_processing_times[epoch] = {}
+            self.epoch_sample_latencies[epoch] = {}
+            self.epoch_sample_bandwidth[epoch] = {}
+            for phase in np.unique(columns['phase'][in_epoch]):
+                phase = str(phase)
+                rows = in_epoch & (columns['phase'] == phase)
+                # The batch size might be different for training vs evals
+                if re.match(r'eval', phase):
+                    effective_batch_size = self.batch_size_eval
+                else:
+                    effective_batch_size = self.batch_size
+                phase_loading_times = columns['load'][rows]
+                phase_loading_times = phase_loading_times[~np.isnan(phase_loading_times)]
+                phase_processing_times = columns['proc'][rows]
+                phase_processing_times = phase_processing_times[~np.isnan(phase_processing_times)]
+                phase_sample_latencies = effective_batch_size / phase_processing_times
+                phase_sample_bandwidth = phase_sample_latencies * self.record_size / 1024./1024
+
+                all_loading_times.extend(phase_loading_times.tolist())
+                all_processing_times.extend(phase_processing_times.tolist())
+                all_sample_latencies.extend(phase_sample_latencies.tolist())
+                all_sample_bandwidth.extend(phase_sample_bandwidth.tolist())
+                self.epoch_loading_times[epoch][phase] = phase_loading_times.tolist()
+                self.epoch_processing_times[epoch][phase] = phase_processing_times.tolist()
+                self.epoch_sample_latencies[epoch][phase] = phase_sample_latencies.tolist()
+                self.epoch_sample_bandwidth[epoch][phase] = phase_sample_bandwidth.tolist()
 
         # At this point, we should have one big structure containing overall stats, 
         # as well as all the combined loading and processing times for each phase of training
@@ -225,6 +201,20 @@ class DLIOPostProcessor:
                 self.per_epoch_stats[epoch][phase]['MB/s'] = self.get_stats(phase_sample_bandwidth, num_procs=self.comm_size)
 
 
+    def load_step_columns(self):
+        """
+        Returns the step table of the run, from the stats_{group}.npz files or else from the
+        {rank}_output.json files.
+        """
+        if self.columnar_stats is not None:
+            return self.columnar_stats[0]
+        tables = []
+        for rank, file in enumerate(self.load_and_proc_time_files):
+            logging.info(f"Reading from {file}")
+            with open(file, 'r') as infile:
+                tables.append(step_columns(rank, json.load(infile)))
+        return {name: np.concatenate([table[name] for table in tables]) for name in STEP_COLUMNS}
+
     def get_stats(self, series, num_procs=1):
         """
         Return a dictionary with various statistics of the given series
@@ -265,53 +255,63 @@ class DLIOPostProcessor:
         Parse the iostat JSON file and return disk and cpu usage information
         """
         logging.info("Parsing iostat trace")
-        # TODO: Support tracing on multiple hosts, here we only get data for the first
-        iotrace = self.iotrace['sysstat']['hosts'][0]['statistics']
+        hosts = self.iotrace['sysstat']['hosts']
         # We will convert the iostat JSON output into a Dataframe indexed by timestamp 
         # Timestamps are already in UTC (when generated from within the container)
         # Pandas can read the format, then we can convert to numpy datetime64
-        cpu_stats = pd.DataFrame(columns=['timestamp', 'user', 'system', 'iowait', 'steal', 'idle'])
+        # The columns are gathered as lists and turned into Dataframes at once, as appending
+        # rows one by one is quadratic in the length of the trace
+        cpu_columns = {name: [] for name in ['host'] + IOSTAT_CPU_STATS}
         # The following columns are available:
         # ['timestamp', 'disk', 'r/s', 'w/s', 'rMB/s', 'wMB/s', 'r_await', 'w_await', 'rareq-sz', 'wareq-sz', 'aqu-sz'])
-        disk_stats = pd.DataFrame(columns=['timestamp', 'disk', 'r/s', 'w/s', 'rMB/s', 'wMB/s', 'r_await', 'w_await', 'aqu-sz'])
-
-        cpu_i = disk_i = 0
-        for i, item in enumerate(iotrace):
-            if i % 100 == 0:
-                logging.info(f"Processing iostat item {i}")
-
-            ts = item['timestamp']
-            # Need to convert to UTC, this will depend on your timezone
-
-            cpu = item['avg-cpu']
-            # Combine user and nice cpu time into one for conciseness
-            cpu_stats.loc[cpu_i] = [ts, cpu['user'] + cpu['nice'], cpu['system'], cpu['iowait'], cpu['steal'], cpu['idle']]
-            cpu_i += 1
-            # Add one row per disk
-            for disk in item['disk']:
-                row = [ts, disk['disk_device'], disk['r/s'], disk['w/s'], disk['rMB/s'], disk['wMB/s'], disk['r_await'], disk['w_await'], disk['aqu-sz']]
-                disk_stats.loc[disk_i] = row
-                disk_i += 1
-
-        # Convert timestamp fields to datatime
-        cpu_stats.timestamp = pd.to_datetime(cpu_stats.timestamp)
-        disk_stats.timestamp = pd.to_datetime(disk_stats.timestamp)
-        self.disk_stats = disk_stats
+        disk_columns = {name: [] for name in ['host', 'disk'] + IOSTAT_DISK_STATS}
+        timestamps = []
+        disks_per_item = []
+
+        for host in hosts:
+            nodename = host.get('nodename', '')
+            logging.info(f"Processing {len(host['statistics'])} iostat items of host {nodename}")
+            for item in host['statistics']:
+                timestamps.append(item['timestamp'])
+                cpu = item['avg-cpu']
+                cpu_columns['host'].append(nodename)
+                # Combine user and nice cpu time into one for conciseness
+                cpu_columns['user'].append(cpu['user'] + cpu['nice'])
+                for stat in IOSTAT_CPU_STATS[1:]:
+                    cpu_columns[stat].append(cpu[stat])
+                # Add one row per disk, named after the host as well when several hosts were traced
+                for disk in item['disk']:
+                    disk_columns['host'].append(nodename)
+                    disk_columns['disk'].append(f"{nodename}:{disk['disk_device']}" if len(hosts) > 1 else disk['disk_device'])
+                    for stat in IOSTAT_DISK_STATS:
+                        disk_columns[stat].append(disk[stat])
+                disks_per_item.append(len(item['disk']))
+
+        # Convert timestamp fields to datatime, once per item
+        timestamps = pd.to_datetime(pd.Series(timestamps, dtype=object)).to_numpy()
+        cpu_stats = pd.DataFrame({'timestamp': timestamps, **cpu_columns})
+        disk_stats = pd.DataFrame({'timestamp': np.repeat(timestamps, disks_per_item), **disk_columns})
+        # The hosts are interleaved by time, keeping the order of the trace for equal timestamps
+        self.cpu_stats = cpu_stats.sort_values('timestamp', kind='stable', ignore_index=True)
+        self.disk_stats = disk_stats.sort_values('timestamp', kind='stable', ignore_index=True)
         self.disks = pd.unique(self.disk_stats['disk'])
-        self.cpu_stats = cpu_stats
 
 
     def extract_stats_from_iostat_trace(self):
         logging.info("Extracting stats from iostat trace")
 
         # Helper functions
+        def split_columns(df, stats):
+            return df['timestamp'].to_numpy(), {stat: df[stat].to_numpy() for stat in stats}
+
         def get_series_daterange(series, start, end): 
-            data = series[series['timestamp'] >= start]
-            data = data[data['timestamp'] < end]
-            return data
+            # The timestamps are sorted, the rows in [start, end) are found by binary search
+            timestamps, columns = series
+            lo, hi = np.searchsorted(timestamps, np.array([start, end], dtype=timestamps.dtype))
+            return {stat: values[lo:hi] for stat, values in columns.items()}
 
         def addto_and_return_stats(addto, df, stat):
-            data = df[stat].to_list()
+            data = df[stat].tolist()
             addto += data
             if len(data) < 2:
                 logging.warning(f'Less than 2 data points for {stat}')
@@ -341,6 +341,10 @@ class DLIOPostProcessor:
             for acc in disk_accumulators:
                 acc[disk] = []
 
+        disk_series = {disk: split_columns(self.disk_stats[self.disk_stats['disk'] == disk], disk_stats_to_extract)
+                       for disk in self.disks}
+        cpu_series = split_columns(self.cpu_stats, cpu_stats_to_extract)
+
         for epoch in self.epochs_list:
 
 
@@ -354,22 +358,18 @@ class DLIOPostProcessor:
 
                 start, end = pd.to_datetime(phase_data['start']), pd.to_datetime(phase_data['end'])
 
-                disk_io = get_series_daterange(self.disk_stats, start, end)
-
                 self.per_epoch_stats[epoch][phase]['disk'] = {}
 
                 for disk in self.disks:
 
                     self.per_epoch_stats[epoch][phase]['disk'][disk] = {}
 
-                    disk_data = disk_io[disk_io['disk'] == disk]
+                    disk_data = get_series_daterange(disk_series[disk], start, end)
 
                     for i, stat in enumerate(disk_stats_to_extract):
-                        data = disk_data[stat].to_list()
-                        disk_accumulators[i][disk] += data
                         self.per_epoch_stats[epoch][phase]['disk'][disk][stat] = addto_and_return_stats(disk_accumulators[i][disk], disk_data, stat)
 
-                cpu_data = get_series_daterange(self.cpu_stats, start, end)
+                cpu_data = get_series_daterange(cpu_series, start, end)
 
                 self.per_epoch_stats[epoch][phase]['cpu'] = {}
                 for i, stat in enumerate(cpu_stats_to_extract):
@@ -603,6 +603,9 @@ def main():
 
     # figuring out the number of process from the outputs
     args.num_proc = len(glob.glob(args.output_folder + "/*_output.json"))
+    if args.num_proc == 0:
+        with open(os.path.join(args.output_folder, 'summary.json'), 'r') as summary_file:
+            args.num_proc = json.load(summary_file)['num_accelerators']
 
     # load the yaml file and override the command line argument
     base_config = os.path.join(args.output_folder, args.hydra_folder, "config.yaml")
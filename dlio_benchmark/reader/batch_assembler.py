@@ -0,0 +1,115 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import mmap
+
+import numpy as np
+
+from dlio_benchmark.common.enumerations import BufferBacking
+
+
+def allocate_buffer(shape, dtype, backing, logger=None):
+    """
+    Returns (array, owner) where owner is the object keeping the memory of the array alive:
+    a torch tensor for pinned memory and, when torch is installed, for shared memory, and an
+    anonymous shared mapping, which forked processes see too, otherwise. Pinned memory falls
+    back to the heap when torch or CUDA is not available.
+    """
+    if backing is BufferBacking.HEAP:
+        return np.empty(shape, dtype=dtype), None
+    try:
+        import torch
+        tensor = torch.from_numpy(np.empty(0, dtype=dtype))
+        if backing is BufferBacking.PINNED:
+            tensor = torch.empty(shape, dtype=tensor.dtype, pin_memory=True)
+        else:
+            tensor = torch.empty(shape, dtype=tensor.dtype).share_memory_()
+        return tensor.numpy(), tensor
+    except ImportError:
+        if backing is BufferBacking.SHARED:
+            mapping = mmap.mmap(-1, max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+            return np.ndarray(shape, dtype=dtype, buffer=mapping), mapping
+        if logger is not None:
+            logger.warning("torch is not installed, batch buffers are not pinned")
+    except RuntimeError as e:
+        if logger is not None:
+            logger.warning(f"Cannot pin batch buffers ({e}), falling back to regular memory")
+    return np.empty(shape, dtype=dtype), None
+
+
+class BatchAssembler(object):
+    """
+    Assembles batches in a ring of depth preallocated (batch_size, H, W) buffers. Samples are
+    written into their slot of the current buffer and every full batch is returned as that
+    buffer, which is only written again depth batches later. Consumers that keep a batch longer
+    than that must copy it.
+    """
+
+    def __init__(self, batch_size, shape, dtype=np.uint8, depth=2, backing=BufferBacking.HEAP, logger=None):
+        self.batch_size = batch_size
+        self.buffers = []
+        self.owners = []
+        for _ in range(depth):
+            buffer, owner = allocate_buffer((batch_size,) + tuple(shape), dtype, backing, logger)
+            self.buffers.append(buffer)
+            self.owners.append(owner)
+        self.current = 0
+        self.position = 0
+
+    def add(self, image):
+        self.buffers[self.current][self.position] = image
+        self.position += 1
+
+    def slot(self):
+        """
+        Returns the next slot of the current batch for the caller to write a sample into.
+        """
+        slot = self.buffers[self.current][self.position]
+        self.position += 1
+        return slot
+
+    def full(self):
+        return self.position == self.batch_size
+
+    def pad(self, image):
+        """
+        Fills the remaining slots of the current batch with image.
+        """
+        if self.position < self.batch_size:
+            self.buffers[self.current][self.position:] = image
+            self.position = self.batch_size
+
+    def pop(self):
+        batch = self.buffers[self.current]
+        self.current = (self.current + 1) % len(self.buffers)
+        self.position = 0
+        return batch
+
+    def pop_tensor(self):
+        """
+        Returns the batch as a torch tensor sharing its memory: the pinned or shared memory
+        tensor the buffer was allocated as, so that torch neither copies it to pin it nor to hand
+        it over from a worker process.
+        """
+        import torch
+        owner = self.owners[self.current]
+        batch = self.pop()
+        return owner if isinstance(owner, torch.Tensor) else torch.from_numpy(batch)
+
+    def close(self):
+        # batches still referenced by the consumer keep their memory alive
+        self.buffers = []
+        self.owners = []
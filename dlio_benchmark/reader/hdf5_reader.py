@@ -17,6 +17,7 @@
 import logging
 
 import h5py
+import numpy as np
 
 from dlio_benchmark.common.constants import MODULE_DATA_READER
 from dlio_benchmark.utils.utility import Profile
@@ -31,6 +32,7 @@ class HDF5Reader(FormatReader):
     @dlp.log_init
     def __init__(self, dataset_type, thread_index, epoch):
         super().__init__(dataset_type, thread_index)
+        self.sample_range_map = {}
 
     @dlp.log
     def open(self, filename):
@@ -46,6 +48,24 @@ class HDF5Reader(FormatReader):
         super().get_sample(filename, sample_index)
         image = self.open_file_map[filename]['records'][sample_index]
         dlp.update(image_size=image.nbytes)
+        return image
+
+    def sample_ranges(self, filename):
+        """
+        Samples are contiguous in the file only when the records dataset is neither chunked nor
+        compressed, in which case h5py reports where its data starts.
+        """
+        if filename not in self.sample_range_map:
+            ranges = None
+            with h5py.File(filename, 'r') as file:
+                records = file['records']
+                offset = records.id.get_offset()
+                if offset is not None:
+                    size = records.dtype.itemsize * int(np.prod(records.shape[1:]))
+                    ranges = (offset + size * np.arange(records.shape[0], dtype=np.int64),
+                              np.full(records.shape[0], size, dtype=np.int64))
+            self.sample_range_map[filename] = ranges
+        return self.sample_range_map[filename]
 
     def next(self):
         for batch in super().next():
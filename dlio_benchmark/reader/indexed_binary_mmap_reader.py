@@ -50,7 +50,7 @@ class IndexedBinaryMMapReader(FormatReader):
         f.readinto(a)
         return a
 
-    def load_index_file(self, global_sample_idx, filename, sample_index):
+    def load_index_file(self, filename):
         if filename not in self.file_map_ibr:
             offset_file = self.index_file_path_off(filename)
             sz_file = self.index_file_path_size(filename)
@@ -68,11 +68,11 @@ class IndexedBinaryMMapReader(FormatReader):
     @dlp.log
     def load_index(self):
         if self._args.data_loader_sampler == DataLoaderSampler.ITERATIVE:
-            for global_sample_idx, filename, sample_index in self.file_map[self.thread_index]:
-                self.load_index_file(global_sample_idx, filename, sample_index)
+            for filename in self.file_map[self.thread_index].filenames():
+                self.load_index_file(filename)
         elif self._args.data_loader_sampler == DataLoaderSampler.INDEX:
-            for global_sample_idx, (filename, sample_index) in self.global_index_map.items():
-                self.load_index_file(global_sample_idx, filename, sample_index)
+            for filename in self.global_index_map.filenames():
+                self.load_index_file(filename)
 
 
 
@@ -95,6 +95,7 @@ class IndexedBinaryMMapReader(FormatReader):
         size = self.file_map_ibr[filename][1][sample_index]
         image = buffer[offset:offset+size]
         dlp.update(image_size=size)
+        return image
 
     def next(self):
         for batch in super().next():
@@ -103,20 +104,19 @@ class IndexedBinaryMMapReader(FormatReader):
     @dlp.log
     def read_index(self, image_idx, step):
         filename, sample_index = self.global_index_map[image_idx]
-        self.get_sample(filename, sample_index)
-        self.preprocess()
-        return self._args.resized_image
+        image = self.get_sample(filename, sample_index)
+        return self.preprocess(self.decode(image))
 
     @dlp.log
     def finalize(self):
         super().finalize()
         if self._args.data_loader_sampler == DataLoaderSampler.ITERATIVE:
-            for global_sample_idx, filename, sample_index in self.file_map[self.thread_index]:
+            for filename in self.file_map[self.thread_index].filenames():
                 self.buffer_map[filename]._mmap.close()
                 self.file_map_ibr[filename][0]._mmap.close()
                 self.file_map_ibr[filename][1]._mmap.close()
         elif self._args.data_loader_sampler == DataLoaderSampler.INDEX:
-            for global_sample_idx, (filename, sample_index) in self.global_index_map.items():
+            for filename in self.global_index_map.filenames():
                 self.buffer_map[filename]._mmap.close()
                 self.file_map_ibr[filename][0]._mmap.close()
                 self.file_map_ibr[filename][1]._mmap.close()
@@ -14,6 +14,7 @@
    See the License for the specific language governing permissions and
    limitations under the License.
 """
+import asyncio
 import logging
 
 import numpy as np
@@ -22,6 +23,7 @@ import struct
 from dlio_benchmark.common.constants import MODULE_DATA_READER
 from dlio_benchmark.common.enumerations import DataLoaderSampler
 from dlio_benchmark.reader.reader_handler import FormatReader
+from dlio_benchmark.storage.storage_factory import StorageFactory
 from dlio_benchmark.utils.utility import Profile
 
 dlp = Profile(MODULE_DATA_READER)
@@ -36,6 +38,7 @@ class IndexedBinaryReader(FormatReader):
     def __init__(self, dataset_type, thread_index, epoch):
         super().__init__(dataset_type, thread_index)
         self.file_map_ibr = {}
+        self.storage = None
         self.load_index()
 
     def index_file_path_off(self, prefix_path):
@@ -49,7 +52,7 @@ class IndexedBinaryReader(FormatReader):
         f.readinto(a)
         return a
 
-    def load_index_file(self, global_sample_idx, filename, sample_index):
+    def load_index_file(self, filename):
         if filename not in self.file_map_ibr:
             offset_file = self.index_file_path_off(filename)
             sz_file = self.index_file_path_size(filename)
@@ -65,11 +68,11 @@ class IndexedBinaryReader(FormatReader):
     @dlp.log
     def load_index(self):
         if self._args.data_loader_sampler == DataLoaderSampler.ITERATIVE:
-            for global_sample_idx, filename, sample_index in self.file_map[self.thread_index]:
-                self.load_index_file(global_sample_idx, filename, sample_index)
+            for filename in self.file_map[self.thread_index].filenames():
+                self.load_index_file(filename)
         elif self._args.data_loader_sampler == DataLoaderSampler.INDEX:
-            for global_sample_idx, (filename, sample_index) in self.global_index_map.items():
-                self.load_index_file(global_sample_idx, filename, sample_index)
+            for filename in self.global_index_map.filenames():
+                self.load_index_file(filename)
 
 
 
@@ -95,6 +98,28 @@ class IndexedBinaryReader(FormatReader):
         image = np.empty(size, dtype=np.uint8)
         file.readinto(image)
         dlp.update(image_size=size)
+        return image
+
+    async def read_sample_async(self, filename, sample_index, semaphore):
+        offset = int(self.file_map_ibr[filename][0][sample_index])
+        size = int(self.file_map_ibr[filename][1][sample_index])
+        async with semaphore:
+            return np.frombuffer(await self.storage.get_data_async(filename, offset, size), dtype=np.uint8)
+
+    async def read_run_async(self, local, filename, sample_indices, semaphore):
+        """
+        Issues one ranged storage read per sample, so a run keeps up to io_queue_depth reads in flight.
+        """
+        if self.storage is None:
+            self.storage = StorageFactory().get_storage(self._args.storage_type, self._args.storage_root)
+        images = await asyncio.gather(*[self.read_sample_async(filename, sample_index, semaphore)
+                                        for sample_index in sample_indices])
+        self.count_read(sum(image.nbytes for image in images), 0)
+        return images
+
+    def sample_ranges(self, filename):
+        self.load_index_file(filename)
+        return self.file_map_ibr[filename]
 
     def next(self):
         for batch in super().next():
@@ -46,6 +46,7 @@ class NPZReader(FormatReader):
         super().get_sample(filename, sample_index)
         image = self.open_file_map[filename][..., sample_index]
         dlp.update(image_size=image.nbytes)
+        return image
 
     def next(self):
         for batch in super().next():
@@ -0,0 +1,63 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import threading
+
+from dlio_benchmark.reader.sample_cache import CacheCounters
+
+
+def sample_nbytes(sample):
+    """
+    Bytes of a sample as returned by get_sample: an array, a buffer or nothing.
+    """
+    if sample is None:
+        return 0
+    nbytes = getattr(sample, 'nbytes', None)
+    return int(nbytes) if nbytes is not None else len(sample)
+
+
+class ReadCounters(CacheCounters):
+    """
+    Bytes read from storage and samples delivered by the readers of a rank, one row per reader laid out like the
+    sample cache counters, kept in shared memory so that the counts of data loader worker
+    processes reach the rank. The counts are cumulative over the run; the stats counter turns
+    their differences into bytes per step.
+    """
+    BYTES, SAMPLES = 0, 1
+    COLUMNS = 2
+    instances = {}
+    # readers such as the TFRecord one count from several threads of the process
+    lock = threading.Lock()
+
+    @staticmethod
+    def get_instance(name):
+        """
+        Returns the counters attached to name, attaching them once per process since data
+        loaders create new readers every epoch.
+        """
+        if name not in ReadCounters.instances:
+            ReadCounters.instances[name] = ReadCounters(name)
+        return ReadCounters.instances[name]
+
+    @staticmethod
+    def add(row, nbytes, samples):
+        with ReadCounters.lock:
+            row[ReadCounters.BYTES] += nbytes
+            row[ReadCounters.SAMPLES] += samples
+
+    @staticmethod
+    def reset():
+        ReadCounters.instances = {}
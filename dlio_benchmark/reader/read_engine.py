@@ -0,0 +1,177 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import os
+
+import numpy as np
+
+try:
+    from liburing import Ring, Cqe, Iovec, io_uring_queue_init, io_uring_queue_exit, io_uring_get_sqe, \
+        io_uring_prep_readv, io_uring_sqe_set_data64, io_uring_submit, io_uring_wait_cqe, io_uring_cqe_get_data64, \
+        io_uring_cqe_seen
+    IO_URING_AVAILABLE = True
+except ImportError:
+    IO_URING_AVAILABLE = False
+
+from dlio_benchmark.common.enumerations import ReadEngine
+
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+
+class ReadPlan(object):
+    """
+    Reads of a batch of samples laid out for vectored I/O. The samples are sorted by file and
+    offset and given consecutive slots of one buffer. Samples of the same file that are adjacent,
+    or separated by at most gap bytes, are merged into one vector served by a single request;
+    the bytes between them are read into a scratch buffer and dropped.
+    views[i] is the buffer slot of the i-th requested sample.
+    """
+
+    def __init__(self, file_ids, offsets, sizes, buffer=None, gap=0, scratch=None):
+        file_ids = np.asarray(file_ids, dtype=np.int64)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        sizes = np.asarray(sizes, dtype=np.int64)
+        order = np.lexsort((offsets, file_ids))
+        file_ids, offsets, sizes = file_ids[order], offsets[order], sizes[order]
+        slots = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=slots[1:])
+        self.nbytes = int(slots[-1])
+        if buffer is None or len(buffer) < self.nbytes:
+            buffer = np.empty(self.nbytes, dtype=np.uint8)
+        self.buffer = buffer[:self.nbytes]
+        if gap > 0 and (scratch is None or len(scratch) < gap):
+            scratch = np.empty(gap, dtype=np.uint8)
+        file_ids, offsets, sizes, slots = file_ids.tolist(), offsets.tolist(), sizes.tolist(), slots.tolist()
+        sorted_views = [self.buffer[start:end] for start, end in zip(slots[:-1], slots[1:])]
+        self.views = [None] * len(order)
+        for position, index in enumerate(order.tolist()):
+            self.views[index] = sorted_views[position]
+        # (file id, file offset, views, bytes) of every vector, with at most IOV_MAX views each
+        self.vectors = []
+        self.gap_bytes = 0
+        end = None
+        for position in range(len(order)):
+            file_id, offset, size = file_ids[position], offsets[position], sizes[position]
+            vector = self.vectors[-1] if len(self.vectors) > 0 else None
+            if vector is not None and vector[0] == file_id and end <= offset <= end + gap \
+                    and len(vector[2]) + 2 <= IOV_MAX:
+                if offset > end:
+                    vector[2].append(scratch[:offset - end])
+                    self.gap_bytes += offset - end
+                vector[2].append(sorted_views[position])
+                vector[3] += offset + size - end
+            else:
+                self.vectors.append([file_id, offset, [sorted_views[position]], size])
+            end = offset + size
+
+    def __len__(self):
+        return len(self.vectors)
+
+
+class PreadvEngine(object):
+    """
+    Issues one os.preadv per vector of a plan.
+    """
+
+    def __init__(self, queue_depth, gap=0):
+        self.queue_depth = queue_depth
+        self.gap = gap
+        self.buffer = None
+        self.scratch = np.empty(gap, dtype=np.uint8) if gap > 0 else None
+
+    def plan(self, file_ids, offsets, sizes):
+        """
+        Plans the reads of a batch into the buffer of the engine, which is reused by the next
+        batch, so the views of a plan are only valid until the next one is made.
+        """
+        plan = ReadPlan(file_ids, offsets, sizes, self.buffer, self.gap, self.scratch)
+        if self.buffer is None or len(plan.buffer) > len(self.buffer):
+            self.buffer = plan.buffer
+        return plan
+
+    def read(self, fds, plan):
+        for file_id, offset, views, nbytes in plan.vectors:
+            count = os.preadv(fds[file_id], views, offset)
+            if count != nbytes:
+                raise Exception(f"Short read of {count} bytes instead of {nbytes} at offset {offset}")
+        return len(plan)
+
+    def close(self):
+        self.buffer = None
+
+
+class IOUringEngine(PreadvEngine):
+    """
+    Submits the vectors of a plan as readv operations on an io_uring, up to queue_depth at a time,
+    so a batch costs one submission per queue_depth vectors.
+    """
+
+    def __init__(self, queue_depth, gap=0):
+        super().__init__(queue_depth, gap)
+        self.ring = Ring()
+        self.cqe = Cqe()
+        io_uring_queue_init(queue_depth, self.ring)
+
+    def read(self, fds, plan):
+        vectors = plan.vectors
+        for first in range(0, len(vectors), self.queue_depth):
+            # the Iovec objects must outlive the completion of their operation
+            submitted = []
+            for index in range(first, min(first + self.queue_depth, len(vectors))):
+                file_id, offset, views, nbytes = vectors[index]
+                iovec = Iovec([memoryview(view) for view in views])
+                sqe = io_uring_get_sqe(self.ring)
+                io_uring_prep_readv(sqe, fds[file_id], iovec, offset)
+                io_uring_sqe_set_data64(sqe, index)
+                submitted.append(iovec)
+            io_uring_submit(self.ring)
+            for _ in submitted:
+                io_uring_wait_cqe(self.ring, self.cqe)
+                index = io_uring_cqe_get_data64(self.cqe[0])
+                count = self.cqe[0].res
+                io_uring_cqe_seen(self.ring, self.cqe[0])
+                if count != vectors[index][3]:
+                    raise Exception(f"io_uring read of vector {index} returned {count} instead of {vectors[index][3]} bytes")
+        return len(vectors)
+
+    def close(self):
+        super().close()
+        if self.ring is not None:
+            io_uring_queue_exit(self.ring)
+            self.ring = None
+
+
+def get_read_engine(read_engine, queue_depth, gap=0, logger=None):
+    """
+    Returns the engine for read_engine, or None for one read per sample. io_uring falls back to
+    preadv when liburing is not installed or the kernel refuses to set up a ring.
+    """
+    if read_engine is ReadEngine.IO_URING:
+        if IO_URING_AVAILABLE:
+            try:
+                return IOUringEngine(queue_depth, gap)
+            except Exception as e:
+                if logger is not None:
+                    logger.warning(f"Cannot set up io_uring ({e}), falling back to preadv")
+        elif logger is not None:
+            logger.warning("liburing is not installed, falling back to preadv")
+        return PreadvEngine(queue_depth, gap)
+    if read_engine is ReadEngine.PREADV:
+        return PreadvEngine(queue_depth, gap)
+    return None
@@ -17,12 +17,24 @@
 from abc import ABC, abstractmethod
 
 from dlio_benchmark.common.enumerations import FrameworkType, Shuffle, FileAccess, DatasetType, MetadataType, DataLoaderType, \
-    ReadType
+    ReadType, ReadEngine
+from dlio_benchmark.reader.read_engine import get_read_engine
+from dlio_benchmark.reader.sample_cache import NodeSampleCache, SampleCache, CacheCounters
+from dlio_benchmark.reader.read_counters import ReadCounters, sample_nbytes
+from dlio_benchmark.reader.batch_assembler import BatchAssembler
+from dlio_benchmark.reader.transforms import crop_resize, TransformChain
 from dlio_benchmark.framework.framework_factory import FrameworkFactory
 from dlio_benchmark.storage.storage_factory import StorageFactory
 from dlio_benchmark.utils.utility import utcnow
 from dlio_benchmark.utils.utility import Profile
 from dlio_benchmark.utils.config import ConfigArguments
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import itertools
+import threading
+from time import time
 import numpy as np
 import os
 import math
@@ -44,6 +56,8 @@ class FormatReader(ABC):
             f"Loading {self.__class__.__qualname__} reader on thread {self.thread_index} from rank {self._args.my_rank}")
         self.dataset_type = dataset_type
         self.open_file_map = {}
+        self.thread_readers = []
+        self.index_assembler = None
 
         if FormatReader.read_images is None:
             FormatReader.read_images = 0
@@ -57,12 +71,65 @@ class FormatReader(ABC):
         else:
             self.file_map = self._args.val_file_map
             self.global_index_map = self._args.val_global_index_map
+        self.node_cache = None
+        if self._args.node_cache_name is not None:
+            self.node_cache = NodeSampleCache(self._args.node_cache_name, self._args.node_cache_row,
+                                              self._args.node_cache_policy)
+        self.transforms = None
+        if len(self._args.transforms) > 0:
+            rng = np.random.default_rng([self._args.seed, self._args.my_rank, thread_index + 1])
+            self.transforms = TransformChain(self._args.transforms, rng)
+        self.sample_cache = None
+        if self._args.sample_cache_counters_name is not None:
+            self.sample_cache = SampleCache.get_instance(dataset_type, thread_index, self._args.sample_cache_size,
+                                                         self._args.sample_cache_policy,
+                                                         self._args.sample_cache_counters_name,
+                                                         CacheCounters.row(dataset_type, thread_index,
+                                                                           self._args.read_threads))
+        self.read_counts = None
+        if self._args.read_counters_name is not None:
+            counters = ReadCounters.get_instance(self._args.read_counters_name)
+            self.read_counts = counters.counters[ReadCounters.row(dataset_type, thread_index, self._args.read_threads)]
+
+    def count_read(self, nbytes, samples):
+        """
+        Adds the bytes the reader read from storage and the samples it delivered to its row of
+        the read counters, which the stats counter turns into the I/O bandwidth.
+        """
+        if self.read_counts is not None:
+            ReadCounters.add(self.read_counts, nbytes, samples)
 
     @dlp.log
     def preprocess(self, a=None):
         sleep(self._args.preprocess_time)
+        if self.transforms is not None and a is not None:
+            a = self.transforms(a)
         return a
 
+    def padding_sample(self):
+        """
+        Returns the sample filling the end of an incomplete last batch.
+        """
+        if self.transforms is None:
+            return self._args.resized_image
+        return self.transforms(self._args.resized_image)
+
+    @dlp.log
+    def decode(self, image, out=None):
+        """
+        Returns what the data loader gets for a sample: with faithful_decode, the decoded sample
+        center cropped and resized to the shape of the resized image, written into out when
+        given; otherwise the resized image itself.
+        """
+        if not self._args.faithful_decode or image is None:
+            if out is not None:
+                out[...] = self._args.resized_image
+                return out
+            return self._args.resized_image
+        resized = crop_resize(image, self._args.max_dimension, out)
+        dlp.update(image_size=resized.nbytes)
+        return resized
+
     @abstractmethod
     def open(self, filename):
         return 
@@ -75,6 +142,242 @@ class FormatReader(ABC):
     def get_sample(self, filename, sample_index):
         return
 
+    def cached(self, filename, sample_index):
+        """
+        Returns the sample from the cache of the reader or from the node cache, or None when it
+        has to be read from storage.
+        """
+        image = None
+        if self.sample_cache is not None:
+            image = self.sample_cache.get(filename, sample_index)
+        if image is None and self.node_cache is not None:
+            image = self.node_cache.get(filename, sample_index)
+            if image is not None and self.sample_cache is not None:
+                self.sample_cache.put(filename, sample_index, image)
+        return image
+
+    def cache_sample(self, filename, sample_index, image):
+        if image is None:
+            return
+        if self.sample_cache is not None:
+            self.sample_cache.put(filename, sample_index, image)
+        if self.node_cache is not None:
+            self.node_cache.put(filename, sample_index, image)
+
+    def load_sample(self, filename, sample_index):
+        """
+        Reads a sample missing from the caches from the open file, caches it and counts its
+        bytes, so that the samples served by the caches stay out of the I/O bandwidth.
+        """
+        image = self.get_sample(filename, sample_index)
+        self.cache_sample(filename, sample_index, image)
+        self.count_read(sample_nbytes(image), 0)
+        return image
+
+    def read_samples(self, samples):
+        """
+        Opens, reads and closes the files of the samples one after another. Like the other read
+        modes, it yields (global sample index, filename, sample index, sample) tuples.
+        """
+        image_processed = 0
+        for global_sample_idx, filename, sample_index in samples:
+            image = self.cached(filename, sample_index)
+            if image is None:
+                if filename not in self.open_file_map or self.open_file_map[filename] is None:
+                    self.open_file_map[filename] = self.open(filename)
+                image = self.load_sample(filename, sample_index)
+            yield global_sample_idx, filename, sample_index, image
+            image_processed += 1
+            if image_processed % self._args.num_samples_per_file == 0 and self.open_file_map.get(filename) is not None:
+                self.close(filename)
+                self.open_file_map[filename] = None
+
+    def sample_ranges(self, filename):
+        """
+        Returns the (offsets, sizes) arrays locating every sample of a file in its bytes, or None
+        when the samples of the file are not stored in contiguous byte ranges.
+        """
+        return None
+
+    def read_batches(self, samples):
+        """
+        Reads the samples batch by batch through the read engine and yields them in file_map order.
+        """
+        self.read_engine = get_read_engine(self._args.read_engine, self._args.io_queue_depth,
+                                           self._args.read_gap_tolerance, self.logger)
+        self.read_requests = 0
+        self.read_sample_requests = 0
+        samples = iter(samples)
+        try:
+            while True:
+                batch = list(itertools.islice(samples, self.batch_size))
+                if len(batch) == 0:
+                    break
+                images = self.read_batch(batch)
+                for (global_sample_idx, filename, sample_index), image in zip(batch, images):
+                    yield global_sample_idx, filename, sample_index, image
+        finally:
+            self.read_engine.close()
+            self.read_engine = None
+            if self.read_requests > 0:
+                self.logger.debug(f"{utcnow()} Thread {self.thread_index} rank {self._args.my_rank} merged "
+                                  f"{self.read_sample_requests} sample reads into {self.read_requests} requests "
+                                  f"({self.read_sample_requests / self.read_requests:.2f}x fewer)")
+
+    @dlp.log
+    def read_batch(self, batch):
+        """
+        Reads the samples of a batch with one request per run of adjacent or nearby samples.
+        Samples of files without sample_ranges are read one after another. Returns the samples in
+        batch order; those read through the engine are views of its buffer, valid until the next
+        batch is read.
+        """
+        images = [self.cached(filename, sample_index) for _, filename, sample_index in batch]
+        missing = [position for position, image in enumerate(images) if image is None]
+        positions = [position for position in missing if self.sample_ranges(batch[position][1]) is not None]
+        for filename, run in itertools.groupby([position for position in missing
+                                                if self.sample_ranges(batch[position][1]) is None],
+                                               key=lambda position: batch[position][1]):
+            self.open_file_map[filename] = self.open(filename)
+            for position in run:
+                images[position] = self.load_sample(filename, batch[position][2])
+            self.close(filename)
+            self.open_file_map[filename] = None
+        if len(positions) == 0:
+            return images
+        ranged = [batch[position] for position in positions]
+        filenames = list(dict.fromkeys(filename for _, filename, _ in ranged))
+        file_ids = {filename: file_id for file_id, filename in enumerate(filenames)}
+        plan = self.read_engine.plan([file_ids[filename] for _, filename, _ in ranged],
+                                     [self.sample_ranges(filename)[0][sample_index] for _, filename, sample_index in ranged],
+                                     [self.sample_ranges(filename)[1][sample_index] for _, filename, sample_index in ranged])
+        fds = [os.open(filename, os.O_RDONLY) for filename in filenames]
+        try:
+            start = time()
+            requests = self.read_engine.read(fds, plan)
+            latency = time() - start
+        finally:
+            for fd in fds:
+                os.close(fd)
+        self.read_requests += requests
+        self.read_sample_requests += len(ranged)
+        iops = requests / latency if latency > 0 else 0.0
+        self.logger.debug(f"{utcnow()} Read {len(ranged)} samples ({plan.nbytes} bytes, {plan.gap_bytes} gap bytes) "
+                          f"from {len(filenames)} files with {requests} requests in {latency:.6f} s ({iops:.1f} IOPS)")
+        dlp.update(image_size=plan.nbytes, args={'samples': len(ranged), 'requests': requests,
+                                                  'gap_bytes': plan.gap_bytes, 'latency': latency, 'iops': iops})
+        for position, (_, filename, sample_index), view in zip(positions, ranged, plan.views):
+            images[position] = view
+            self.cache_sample(filename, sample_index, view)
+        self.count_read(sum(view.nbytes for view in plan.views), 0)
+        return images
+
+    def read_run(self, local, filename, sample_indices):
+        """
+        Reads consecutive samples of one file through a copy of the reader owned by the calling
+        thread, so that file handles are never shared between threads, and returns them. Like
+        read_index, the copy keeps its files open across runs unless read_type is on_demand.
+        """
+        reader = getattr(local, 'reader', None)
+        if reader is None:
+            reader = local.reader = copy.copy(self)
+            reader.open_file_map = {}
+            self.thread_readers.append(reader)
+        images = [reader.cached(filename, sample_index) for sample_index in sample_indices]
+        if all(image is not None for image in images):
+            return images
+        if reader.open_file_map.get(filename) is None:
+            reader.open_file_map[filename] = reader.open(filename)
+        for position, sample_index in enumerate(sample_indices):
+            if images[position] is None:
+                images[position] = reader.load_sample(filename, sample_index)
+        if self._args.read_type is ReadType.ON_DEMAND:
+            reader.close(filename)
+            reader.open_file_map[filename] = None
+        return images
+
+    def close_thread_readers(self):
+        """
+        Closes the files left open by the copies of the reader of the read ahead threads.
+        """
+        for reader in self.thread_readers:
+            for filename, file in list(reader.open_file_map.items()):
+                if file is not None:
+                    reader.close(filename)
+                    reader.open_file_map[filename] = None
+        self.thread_readers = []
+
+    def prefetch_samples(self, samples):
+        """
+        Reads the samples on a pool of io_threads threads, keeping up to prefetch_files runs of
+        consecutive samples from the same file in flight, and yields them in file_map order.
+        The look ahead is counted in runs, so with sample_shuffle a run is often one sample.
+        """
+        local = threading.local()
+        pending = deque()
+        self.thread_readers = []
+        try:
+            with ThreadPoolExecutor(max_workers=self._args.io_threads) as executor:
+                for filename, run in itertools.groupby(samples, key=lambda sample: sample[1]):
+                    run = list(run)
+                    pending.append((executor.submit(self.read_run, local, filename, [sample[2] for sample in run]), run))
+                    while len(pending) >= self._args.prefetch_files:
+                        future, run = pending.popleft()
+                        for sample, image in zip(run, future.result()):
+                            yield sample + (image,)
+                while len(pending) > 0:
+                    future, run = pending.popleft()
+                    for sample, image in zip(run, future.result()):
+                        yield sample + (image,)
+        finally:
+            self.close_thread_readers()
+
+    async def read_run_async(self, local, filename, sample_indices, semaphore):
+        """
+        Reads consecutive samples of one file as an asyncio task. By default the whole run is
+        one outstanding read done by read_run on the executor of the event loop; readers that
+        know where their samples are stored override it to issue one ranged read per sample.
+        """
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.read_run, local, filename, sample_indices)
+
+    def async_samples(self, samples):
+        """
+        Drives the reads from one event loop, keeping up to io_queue_depth reads outstanding
+        and yielding the samples in file_map order.
+        """
+        loop = asyncio.new_event_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self._args.io_queue_depth))
+        semaphore = asyncio.Semaphore(self._args.io_queue_depth)
+        local = threading.local()
+        pending = deque()
+        self.thread_readers = []
+        try:
+            for filename, run in itertools.groupby(samples, key=lambda sample: sample[1]):
+                run = list(run)
+                coroutine = self.read_run_async(local, filename, [sample[2] for sample in run], semaphore)
+                pending.append((loop.create_task(coroutine), run))
+                while len(pending) >= self._args.io_queue_depth:
+                    task, run = pending.popleft()
+                    for sample, image in zip(run, loop.run_until_complete(task)):
+                        yield sample + (image,)
+            while len(pending) > 0:
+                task, run = pending.popleft()
+                for sample, image in zip(run, loop.run_until_complete(task)):
+                    yield sample + (image,)
+        finally:
+            # the consumer may stop early, in which case the reads still queued are cancelled
+            for task, _ in pending:
+                task.cancel()
+                try:
+                    loop.run_until_complete(task)
+                except asyncio.CancelledError:
+                    pass
+            loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
+            self.close_thread_readers()
+
     @abstractmethod
     def next(self):
         batch_size = self._args.batch_size if self.dataset_type is DatasetType.TRAIN else self._args.batch_size_eval
@@ -84,45 +387,97 @@ class FormatReader(ABC):
         total_images = len(self.file_map[self.thread_index])
         self.logger.debug(f"{utcnow()} Reading {total_images} images thread {self.thread_index} rank {self._args.my_rank}")
 
-        for global_sample_idx, filename, sample_index in self.file_map[self.thread_index]:
+        if self._args.async_io:
+            samples = self.async_samples(self.file_map[self.thread_index])
+        elif self._args.prefetch_files > 0:
+            samples = self.prefetch_samples(self.file_map[self.thread_index])
+        elif self._args.read_engine is not ReadEngine.POSIX:
+            samples = self.read_batches(self.file_map[self.thread_index])
+        else:
+            samples = self.read_samples(self.file_map[self.thread_index])
+        if self._args.batch_buffers > 0:
+            yield from self.assemble_batches(samples, total_images)
+            return
+        for global_sample_idx, filename, sample_index, image in samples:
             self.image_idx = global_sample_idx
-            if filename not in self.open_file_map or self.open_file_map[filename] is None:
-                self.open_file_map[filename] = self.open(filename)
-            self.get_sample(filename, sample_index)
-            self.preprocess()
-            batch.append(self._args.resized_image)
+            batch.append(self.preprocess(self.decode(image)))
             image_processed += 1
+            samples_read = len(batch)
             is_last = 0 if image_processed < total_images else 1
             if is_last:
+                padding = self.padding_sample()
                 while len(batch) is not self.batch_size:
-                    batch.append(self._args.resized_image)
+                    batch.append(padding)
             if len(batch) == self.batch_size:
                 self.step += 1
                 batch = np.array(batch)
+                self.count_read(0, samples_read)
                 yield batch
                 batch = []
-            if image_processed % self._args.num_samples_per_file == 0:
-                self.close(filename)
-                self.open_file_map[filename] = None
-            if is_last:
-                break
+
+    def assemble_batches(self, samples, total_images):
+        """
+        Writes the samples into a ring of batch_buffers preallocated batches and yields every
+        batch as a view of its buffer instead of copying a list of samples into a new array.
+        """
+        padding = self.padding_sample()
+        assembler = BatchAssembler(self.batch_size, padding.shape, padding.dtype, self._args.batch_buffers,
+                                   self._args.batch_buffer_backing, self.logger)
+        image_processed = 0
+        batch_samples = 0
+        try:
+            for global_sample_idx, filename, sample_index, image in samples:
+                self.image_idx = global_sample_idx
+                batch_samples += 1
+                if self.transforms is None:
+                    self.preprocess()
+                    self.decode(image, assembler.slot())
+                else:
+                    assembler.add(self.preprocess(self.decode(image)))
+                image_processed += 1
+                if image_processed == total_images:
+                    assembler.pad(padding)
+                if assembler.full():
+                    self.step += 1
+                    self.count_read(0, batch_samples)
+                    batch_samples = 0
+                    yield assembler.pop()
+        finally:
+            assembler.close()
 
     @abstractmethod
     def read_index(self, global_sample_idx, step):
         self.step = step
         self.image_idx = global_sample_idx
-        self.logger.debug(f"{self.global_index_map}")
         filename, sample_index = self.global_index_map[global_sample_idx]
         self.logger.debug(f"{utcnow()} read_index {filename}, {sample_index}")
         FormatReader.read_images += 1
-        if self._args.read_type is ReadType.ON_DEMAND or filename not in self.open_file_map or self.open_file_map[filename] is None:
-            self.open_file_map[filename] = self.open(filename)
-        self.get_sample(filename, sample_index)
-        self.preprocess()
-        if self._args.read_type is ReadType.ON_DEMAND:
-            self.close(filename)
-            self.open_file_map[filename] = None
-        return self._args.resized_image
+        image = self.cached(filename, sample_index)
+        if image is None:
+            if self._args.read_type is ReadType.ON_DEMAND or filename not in self.open_file_map or self.open_file_map[filename] is None:
+                self.open_file_map[filename] = self.open(filename)
+            image = self.load_sample(filename, sample_index)
+            if self._args.read_type is ReadType.ON_DEMAND:
+                self.close(filename)
+                self.open_file_map[filename] = None
+        self.count_read(0, 1)
+        return self.preprocess(self.decode(image))
+
+    def read_index_batch(self, global_sample_indices, step):
+        """
+        Reads the samples of a batch through read_index into the next buffer of a ring of
+        batch_buffers preallocated batches, and returns that buffer as a torch tensor sharing its
+        memory, pinned or in shared memory as batch_buffer_backing asks.
+        """
+        if self.index_assembler is None:
+            padding = self.padding_sample()
+            self.index_assembler = BatchAssembler(self.batch_size, padding.shape, padding.dtype,
+                                                  self._args.batch_buffers, self._args.batch_buffer_backing,
+                                                  self.logger)
+        for global_sample_idx in global_sample_indices:
+            self.index_assembler.add(self.read_index(global_sample_idx, step))
+        self.index_assembler.pad(self.padding_sample())
+        return self.index_assembler.pop_tensor()
 
     @abstractmethod
     def finalize(self):
@@ -0,0 +1,443 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import fcntl
+import hashlib
+import os
+import secrets
+import tempfile
+import threading
+from collections import OrderedDict
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from dlio_benchmark.common.data_structures import attach_shared_memory
+from dlio_benchmark.common.enumerations import CachePolicy, DatasetType
+
+
+def sample_key(filename, sample_index):
+    """
+    Stable non-negative 63 bit key of a sample, identical in every process of a node.
+    """
+    digest = hashlib.blake2b(f"{filename}:{sample_index}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') & 0x7fffffffffffffff
+
+
+def as_bytes(image):
+    return np.ascontiguousarray(image).reshape(-1).view(np.uint8)
+
+
+def dtype_code(dtype):
+    """
+    The dtype string of an array packed into an int64, or None when it does not fit.
+    """
+    code = dtype.str.encode()
+    if len(code) > 8 or dtype.hasobject:
+        return None
+    return int.from_bytes(code.ljust(8, b'\0'), 'little', signed=True)
+
+
+def code_dtype(code):
+    return np.dtype(int(code).to_bytes(8, 'little', signed=True).rstrip(b'\0').decode())
+
+
+class NodeSampleCache(object):
+    """
+    Sample cache shared by all the ranks of a node, and their reader threads and workers, in one
+    multiprocessing.shared_memory arena. The arena holds a fixed number of slots of slot_size
+    bytes with the dtype and shape of the sample in each, a linear probing hash table from sample
+    keys to slots, the eviction state and one row of hit, miss and eviction counters per local
+    rank. LRU keeps the slots in a doubly linked list threaded through the arena, most recently
+    used first, and CLOCK keeps a reference bit per slot. Every access holds an flock on a lock file
+    next to the arena, which serializes the processes of the node.
+    """
+    HEADER = ('num_slots', 'slot_size', 'table_size', 'num_rows', 'used', 'hand', 'head', 'tail')
+    HITS, MISSES, EVICTIONS = 0, 1, 2
+    EMPTY = -1
+    # samples of more dimensions are not cached
+    MAX_DIMS = 4
+
+    def __init__(self, name, row, policy, create=False, capacity=0, slot_size=0, num_rows=1):
+        self.name = name
+        self.row = row
+        self.policy = policy
+        self.lock_path = os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                                      f"{name}.lock")
+        self.thread_lock = threading.Lock()
+        if create:
+            num_slots = max(capacity // slot_size, 1)
+            table_size = 1 << (2 * num_slots - 1).bit_length()
+            self.shm = SharedMemory(name=name, create=True,
+                                    size=self.arena_size(num_slots, slot_size, table_size, num_rows))
+            header = np.ndarray((len(self.HEADER),), dtype=np.int64, buffer=self.shm.buf)
+            header[:] = [num_slots, slot_size, table_size, num_rows, 0, 0, self.EMPTY, self.EMPTY]
+            del header
+            self._map()
+            self.keys[:] = self.EMPTY
+            self.sizes[:] = 0
+            self.dtypes[:] = 0
+            self.ndims[:] = 0
+            self.shapes[:] = 0
+            self.stamps[:] = 0
+            self.prev[:] = self.EMPTY
+            self.next[:] = self.EMPTY
+            self.table[:] = 0
+            self.counters[:] = 0
+            open(self.lock_path, 'a').close()
+        else:
+            self.shm = attach_shared_memory(name)
+            self._map()
+        self.owner = create
+        self.lock_fd = os.open(self.lock_path, os.O_RDWR)
+
+    @staticmethod
+    def arena_size(num_slots, slot_size, table_size, num_rows):
+        return 8 * (len(NodeSampleCache.HEADER) + (7 + NodeSampleCache.MAX_DIMS) * num_slots + table_size + 3 * num_rows) + \
+            num_slots * slot_size
+
+    @staticmethod
+    def new_name():
+        return f"dlio_node_cache_{secrets.token_hex(6)}"
+
+    def _map(self):
+        buffer = self.shm.buf
+        self.header = np.ndarray((len(self.HEADER),), dtype=np.int64, buffer=buffer)
+        num_slots, slot_size, table_size, num_rows = self.header[:4].tolist()
+        offset = self.header.nbytes
+        columns = []
+        for length in [num_slots] * 7 + [self.MAX_DIMS * num_slots, table_size, 3 * num_rows]:
+            columns.append(np.ndarray((length,), dtype=np.int64, buffer=buffer, offset=offset))
+            offset += 8 * length
+        self.keys, self.sizes, self.stamps, self.prev, self.next, self.dtypes, self.ndims, self.shapes, self.table, \
+            self.counters = columns
+        self.shapes = self.shapes.reshape(num_slots, self.MAX_DIMS)
+        self.counters = self.counters.reshape(num_rows, 3)
+        self.data = np.ndarray((num_slots * slot_size,), dtype=np.uint8, buffer=buffer, offset=offset)
+        self.num_slots, self.slot_size, self.mask = num_slots, slot_size, table_size - 1
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        fcntl.flock(self.lock_fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+        self.thread_lock.release()
+
+    def _find(self, key):
+        """
+        Returns (table position, slot) of key, slot being -1 with the empty position when absent.
+        """
+        position = key & self.mask
+        while True:
+            entry = int(self.table[position])
+            if entry == 0:
+                return position, -1
+            if self.keys[entry - 1] == key:
+                return position, entry - 1
+            position = (position + 1) & self.mask
+
+    def _remove(self, position):
+        # backward shift deletion keeps every remaining key reachable from its home position
+        while True:
+            self.table[position] = 0
+            next_position = position
+            while True:
+                next_position = (next_position + 1) & self.mask
+                entry = int(self.table[next_position])
+                if entry == 0:
+                    return
+                home = int(self.keys[entry - 1]) & self.mask
+                if (position < next_position and position < home <= next_position) or \
+                        (position > next_position and (home > position or home <= next_position)):
+                    continue
+                break
+            self.table[position] = entry
+            position = next_position
+
+    def _unlink(self, slot):
+        before, after = int(self.prev[slot]), int(self.next[slot])
+        if before == self.EMPTY:
+            self.header[6] = after
+        else:
+            self.next[before] = after
+        if after == self.EMPTY:
+            self.header[7] = before
+        else:
+            self.prev[after] = before
+
+    def _push(self, slot):
+        head = int(self.header[6])
+        self.prev[slot] = self.EMPTY
+        self.next[slot] = head
+        if head == self.EMPTY:
+            self.header[7] = slot
+        else:
+            self.prev[head] = slot
+        self.header[6] = slot
+
+    def _touch(self, slot):
+        if self.policy is CachePolicy.CLOCK:
+            self.stamps[slot] = 1
+        elif self.header[6] != slot:
+            self._unlink(slot)
+            self._push(slot)
+
+    def _victim(self):
+        used = int(self.header[4])
+        if used < self.num_slots:
+            self.header[4] = used + 1
+            return used
+        if self.policy is CachePolicy.CLOCK:
+            hand = int(self.header[5])
+            while self.stamps[hand] != 0:
+                self.stamps[hand] = 0
+                hand = (hand + 1) % self.num_slots
+            self.header[5] = (hand + 1) % self.num_slots
+            return hand
+        # the least recently used slot is the tail of the list
+        slot = int(self.header[7])
+        self._unlink(slot)
+        return slot
+
+    def get(self, filename, sample_index):
+        """
+        Returns a copy of the cached sample, with the dtype and shape it was put with, or None on
+        a miss.
+        """
+        key = sample_key(filename, sample_index)
+        with self:
+            _, slot = self._find(key)
+            if slot < 0:
+                self.counters[self.row, self.MISSES] += 1
+                return None
+            self.counters[self.row, self.HITS] += 1
+            self._touch(slot)
+            start = slot * self.slot_size
+            shape = tuple(self.shapes[slot, :self.ndims[slot]].tolist())
+            return self.data[start:start + self.sizes[slot]].view(code_dtype(self.dtypes[slot])).reshape(shape).copy()
+
+    def put(self, filename, sample_index, image):
+        """
+        Caches a sample, evicting another one when the arena is full. Samples larger than a slot,
+        of more than MAX_DIMS dimensions or of dtypes that do not fit a code are not cached.
+        """
+        image = np.asarray(image)
+        code = dtype_code(image.dtype)
+        if image.nbytes > self.slot_size or image.ndim > self.MAX_DIMS or code is None:
+            return
+        shape = image.shape
+        image = as_bytes(image)
+        key = sample_key(filename, sample_index)
+        with self:
+            position, slot = self._find(key)
+            if slot >= 0:
+                self._touch(slot)
+                return
+            slot = self._victim()
+            if self.keys[slot] != self.EMPTY:
+                self._remove(self._find(int(self.keys[slot]))[0])
+                self.counters[self.row, self.EVICTIONS] += 1
+                position, _ = self._find(key)
+            start = slot * self.slot_size
+            self.data[start:start + image.nbytes] = image
+            self.keys[slot] = key
+            self.sizes[slot] = image.nbytes
+            self.dtypes[slot] = code
+            self.ndims[slot] = len(shape)
+            self.shapes[slot, :len(shape)] = shape
+            self.table[position] = slot + 1
+            if self.policy is CachePolicy.CLOCK:
+                self.stamps[slot] = 1
+            else:
+                self._push(slot)
+
+    def row_counters(self):
+        with self:
+            return self.counters[self.row].copy()
+
+    def close(self):
+        if self.shm is None:
+            return
+        os.close(self.lock_fd)
+        self.header = self.keys = self.sizes = self.stamps = self.table = self.counters = self.data = None
+        self.prev = self.next = self.dtypes = self.ndims = self.shapes = None
+        self.shm.close()
+        self.shm = None
+
+    def release(self):
+        """
+        Unlinks the arena and its lock file; only the creating rank does it.
+        """
+        if self.owner:
+            self.shm.unlink()
+            os.remove(self.lock_path)
+            self.owner = False
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class CacheCounters(object):
+    """
+    Hit, miss and eviction counters of the sample caches of a rank, one row per reader, kept in
+    shared memory so that the counts of data loader worker processes reach the rank.
+    """
+    HITS, MISSES, EVICTIONS = 0, 1, 2
+    COLUMNS = 3
+
+    def __init__(self, name=None, num_rows=1):
+        if name is None:
+            self.shm = SharedMemory(create=True, size=8 * self.COLUMNS * num_rows)
+        else:
+            self.shm = attach_shared_memory(name)
+        self.owner = name is None
+        self.name = self.shm.name
+        self.counters = np.ndarray((self.shm.size // (8 * self.COLUMNS), self.COLUMNS), dtype=np.int64,
+                                   buffer=self.shm.buf)
+        if self.owner:
+            self.counters[:] = 0
+
+    @staticmethod
+    def num_rows(read_threads):
+        return 2 * (max(read_threads, 1) + 1)
+
+    @staticmethod
+    def row(dataset_type, thread_index, read_threads):
+        """
+        Row of the reader of dataset_type on thread_index; thread_index is -1 for readers running
+        in the main thread. Training readers come first, then evaluation readers.
+        """
+        offset = 0 if dataset_type is DatasetType.TRAIN else max(read_threads, 1) + 1
+        return offset + thread_index + 1
+
+    def totals(self, dataset_type, read_threads):
+        half = self.num_rows(read_threads) // 2
+        rows = slice(0, half) if dataset_type is DatasetType.TRAIN else slice(half, 2 * half)
+        return self.counters[rows].sum(axis=0)
+
+    def close(self):
+        if self.shm is None:
+            return
+        self.counters = None
+        self.shm.close()
+        self.shm = None
+
+    def release(self):
+        if self.owner:
+            self.shm.unlink()
+            self.owner = False
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class SampleCache(object):
+    """
+    Cache of the samples read by one reader, bounded to capacity bytes. LRU and FIFO keep the
+    samples in an OrderedDict in eviction order; LFU keeps one OrderedDict per access count and
+    evicts the least recently used sample of the lowest count. Samples are copied in, since
+    readers return views of buffers they reuse.
+    """
+    instances = {}
+
+    def __init__(self, capacity, policy, counters_name=None, row=0):
+        self.capacity = capacity
+        self.policy = policy
+        self.nbytes = 0
+        self.entries = OrderedDict()
+        self.frequencies = {}
+        self.lock = threading.Lock()
+        self.counter_block = None
+        if counters_name is not None:
+            self.counter_block = CacheCounters(counters_name)
+            self.counters = self.counter_block.counters[row]
+        else:
+            self.counters = np.zeros(3, dtype=np.int64)
+
+    @staticmethod
+    def get_instance(dataset_type, thread_index, capacity, policy, counters_name=None, row=0):
+        """
+        Returns the cache of the reader of dataset_type on thread_index. Data loaders create a
+        new reader every epoch, so the cache is kept here for the lifetime of the process.
+        """
+        key = (dataset_type, thread_index)
+        if key not in SampleCache.instances:
+            SampleCache.instances[key] = SampleCache(capacity, policy, counters_name, row)
+        return SampleCache.instances[key]
+
+    @staticmethod
+    def reset():
+        SampleCache.instances = {}
+
+    def get(self, filename, sample_index):
+        key = (filename, sample_index)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.counters[CacheCounters.MISSES] += 1
+                return None
+            self.counters[CacheCounters.HITS] += 1
+            if self.policy is CachePolicy.LRU:
+                self.entries.move_to_end(key)
+            elif self.policy is CachePolicy.LFU:
+                frequency = entry[1]
+                del self.frequencies[frequency][key]
+                if len(self.frequencies[frequency]) == 0:
+                    del self.frequencies[frequency]
+                entry[1] = frequency + 1
+                self.frequencies.setdefault(frequency + 1, OrderedDict())[key] = None
+            return entry[0]
+
+    def put(self, filename, sample_index, image):
+        """
+        Caches a copy of a sample, evicting others until it fits. Samples larger than the
+        capacity are not cached.
+        """
+        image = np.array(image, copy=True)
+        if image.nbytes > self.capacity:
+            return
+        key = (filename, sample_index)
+        with self.lock:
+            if key in self.entries:
+                return
+            while self.nbytes + image.nbytes > self.capacity:
+                self._evict()
+            self.entries[key] = [image, 1]
+            self.nbytes += image.nbytes
+            if self.policy is CachePolicy.LFU:
+                self.frequencies.setdefault(1, OrderedDict())[key] = None
+
+    def _evict(self):
+        if self.policy is CachePolicy.LFU:
+            frequency = min(self.frequencies)
+            key, _ = self.frequencies[frequency].popitem(last=False)
+            if len(self.frequencies[frequency]) == 0:
+                del self.frequencies[frequency]
+            image, _ = self.entries.pop(key)
+        else:
+            _, (image, _) = self.entries.popitem(last=False)
+        self.nbytes -= image.nbytes
+        self.counters[CacheCounters.EVICTIONS] += 1
+
+    def __len__(self):
+        return len(self.entries)
@@ -23,6 +23,7 @@ from dlio_benchmark.utils.utility import utcnow
 from dlio_benchmark.utils.utility import Profile
 from dlio_benchmark.common.enumerations import DatasetType, Shuffle
 from dlio_benchmark.reader.reader_handler import FormatReader
+from dlio_benchmark.reader.transforms import crop_resize_batch
 import tensorflow as tf
 
 dlp = Profile(MODULE_DATA_READER)
@@ -67,7 +68,12 @@ class TFReader(FormatReader):
                 'image': tf.io.FixedLenFeature([], tf.string),
                 'size': tf.io.FixedLenFeature([], tf.int64)
             }
+        self.count_read(int(tf.reduce_sum(tf.strings.length(serialized))), int(tf.size(serialized)))
         parsed_example = tf.io.parse_example(serialized=serialized, features=features)
+        if self._args.faithful_decode:
+            images = [tf.io.decode_raw(image_raw, tf.uint8).numpy() for image_raw in parsed_example['image']]
+            dlp.update(image_size=sum(image.nbytes for image in images))
+            return tf.convert_to_tensor(crop_resize_batch(images, self._args.max_dimension), dtype=tf.uint8)
         # Get the image as raw bytes.
         #image_raw = parsed_example['image']
         #dimension = tf.cast(parsed_example['size'], tf.int32).numpy()
@@ -0,0 +1,189 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+
+
+def as_image(sample):
+    """
+    Returns a decoded sample as a 2D array: the first channel of color images, and the largest
+    square prefix of flat samples such as indexed binary records or parsed TFRecord bytes.
+    """
+    image = np.asarray(sample)
+    if image.ndim == 1:
+        side = math.isqrt(len(image))
+        return image[:side * side].reshape(side, side)
+    if image.ndim > 2:
+        return image.reshape(image.shape[0], image.shape[1], -1)[:, :, 0]
+    return image
+
+
+@lru_cache(maxsize=64)
+def crop_resize_indices(height, width, dimension):
+    """
+    Row and column indices taking the centered square crop of a height x width image and
+    resizing it to dimension x dimension with nearest neighbour sampling.
+    """
+    side = min(height, width)
+    scale = np.arange(dimension, dtype=np.int64) * side // dimension
+    rows = (height - side) // 2 + scale
+    cols = (width - side) // 2 + scale
+    return rows[:, None], cols[None, :]
+
+
+def crop_resize(sample, dimension, out=None):
+    """
+    Center crops and resizes a decoded sample to a dimension x dimension uint8 image with one
+    gather, writing it into out when given.
+    """
+    image = as_image(sample)
+    if image.size == 0:
+        image = np.zeros((1, 1), dtype=np.uint8)
+    rows, cols = crop_resize_indices(image.shape[0], image.shape[1], dimension)
+    resized = image[rows, cols]
+    if resized.dtype != np.uint8:
+        resized = resized.astype(np.uint8)
+    if out is None:
+        return resized
+    out[...] = resized
+    return out
+
+
+def crop_resize_batch(samples, dimension):
+    """
+    Center crops and resizes a batch of decoded samples, with one gather over the whole batch
+    when the samples have the same shape and one per sample otherwise.
+    """
+    images = [as_image(sample) for sample in samples]
+    if len(images) == 0:
+        return np.empty((0, dimension, dimension), dtype=np.uint8)
+    if any(image.shape != images[0].shape for image in images) or images[0].size == 0:
+        return np.stack([crop_resize(image, dimension) for image in images])
+    images = np.stack(images)
+    rows, cols = crop_resize_indices(images.shape[1], images.shape[2], dimension)
+    return images[:, rows, cols].astype(np.uint8, copy=False)
+
+
+class Normalize(object):
+    def __init__(self, rng, mean=127.5, std=64.0):
+        self.mean = np.float32(mean)
+        self.scale = np.float32(1.0 / std)
+
+    def __call__(self, image):
+        return (image.astype(np.float32) - self.mean) * self.scale
+
+
+class RandomCrop(object):
+    def __init__(self, rng, size):
+        self.rng = rng
+        self.size = size
+
+    def __call__(self, image):
+        height, width = image.shape[0], image.shape[1]
+        if height < self.size or width < self.size:
+            raise Exception(f"Cannot crop {self.size} x {self.size} out of a {height} x {width} sample")
+        top = self.rng.integers(0, height - self.size + 1)
+        left = self.rng.integers(0, width - self.size + 1)
+        return image[top:top + self.size, left:left + self.size]
+
+
+class CenterCrop(object):
+    def __init__(self, rng, size):
+        self.size = size
+
+    def __call__(self, image):
+        height, width = image.shape[0], image.shape[1]
+        if height < self.size or width < self.size:
+            raise Exception(f"Cannot crop {self.size} x {self.size} out of a {height} x {width} sample")
+        top, left = (height - self.size) // 2, (width - self.size) // 2
+        return image[top:top + self.size, left:left + self.size]
+
+
+class Resize(object):
+    def __init__(self, rng, size):
+        self.size = size
+
+    def __call__(self, image):
+        rows, cols = crop_resize_indices(image.shape[0], image.shape[1], self.size)
+        return image[rows, cols]
+
+
+class Flip(object):
+    def __init__(self, rng, axis=1, probability=0.5):
+        self.rng = rng
+        self.axis = axis
+        self.probability = probability
+
+    def __call__(self, image):
+        if self.rng.random() < self.probability:
+            return np.flip(image, axis=self.axis)
+        return image
+
+
+class Cast(object):
+    def __init__(self, rng, dtype='float32'):
+        self.dtype = np.dtype(dtype)
+
+    def __call__(self, image):
+        return image.astype(self.dtype)
+
+
+TRANSFORMS = {'normalize': Normalize, 'random_crop': RandomCrop, 'center_crop': CenterCrop, 'resize': Resize,
+              'flip': Flip, 'cast': Cast}
+
+
+class TransformChain(object):
+    """
+    Preprocessing declared in the workload as a list of transforms, each a dictionary with a
+    type and the parameters of that type, applied in order to every sample:
+
+        transforms:
+          - {type: random_crop, size: 224}
+          - {type: flip, axis: 1, probability: 0.5}
+          - {type: normalize, mean: 127.5, std: 64.0}
+          - {type: cast, dtype: float16}
+
+    The chain always returns a contiguous array, so the last transform really touches every
+    byte of its output.
+    """
+
+    def __init__(self, specs, rng=None):
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.transforms = []
+        for spec in specs:
+            spec = dict(spec)
+            name = spec.pop('type', None)
+            if name not in TRANSFORMS:
+                raise Exception(f"Unknown transform {name}; valid ones are {', '.join(TRANSFORMS)}")
+            try:
+                self.transforms.append(TRANSFORMS[name](self.rng, **spec))
+            except TypeError as e:
+                raise Exception(f"Invalid parameters {spec} for transform {name}: {e}")
+
+    def __call__(self, image):
+        for transform in self.transforms:
+            image = transform(image)
+        return np.ascontiguousarray(image)
+
+    def output_spec(self, image):
+        """
+        Returns the shape and dtype of the samples the chain makes out of image.
+        """
+        output = self(np.asarray(image))
+        return output.shape, output.dtype
@@ -87,7 +87,7 @@ class FileStorage(DataStorage):
         shutil.rmtree(self.get_uri(id))
         return True
 
-    # TODO Handle partial read and writes
+    # TODO Handle partial writes
     @dlp.log
     def put_data(self, id, data, offset=None, length=None):
         with open(self.get_uri(id), "w") as fd:
@@ -95,13 +95,28 @@ class FileStorage(DataStorage):
 
     @dlp.log
     def get_data(self, id, data, offset=None, length=None):
-        with open(self.get_uri(id), "r") as fd:
-            data = fd.read()
+        if offset is None and length is None:
+            with open(self.get_uri(id), "r") as fd:
+                data = fd.read()
+            return data
+        # ranged reads return the raw bytes
+        fd = os.open(self.get_uri(id), os.O_RDONLY)
+        try:
+            if length is None:
+                length = os.fstat(fd).st_size - offset
+            data = os.pread(fd, length, offset or 0)
+        finally:
+            os.close(fd)
+        dlp.update(image_size=len(data))
         return data
     
     @dlp.log
     def isfile(self, id):
         return os.path.isfile(id)
 
+    @dlp.log
+    def get_size(self, id):
+        return os.path.getsize(self.get_uri(id))
+
     def get_basename(self, id):
         return os.path.basename(id)
@@ -15,6 +15,8 @@
    limitations under the License.
 """
 from abc import ABC, abstractmethod
+import asyncio
+
 from dlio_benchmark.framework.framework_factory import FrameworkFactory
 from dlio_benchmark.utils.config import ConfigArguments
 
@@ -123,6 +125,15 @@ class DataStorage(ABC):
             return self.framework.get_data(id, data, offset, length)
         return None
 
+    async def get_data_async(self, id, offset=None, length=None):
+        """
+            This method retrieves data content of a node, or the length bytes at offset of it,
+            without blocking the event loop. The blocking get_data runs on the executor of
+            the running loop, which bounds the number of reads in flight.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_data, id, None, offset, length)
+
     def isfile(self, id):
         """
             This method checks if the given path is a file
@@ -130,3 +141,9 @@ class DataStorage(ABC):
         if self.is_framework_nativeio_available:
             return self.framework.isfile(id)
         return None
+
+    def get_size(self, id):
+        """
+            This method returns the size in bytes of a node, or None when the storage cannot tell.
+        """
+        return None
@@ -0,0 +1,111 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import glob
+import json
+import os
+
+import numpy as np
+
+# per step lists of the epochs of {rank}_output.json, which become the columns of the step table
+STEP_LISTS = ['load', 'proc', 'compute', 'bytes']
+STEP_COLUMNS = ['rank', 'epoch', 'phase', 'step'] + STEP_LISTS
+FILE_PATTERN = 'stats_*.npz'
+
+
+def is_epoch(key, value):
+    return str(key).isdigit() and isinstance(value, dict) and 'load' in value
+
+
+def step_columns(rank, output):
+    """
+    Returns the per step lists of the output of a rank as columns, one row per step of every
+    epoch and phase (block or eval) in the order of the output. Steps missing from one of the
+    lists are NaN, or -1 for the bytes.
+    """
+    columns = {name: [] for name in STEP_COLUMNS}
+    for epoch, epoch_output in output.items():
+        if not is_epoch(epoch, epoch_output):
+            continue
+        for phase in epoch_output['load']:
+            lists = {}
+            for name in STEP_LISTS:
+                source = epoch_output.get(name, {})
+                values = source.get(phase, []) if isinstance(source, dict) else []
+                lists[name] = values if isinstance(values, list) else []
+            steps = max(len(values) for values in lists.values())
+            columns['rank'].append(np.full(steps, rank, dtype=np.int32))
+            columns['epoch'].append(np.full(steps, int(epoch), dtype=np.int32))
+            columns['phase'].append(np.full(steps, phase))
+            columns['step'].append(np.arange(steps, dtype=np.int32))
+            for name in STEP_LISTS:
+                column = np.full(steps, -1 if name == 'bytes' else np.nan,
+                                 dtype=np.int64 if name == 'bytes' else np.float64)
+                column[:len(lists[name])] = lists[name]
+                columns[name].append(column)
+    empty = {'rank': np.int32, 'epoch': np.int32, 'phase': np.str_, 'step': np.int32, 'bytes': np.int64}
+    return {name: np.concatenate(values) if len(values) > 0 else np.zeros(0, dtype=empty.get(name, np.float64))
+            for name, values in columns.items()}
+
+
+def strip_step_lists(output):
+    """
+    Returns the output of a rank without the per step lists, which go to the step table.
+    """
+    stripped = {}
+    for key, value in output.items():
+        if is_epoch(key, value):
+            value = {name: entry for name, entry in value.items() if name not in STEP_LISTS}
+        stripped[key] = value
+    return stripped
+
+
+def encode_json(value):
+    return np.frombuffer(json.dumps(value).encode(), dtype=np.uint8)
+
+
+def write_columnar_stats(path, parts):
+    """
+    Writes the stats of several ranks, given as (rank, output, per_epoch_stats) tuples, to one
+    npz file: the step table as one array per column, and the rest of the outputs and the per
+    epoch stats as JSON documents keyed by rank.
+    """
+    tables = [step_columns(rank, output) for rank, output, _ in parts]
+    columns = {name: np.concatenate([table[name] for table in tables]) for name in STEP_COLUMNS}
+    np.savez(path, **columns,
+             outputs=encode_json({str(rank): strip_step_lists(output) for rank, output, _ in parts}),
+             per_epoch_stats=encode_json({str(rank): stats for rank, _, stats in parts}))
+
+
+def read_columnar_stats(folder):
+    """
+    Reads the npz files of a run and returns the step table, with the rows of every rank in
+    order and the ranks in increasing order, the outputs of the ranks without their step lists
+    and their per epoch stats, both keyed by rank.
+    """
+    tables = []
+    outputs = {}
+    per_epoch_stats = {}
+    for path in sorted(glob.glob(os.path.join(folder, FILE_PATTERN))):
+        with np.load(path, allow_pickle=False) as data:
+            tables.append({name: data[name] for name in STEP_COLUMNS})
+            outputs.update({int(rank): value for rank, value in json.loads(data['outputs'].tobytes()).items()})
+            per_epoch_stats.update({int(rank): value for rank, value in json.loads(data['per_epoch_stats'].tobytes()).items()})
+    if len(tables) == 0:
+        raise Exception(f"No {FILE_PATTERN} files in {folder}")
+    columns = {name: np.concatenate([table[name] for table in tables]) for name in STEP_COLUMNS}
+    order = np.argsort(columns['rank'], kind='stable')
+    return {name: values[order] for name, values in columns.items()}, outputs, per_epoch_stats
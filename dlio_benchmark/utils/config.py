@@ -25,13 +25,16 @@ from time import time
 from typing import Any, Dict, List, ClassVar
 
 from dlio_benchmark.common.constants import MODULE_CONFIG
+from dlio_benchmark.common.data_structures import SampleIndex, index_dtype
 from dlio_benchmark.common.enumerations import StorageType, FormatType, Shuffle, ReadType, FileAccess, Compression, \
     FrameworkType, \
-    DataLoaderType, Profiler, DatasetType, DataLoaderSampler, CheckpointLocationType, CheckpointMechanismType, CheckpointModeType
+    DataLoaderType, Profiler, DatasetType, DataLoaderSampler, CheckpointLocationType, CheckpointMechanismType, CheckpointModeType, \
+    CheckpointTensorProviderType, FileDiscoveryType, ReadEngine, CachePolicy, BufferBacking, GenerationSchedule, RecordLengthDistribution, \
+    OutputFormat
 from dlio_benchmark.utils.utility import DLIOMPI, get_trace_name, utcnow
 from dlio_benchmark.utils.utility import Profile, PerfTrace, DFTRACER_ENABLE, DLIOLogger, OUTPUT_LEVEL
 from dataclasses import dataclass
-from omegaconf import OmegaConf, DictConfig
+from omegaconf import OmegaConf, DictConfig, ListConfig
 import math
 import os
 import numpy as np
@@ -58,6 +61,8 @@ class ConfigArguments:
     storage_type: StorageType = StorageType.LOCAL_FS
     record_length: int = 64 * 1024
     record_length_stdev: int = 0
+    record_length_distribution: RecordLengthDistribution = RecordLengthDistribution.FIXED
+    record_length_histogram: str = None
     record_length_resize: int = 0
     num_files_train: int = 8
     num_samples_per_file: int = 1
@@ -71,10 +76,14 @@ class ConfigArguments:
     output_folder: str = None
     metric_exclude_start_steps: int = 1
     metric_exclude_end_steps: int = 0
+    output_format: OutputFormat = OutputFormat.JSON
+    output_aggregators: int = 1
     checkpoint_folder: str = "./checkpoints/"
     log_file: str = "dlio.log"
     file_prefix: str = "img"
     keep_files: bool = True
+    use_manifest: bool = True
+    file_discovery: FileDiscoveryType = FileDiscoveryType.RANK_ZERO
     do_profiling: bool = False
     profiler: Profiler = Profiler.IOSTAT
     seed: int = 123
@@ -89,6 +98,7 @@ class ConfigArguments:
     computation_threads: int = 1
     computation_time: ClassVar[Dict[str, Any]] = {}
     preprocess_time: ClassVar[Dict[str, Any]] = {}
+    transforms: ClassVar[List[Dict[str, Any]]] = []
     prefetch_size: int = 2
     enable_chunking: bool = False
     chunk_size: int = 0
@@ -99,6 +109,9 @@ class ConfigArguments:
     batch_size_eval: int = 1
     num_files_eval: int = 0
     generation_buffer_size: int = 2 * 1073741824  # 2 GB
+    generation_processes: int = 1
+    generation_random_pool: int = 0
+    generation_schedule: GenerationSchedule = GenerationSchedule.STATIC
     eval_time: ClassVar[Dict[str, Any]] = {}
     eval_after_epoch: int = 1
     epochs_between_evals: int = 1
@@ -115,6 +128,16 @@ class ConfigArguments:
     num_checkpoints_write: int = -1
     num_checkpoints_read: int = -1
     checkpoint_randomize_tensor: bool = True
+    checkpoint_async: bool = False
+    checkpoint_max_concurrent: int = 1
+    checkpoint_write_size: int = 4194304
+    checkpoint_odirect: bool = False
+    checkpoint_writer_threads: int = 1
+    checkpoint_reader_threads: int = 1
+    checkpoint_load_mmap: bool = False
+    checkpoint_readahead: bool = False
+    checkpoint_checksum: bool = False
+    checkpoint_tensor_provider: CheckpointTensorProviderType = CheckpointTensorProviderType.EAGER
     ksm_madv_mergeable_id: int = 12
     ksm_high_ram_trigger: float = 30.0
     ksm_low_ram_exit: float = 15
@@ -144,6 +167,20 @@ class ConfigArguments:
     reader_classname: str = None
     multiprocessing_context: str = "fork"
     pin_memory: bool = True
+    prefetch_files: int = 0
+    io_threads: int = 1
+    async_io: bool = False
+    io_queue_depth: int = 16
+    read_engine: ReadEngine = ReadEngine.POSIX
+    read_gap_tolerance: int = 0
+    node_cache_size: int = 0
+    node_cache_policy: CachePolicy = CachePolicy.LRU
+    node_cache_slot_size: int = 0
+    sample_cache_size: int = 0
+    sample_cache_policy: CachePolicy = CachePolicy.LRU
+    batch_buffers: int = 0
+    batch_buffer_backing: BufferBacking = BufferBacking.HEAP
+    faithful_decode: bool = False
     odirect: bool = False
 
     # derived fields
@@ -169,6 +206,10 @@ class ConfigArguments:
     native_data_loader = False
     train_sample_index_sum = 1
     eval_sample_index_sum = 1
+    node_cache_name = None
+    node_cache_row = 0
+    sample_cache_counters_name = None
+    read_counters_name = None
 
     def __init__(self):
         """ Virtually private constructor. """
@@ -178,6 +219,8 @@ class ConfigArguments:
             self.comm_size = DLIOMPI.get_instance().size()
             self.my_rank = DLIOMPI.get_instance().rank()
             self.logger = DLIOLogger.get_instance()
+            self.abs_path_cache = {}
+            self.shared_sample_maps = []
             ConfigArguments.__instance = self
 
     def __setstate__(self, state):
@@ -268,6 +311,55 @@ class ConfigArguments:
         if len(self.file_list_eval) != self.num_files_eval:
             raise Exception(
                 f"Expected {self.num_files_eval} evaluation files but {len(self.file_list_eval)} found. Ensure data was generated correctly.")
+        if self.record_length_distribution is not RecordLengthDistribution.FIXED:
+            if self.format not in [FormatType.INDEXED_BINARY, FormatType.MMAP_INDEXED_BINARY]:
+                raise Exception(f"workload.dataset.record_length_bytes_distribution={self.record_length_distribution} is only supported for the indexed_binary and mmap_indexed_binary formats")
+            if self.record_length_distribution is RecordLengthDistribution.HISTOGRAM and self.record_length_histogram is None:
+                raise Exception("workload.dataset.record_length_bytes_histogram should be set for the histogram record length distribution")
+        if self.output_aggregators < 1:
+            raise Exception(f"workload.output.aggregators should be at least 1, got {self.output_aggregators}")
+        if self.prefetch_files > 0 and self.io_threads < 1:
+            raise Exception(f"workload.reader.io_threads should be at least 1 to prefetch files, got {self.io_threads}")
+        if self.async_io:
+            if self.io_queue_depth < 1:
+                raise Exception(f"workload.reader.io_queue_depth should be at least 1 for async I/O, got {self.io_queue_depth}")
+            if self.prefetch_files > 0:
+                raise Exception("workload.reader.async_io and workload.reader.prefetch_files cannot be used together")
+        if self.read_engine is not ReadEngine.POSIX:
+            if self.format not in [FormatType.INDEXED_BINARY, FormatType.HDF5]:
+                raise Exception(f"workload.reader.read_engine={self.read_engine} is only supported for the indexed_binary and hdf5 formats")
+            if self.async_io or self.prefetch_files > 0:
+                raise Exception(f"workload.reader.read_engine={self.read_engine} cannot be used with async_io or prefetch_files")
+            if self.data_loader in [DataLoaderType.PYTORCH, DataLoaderType.DALI]:
+                raise Exception(f"workload.reader.read_engine={self.read_engine} is not supported for the {self.data_loader} data loader, which reads sample by sample")
+            if self.storage_type is not StorageType.LOCAL_FS:
+                raise Exception(f"workload.reader.read_engine={self.read_engine} is only supported for local_fs storage")
+            if self.io_queue_depth < 1:
+                raise Exception(f"workload.reader.io_queue_depth should be at least 1, got {self.io_queue_depth}")
+            if self.read_gap_tolerance < 0:
+                raise Exception(f"workload.reader.read_gap_tolerance should be non-negative, got {self.read_gap_tolerance}")
+        if self.node_cache_size > 0:
+            if self.async_io:
+                raise Exception("workload.reader.node_cache_size cannot be used with async_io")
+            if self.node_cache_slot_size < 0:
+                raise Exception(f"workload.reader.node_cache_slot_size should be non-negative, got {self.node_cache_slot_size}")
+            if self.node_cache_policy not in [CachePolicy.LRU, CachePolicy.CLOCK]:
+                raise Exception(f"workload.reader.node_cache_policy should be lru or clock, got {self.node_cache_policy}")
+        if len(self.transforms) > 0:
+            from dlio_benchmark.reader.transforms import TransformChain
+            TransformChain(self.transforms)
+        if self.batch_buffers < 0:
+            raise Exception(f"workload.reader.batch_buffers should be non-negative, got {self.batch_buffers}")
+        if self.batch_buffer_backing is not BufferBacking.HEAP:
+            if self.data_loader is not DataLoaderType.PYTORCH:
+                raise Exception(f"workload.reader.batch_buffer_backing={self.batch_buffer_backing} is only supported for the pytorch data loader")
+            if self.batch_buffer_backing is BufferBacking.PINNED and self.read_threads > 0:
+                raise Exception("workload.reader.batch_buffer_backing=pinned needs read_threads=0, workers hand their batches over in shared memory")
+        if self.sample_cache_size > 0:
+            if self.async_io:
+                raise Exception("workload.reader.sample_cache_size cannot be used with async_io")
+            if self.sample_cache_policy not in [CachePolicy.LRU, CachePolicy.LFU, CachePolicy.FIFO]:
+                raise Exception(f"workload.reader.sample_cache_policy should be lru, lfu or fifo, got {self.sample_cache_policy}")
         if self.data_loader_classname is not None and self.data_loader_sampler is None:
             raise Exception(
                 f"For custom data loaders workload.reader.data_loader_sampler needs to be defined as iter or index.")
@@ -300,6 +392,18 @@ class ConfigArguments:
         if self.num_checkpoints_write > 0:
             if self.num_checkpoints_read > self.num_checkpoints_write:
                 raise Exception(f"Number of checkpoints to read {self.num_checkpoints_read} cannot be larger than number of checkpoints to write {self.num_checkpoints_write}")
+        if self.checkpoint_write_size <= 0:
+            raise Exception(f"checkpoint.write_size should be positive, got {self.checkpoint_write_size}")
+        if self.checkpoint_odirect and self.checkpoint_write_size % 4096 != 0:
+            raise Exception(f"checkpoint.write_size {self.checkpoint_write_size} should be a multiple of 4096 with checkpoint.odirect")
+        if self.checkpoint_writer_threads < 1:
+            raise Exception(f"checkpoint.writer_threads should be at least 1, got {self.checkpoint_writer_threads}")
+        if self.checkpoint_reader_threads < 1:
+            raise Exception(f"checkpoint.reader_threads should be at least 1, got {self.checkpoint_reader_threads}")
+        if self.checkpoint_max_concurrent < 1:
+            raise Exception(f"checkpoint.max_concurrent should be at least 1, got {self.checkpoint_max_concurrent}")
+        if self.checkpoint_tensor_provider == CheckpointTensorProviderType.SHARED and not self.checkpoint_randomize_tensor:
+            raise Exception(f"checkpoint.tensor_provider {self.checkpoint_tensor_provider} requires checkpoint.randomize_tensor to be True")
         if self.ksm_present and self.checkpoint_randomize_tensor:
             raise Exception(f"checkpoint.ksm is {self.ksm_present} which requires checkpoint.randomize_tensor to be False")
 
@@ -382,10 +486,36 @@ class ConfigArguments:
             if self.format in [FormatType.JPEG, FormatType.PNG, FormatType.NPY, FormatType.TFRECORD]:
                 self.native_data_loader = True
 
+    def get_path_table(self, file_list):
+        # File lists are only reordered between epochs, so absolute paths are resolved once per file.
+        paths = []
+        for filename in file_list:
+            path = self.abs_path_cache.get(filename)
+            if path is None:
+                path = self.abs_path_cache[filename] = os.path.abspath(filename)
+            paths.append(path)
+        return paths
+
+    def get_rank_sample_list(self, total_samples, epoch_number):
+        samples_per_proc = int(math.ceil(total_samples/self.comm_size))
+        start_sample = samples_per_proc * self.my_rank
+        end_sample = samples_per_proc * (self.my_rank + 1) - 1
+        if end_sample > total_samples - 1:
+            end_sample = total_samples - 1
+        self.logger.debug(f"my_rank: {self.my_rank}, start_sample: {start_sample}, end_sample: {end_sample}")
+        sample_list = np.arange(start_sample, end_sample + 1)
+        if self.sample_shuffle is not Shuffle.OFF:
+            if self.seed_change_epoch:
+                np.random.seed(self.seed + epoch_number)
+            else:
+                np.random.seed(self.seed)
+            np.random.shuffle(sample_list)
+        return samples_per_proc, start_sample, sample_list
+
     @dlp.log
     def build_sample_map_iter(self, file_list, total_samples, epoch_number):
         self.logger.debug(f"ranks {self.comm_size} threads {self.read_threads} tensors")
-        
+
         num_files = len(file_list)
         samples_sum = 0
         process_thread_file_map = {}
@@ -393,67 +523,68 @@ class ConfigArguments:
             num_threads = 1
             if self.read_threads > 0 and self.data_loader is not DataLoaderType.DALI:
                 num_threads = self.read_threads
-            samples_per_proc = int(math.ceil(total_samples/self.comm_size)) 
+            samples_per_proc, _, sample_list = self.get_rank_sample_list(total_samples, epoch_number)
             self.samples_per_thread = samples_per_proc // num_threads
-            start_sample_index = samples_per_proc * self.my_rank
-            end_sample_index = samples_per_proc * (self.my_rank + 1) - 1
-            if end_sample_index > total_samples - 1:
-                end_sample_index = total_samples - 1
-            sample_list = np.arange(start_sample_index, end_sample_index + 1)
-            self.logger.debug(f"{self.my_rank} {start_sample_index} {end_sample_index}")
-            if self.sample_shuffle is not Shuffle.OFF:
-                if self.seed_change_epoch:
-                    np.random.seed(self.seed + epoch_number)
-                else:
-                    np.random.seed(self.seed)
-                np.random.shuffle(sample_list)
-            sample_index = 0
-            if num_files > 0:
+            samples_sum = int(sample_list.sum())
+            paths = self.get_path_table(file_list)
+            position = np.arange(len(sample_list))
+            # The first sample starts at the rank's file offset, the following ones walk the
+            # file list from the beginning, num_samples_per_file samples per file.
+            file_id = ((position // self.num_samples_per_file) % num_files).astype(index_dtype(num_files))
+            if len(file_id) > 0:
                 files_per_rank = (num_files // self.comm_size) % num_files
-                file_index = self.my_rank * files_per_rank
-                for thread_index in range(num_threads):
-                    process_thread_file_map[thread_index] = []
-                for sample in sample_list:
-                    samples_sum += sample
-                    thread_index = (sample_index // self.samples_per_thread) % num_threads
-                    abs_path = os.path.abspath(file_list[file_index])
-                    process_thread_file_map[thread_index].append((sample,
-                                                abs_path,
-                                                sample_list[sample_index] % self.num_samples_per_file))
-                    sample_index += 1
-                    file_index = (sample_index // self.num_samples_per_file) % num_files
+                file_id[0] = self.my_rank * files_per_rank
+            sample_index = (sample_list % self.num_samples_per_file).astype(index_dtype(self.num_samples_per_file))
+            thread_id = (position // self.samples_per_thread) % num_threads
+            for thread_index in range(num_threads):
+                selected = thread_id == thread_index
+                process_thread_file_map[thread_index] = SampleIndex(paths, sample_list[selected], file_id[selected],
+                                                                    sample_index[selected])
         return process_thread_file_map, samples_sum
 
     @dlp.log
     def get_global_map_index(self, file_list, total_samples, epoch_number):
-        process_thread_file_map = {}
         num_files = len(file_list)
-        start_sample = 0
-        end_sample = 0
         samples_sum = 0
-        if num_files > 0:
-            end_sample = total_samples - 1
-            samples_per_proc = int(math.ceil(total_samples/self.comm_size)) 
-            start_sample = self.my_rank * samples_per_proc
-            end_sample = (self.my_rank + 1) * samples_per_proc - 1
-            if end_sample > total_samples - 1:
-                end_sample = total_samples - 1
-            self.logger.debug(f"my_rank: {self.my_rank}, start_sample: {start_sample}, end_sample: {end_sample}")
-            sample_list = np.arange(start_sample, end_sample + 1)
-            if self.sample_shuffle is not Shuffle.OFF:
-                if self.seed_change_epoch:
-                    np.random.seed(self.seed + epoch_number)
-                else:
-                    np.random.seed(self.seed)
-                np.random.shuffle(sample_list)
-            for sample_index in range(end_sample - start_sample + 1):
-                global_sample_index = sample_list[sample_index]
-                samples_sum += global_sample_index
-                file_index = int(math.floor(global_sample_index/self.num_samples_per_file))
-                abs_path = os.path.abspath(file_list[file_index])
-                sample_index = global_sample_index % self.num_samples_per_file
-                process_thread_file_map[global_sample_index] = (abs_path, sample_index)
-        return process_thread_file_map, samples_sum
+        if num_files == 0:
+            return SampleIndex.empty(), samples_sum
+        _, start_sample, sample_list = self.get_rank_sample_list(total_samples, epoch_number)
+        samples_sum = int(sample_list.sum())
+        file_id = (sample_list // self.num_samples_per_file).astype(index_dtype(num_files))
+        sample_index = (sample_list % self.num_samples_per_file).astype(index_dtype(self.num_samples_per_file))
+        return SampleIndex(self.get_path_table(file_list), sample_list, file_id, sample_index,
+                           start=start_sample), samples_sum
+
+    def sample_maps(self):
+        sample_maps = [self.train_global_index_map, self.val_global_index_map]
+        for file_map in [self.train_file_map, self.val_file_map]:
+            sample_maps.extend(file_map.values())
+        return [sample_map for sample_map in sample_maps if isinstance(sample_map, SampleIndex)]
+
+    def share_sample_maps(self):
+        """
+        Moves the sample maps to shared memory so that worker processes attach to them
+        instead of unpickling their own copy. Maps shared for a previous epoch are released.
+        """
+        sample_maps = self.sample_maps()
+        for sample_map in self.shared_sample_maps:
+            if not any(sample_map is current for current in sample_maps):
+                sample_map.release()
+        for sample_map in sample_maps:
+            sample_map.share()
+        self.shared_sample_maps = sample_maps
+
+    def release_sample_maps(self):
+        for sample_map in self.shared_sample_maps:
+            sample_map.release()
+        self.shared_sample_maps = []
+
+    def close_sample_maps(self):
+        """
+        Closes the mappings of the shared sample maps a data loader worker attached to.
+        """
+        for sample_map in self.sample_maps():
+            sample_map.close()
 
     @dlp.log
     def reconfigure(self, epoch_number):
@@ -501,6 +632,10 @@ def GetConfig(args, key):
             value = args.record_length
         elif keys[1] == "record_length_bytes_stdev":
             value = args.record_length_stdev
+        elif keys[1] == "record_length_bytes_distribution":
+            value = args.record_length_distribution
+        elif keys[1] == "record_length_bytes_histogram":
+            value = args.record_length_histogram
         elif keys[1] == "record_length_bytes_resize":
             value = args.record_length_resize
         elif keys[1] == "num_files_train":
@@ -509,6 +644,12 @@ def GetConfig(args, key):
             value = args.num_files_eval
         elif keys[1] == "generation_buffer_size":
             value = args.generation_buffer_size
+        elif keys[1] == "generation_processes":
+            value = args.generation_processes
+        elif keys[1] == "generation_random_pool":
+            value = args.generation_random_pool
+        elif keys[1] == "generation_schedule":
+            value = args.generation_schedule
         elif keys[1] == "num_samples_per_file":
             value = args.num_samples_per_file
         elif keys[1] == "data_folder":
@@ -531,6 +672,10 @@ def GetConfig(args, key):
             value = args.format
         elif keys[1] == "keep_files":
             value = args.keep_files
+        elif keys[1] == "use_manifest":
+            value = args.use_manifest
+        elif keys[1] == "file_discovery":
+            value = args.file_discovery
 
     # data reader
     reader = None
@@ -573,8 +718,38 @@ def GetConfig(args, key):
             value = args.preprocess_time.get("mean", 0)
         elif keys[1] == "preprocess_time_stdev":
             value = args.preprocess_time.get("stdev", None)
+        elif keys[1] == "transforms":
+            value = args.transforms
         elif keys[1] == "pin_memory":
             value = args.pin_memory
+        elif keys[1] == "prefetch_files":
+            value = args.prefetch_files
+        elif keys[1] == "io_threads":
+            value = args.io_threads
+        elif keys[1] == "async_io":
+            value = args.async_io
+        elif keys[1] == "io_queue_depth":
+            value = args.io_queue_depth
+        elif keys[1] == "read_engine":
+            value = args.read_engine
+        elif keys[1] == "read_gap_tolerance":
+            value = args.read_gap_tolerance
+        elif keys[1] == "node_cache_size":
+            value = args.node_cache_size
+        elif keys[1] == "node_cache_policy":
+            value = args.node_cache_policy
+        elif keys[1] == "node_cache_slot_size":
+            value = args.node_cache_slot_size
+        elif keys[1] == "sample_cache_size":
+            value = args.sample_cache_size
+        elif keys[1] == "sample_cache_policy":
+            value = args.sample_cache_policy
+        elif keys[1] == "batch_buffers":
+            value = args.batch_buffers
+        elif keys[1] == "batch_buffer_backing":
+            value = args.batch_buffer_backing
+        elif keys[1] == "faithful_decode":
+            value = args.faithful_decode
 
     # training relevant setting
     if len(keys) > 1 and keys[0] == "train":
@@ -628,6 +803,28 @@ def GetConfig(args, key):
             value = args.checkpoint_rank_sync
         elif keys[1] == "recovery_rank_shift":  
             value = args.checkpoint_recovery_rank_shift
+        elif keys[1] == "async":
+            value = args.checkpoint_async
+        elif keys[1] == "max_concurrent":
+            value = args.checkpoint_max_concurrent
+        elif keys[1] == "mechanism":
+            value = args.checkpoint_mechanism
+        elif keys[1] == "write_size":
+            value = args.checkpoint_write_size
+        elif keys[1] == "odirect":
+            value = args.checkpoint_odirect
+        elif keys[1] == "writer_threads":
+            value = args.checkpoint_writer_threads
+        elif keys[1] == "reader_threads":
+            value = args.checkpoint_reader_threads
+        elif keys[1] == "load_mmap":
+            value = args.checkpoint_load_mmap
+        elif keys[1] == "readahead":
+            value = args.checkpoint_readahead
+        elif keys[1] == "checksum":
+            value = args.checkpoint_checksum
+        elif keys[1] == "tensor_provider":
+            value = args.checkpoint_tensor_provider
 
     if len(keys) > 1 and keys[0] == "model":
         if keys[1] == "name":
@@ -679,6 +876,10 @@ def GetConfig(args, key):
                 value = args.metric_exclude_start_steps
             elif len(keys) > 2 and keys[2] == "exclude_end_steps":
                 value = args.metric_exclude_end_steps
+        elif keys[1] == "format":
+            value = args.output_format
+        elif keys[1] == "aggregators":
+            value = args.output_aggregators
 
     if len(keys) > 1 and keys[0] == "workflow":
         if keys[1] == "train":
@@ -722,6 +923,10 @@ def LoadConfig(args, config):
             args.record_length = config['dataset']['record_length_bytes']
         if 'record_length_bytes_stdev' in config['dataset']:
             args.record_length_stdev = config['dataset']['record_length_bytes_stdev']
+        if 'record_length_bytes_distribution' in config['dataset']:
+            args.record_length_distribution = RecordLengthDistribution(config['dataset']['record_length_bytes_distribution'])
+        if 'record_length_bytes_histogram' in config['dataset']:
+            args.record_length_histogram = config['dataset']['record_length_bytes_histogram']
         if 'record_length_bytes_resize' in config['dataset']:
             args.record_length_resize = config['dataset']['record_length_bytes_resize']
         if 'num_files_train' in config['dataset']:
@@ -730,6 +935,12 @@ def LoadConfig(args, config):
             args.num_files_eval = config['dataset']['num_files_eval']
         if 'generation_buffer_size' in config['dataset']:
             args.generation_buffer_size = config['dataset']['generation_buffer_size']
+        if 'generation_processes' in config['dataset']:
+            args.generation_processes = config['dataset']['generation_processes']
+        if 'generation_random_pool' in config['dataset']:
+            args.generation_random_pool = config['dataset']['generation_random_pool']
+        if 'generation_schedule' in config['dataset']:
+            args.generation_schedule = GenerationSchedule(config['dataset']['generation_schedule'])
         if 'num_samples_per_file' in config['dataset']:
             args.num_samples_per_file = config['dataset']['num_samples_per_file']
         if 'data_folder' in config['dataset']:
@@ -753,6 +964,10 @@ def LoadConfig(args, config):
             args.format = FormatType(config['dataset']['format'])
         if 'keep_files' in config['dataset']:
             args.keep_files = config['dataset']['keep_files']
+        if 'use_manifest' in config['dataset']:
+            args.use_manifest = config['dataset']['use_manifest']
+        if 'file_discovery' in config['dataset']:
+            args.file_discovery = FileDiscoveryType(config['dataset']['file_discovery'])
 
     # data reader
     reader = None
@@ -792,7 +1007,7 @@ def LoadConfig(args, config):
         if 'sample_shuffle' in reader:
             args.sample_shuffle = Shuffle(reader['sample_shuffle'])
         if 'read_type' in reader:
-            args.read_type = reader['read_type']
+            args.read_type = ReadType(reader['read_type'])
         if 'transfer_size' in reader:
             args.transfer_size = reader['transfer_size']
         if 'odirect' in reader:
@@ -812,8 +1027,42 @@ def LoadConfig(args, config):
             args.preprocess_time = preprocess_time if preprocess_time is not None else {}
         if 'preprocess_time_stdev' in reader:
             args.preprocess_time["stdev"] = reader['preprocess_time_stdev']
+        args.transforms = []
+        if 'transforms' in reader and reader['transforms'] is not None:
+            transforms = reader['transforms']
+            if isinstance(transforms, ListConfig):
+                transforms = OmegaConf.to_container(transforms)
+            args.transforms = [dict(transform) for transform in transforms]
         if 'pin_memory' in reader:
             args.pin_memory = reader['pin_memory']
+        if 'prefetch_files' in reader:
+            args.prefetch_files = reader['prefetch_files']
+        if 'io_threads' in reader:
+            args.io_threads = reader['io_threads']
+        if 'async_io' in reader:
+            args.async_io = reader['async_io']
+        if 'io_queue_depth' in reader:
+            args.io_queue_depth = reader['io_queue_depth']
+        if 'read_engine' in reader:
+            args.read_engine = ReadEngine(reader['read_engine'])
+        if 'read_gap_tolerance' in reader:
+            args.read_gap_tolerance = reader['read_gap_tolerance']
+        if 'node_cache_size' in reader:
+            args.node_cache_size = reader['node_cache_size']
+        if 'node_cache_policy' in reader:
+            args.node_cache_policy = CachePolicy(reader['node_cache_policy'])
+        if 'node_cache_slot_size' in reader:
+            args.node_cache_slot_size = reader['node_cache_slot_size']
+        if 'sample_cache_size' in reader:
+            args.sample_cache_size = reader['sample_cache_size']
+        if 'sample_cache_policy' in reader:
+            args.sample_cache_policy = CachePolicy(reader['sample_cache_policy'])
+        if 'batch_buffers' in reader:
+            args.batch_buffers = reader['batch_buffers']
+        if 'batch_buffer_backing' in reader:
+            args.batch_buffer_backing = BufferBacking(reader['batch_buffer_backing'])
+        if 'faithful_decode' in reader:
+            args.faithful_decode = reader['faithful_decode']
 
     # training relevant setting
     if 'train' in config:
@@ -891,6 +1140,28 @@ def LoadConfig(args, config):
             args.checkpoint_mode = CheckpointModeType(config['checkpoint']['mode'])
         if 'randomize_tensor' in config['checkpoint']:
             args.checkpoint_randomize_tensor = config['checkpoint']['randomize_tensor']
+        if 'async' in config['checkpoint']:
+            args.checkpoint_async = config['checkpoint']['async']
+        if 'max_concurrent' in config['checkpoint']:
+            args.checkpoint_max_concurrent = config['checkpoint']['max_concurrent']
+        if 'mechanism' in config['checkpoint']:
+            args.checkpoint_mechanism = CheckpointMechanismType(config['checkpoint']['mechanism'])
+        if 'write_size' in config['checkpoint']:
+            args.checkpoint_write_size = config['checkpoint']['write_size']
+        if 'odirect' in config['checkpoint']:
+            args.checkpoint_odirect = config['checkpoint']['odirect']
+        if 'writer_threads' in config['checkpoint']:
+            args.checkpoint_writer_threads = config['checkpoint']['writer_threads']
+        if 'reader_threads' in config['checkpoint']:
+            args.checkpoint_reader_threads = config['checkpoint']['reader_threads']
+        if 'load_mmap' in config['checkpoint']:
+            args.checkpoint_load_mmap = config['checkpoint']['load_mmap']
+        if 'readahead' in config['checkpoint']:
+            args.checkpoint_readahead = config['checkpoint']['readahead']
+        if 'checksum' in config['checkpoint']:
+            args.checkpoint_checksum = config['checkpoint']['checksum']
+        if 'tensor_provider' in config['checkpoint']:
+            args.checkpoint_tensor_provider = CheckpointTensorProviderType(config['checkpoint']['tensor_provider'])
         if 'ksm' in config['checkpoint']:
             args.ksm_present = True
             if 'madv_mergeable_id' in config['checkpoint']['ksm']:
@@ -952,6 +1223,10 @@ def LoadConfig(args, config):
                 args.metric_exclude_start_steps = int(config['output']['metric']['exclude_start_steps'])
             if 'exclude_end_steps' in config['output']['metric']:
                 args.metric_exclude_end_steps = int(config['output']['metric']['exclude_end_steps'])
+        if 'format' in config['output']:
+            args.output_format = OutputFormat(config['output']['format'])
+        if 'aggregators' in config['output']:
+            args.output_aggregators = int(config['output']['aggregators'])
 
     if args.output_folder is None:
         try:
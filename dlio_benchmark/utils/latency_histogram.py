@@ -0,0 +1,101 @@
+"""
+   Copyright (c) 2025, UChicago Argonne, LLC
+   All Rights Reserved
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import math
+
+import numpy as np
+
+PERCENTILES = [50, 90, 99, 99.9]
+
+
+class LatencyHistogram(object):
+    """
+    HDR histogram style recorder of latencies: microsecond values below 2**SUB_BUCKET_BITS get
+    a bucket each, and every further power of two is split into 2**(SUB_BUCKET_BITS - 1)
+    buckets, so any value up to 2**MAX_EXPONENT microseconds (about 71 minutes, larger values
+    are clamped) is kept within 1/2**(SUB_BUCKET_BITS - 1) of its true value. The counts live in
+    one fixed int64 array, followed by the sum of the recorded microseconds, whatever the number
+    of values recorded; histograms of every rank add up with one MPI reduce of their arrays.
+    """
+    SUB_BUCKET_BITS = 8
+    MAX_EXPONENT = 32
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+    HALF_BUCKETS = SUB_BUCKETS // 2
+    NUM_BUCKETS = SUB_BUCKETS + HALF_BUCKETS * (MAX_EXPONENT - SUB_BUCKET_BITS)
+    SIZE = NUM_BUCKETS + 1
+    UNIT = 1e-6
+
+    def __init__(self, counts=None):
+        self.counts = np.zeros(self.SIZE, dtype=np.int64) if counts is None else counts
+
+    @classmethod
+    def bucket_index(cls, value):
+        if value < cls.SUB_BUCKETS:
+            return value
+        exponent = value.bit_length() - cls.SUB_BUCKET_BITS
+        return min((exponent + 1) * cls.HALF_BUCKETS + (value >> exponent) - cls.HALF_BUCKETS, cls.NUM_BUCKETS - 1)
+
+    @classmethod
+    def bucket_range(cls, index):
+        """
+        Lowest and highest microsecond values counted in bucket index.
+        """
+        if index < cls.SUB_BUCKETS:
+            return index, index
+        exponent = (index - cls.SUB_BUCKETS) // cls.HALF_BUCKETS + 1
+        lowest = ((index - cls.SUB_BUCKETS) % cls.HALF_BUCKETS + cls.HALF_BUCKETS) << exponent
+        return lowest, lowest + (1 << exponent) - 1
+
+    def record(self, seconds):
+        value = max(int(round(seconds / self.UNIT)), 0)
+        self.counts[self.bucket_index(value)] += 1
+        self.counts[self.NUM_BUCKETS] += value
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    def count(self):
+        return int(self.counts[:self.NUM_BUCKETS].sum())
+
+    def percentile(self, q):
+        """
+        Value in seconds below which q percent of the recorded values are, reported like HDR
+        histograms as the highest value of its bucket.
+        """
+        cumulative = np.cumsum(self.counts[:self.NUM_BUCKETS])
+        total = int(cumulative[-1])
+        if total == 0:
+            return 0.0
+        rank = max(math.ceil(q / 100 * total), 1)
+        index = int(np.searchsorted(cumulative, rank))
+        return self.bucket_range(index)[1] * self.UNIT
+
+    def summary(self):
+        """
+        Count, mean, min, max and the PERCENTILES of the recorded values, in seconds.
+        """
+        total = self.count()
+        stats = {'count': total, 'mean': 0.0, 'min': 0.0, 'max': 0.0}
+        stats.update({f'p{q:g}': 0.0 for q in PERCENTILES})
+        if total == 0:
+            return stats
+        buckets = np.flatnonzero(self.counts[:self.NUM_BUCKETS])
+        stats['mean'] = float(self.counts[self.NUM_BUCKETS]) / total * self.UNIT
+        stats['min'] = self.bucket_range(int(buckets[0]))[0] * self.UNIT
+        stats['max'] = self.bucket_range(int(buckets[-1]))[1] * self.UNIT
+        stats.update({f'p{q:g}': self.percentile(q) for q in PERCENTILES})
+        return stats
@@ -17,6 +17,9 @@
 from numpy import append
 from dlio_benchmark.utils.config import ConfigArguments
 from dlio_benchmark.utils.utility import utcnow, DLIOMPI, DLIOLogger
+from dlio_benchmark.common.enumerations import DatasetType, OutputFormat
+from dlio_benchmark.utils.latency_histogram import LatencyHistogram
+from dlio_benchmark.utils.columnar_stats import write_columnar_stats
 
 import os
 import json
@@ -42,6 +45,23 @@ def lines_to_dict(lines):
             dict[k] = v
     return dict
 
+def process_cpu_seconds():
+    """
+    User and system CPU seconds of this process and of its children, such as the data loader
+    workers: the live ones and, through children_user and children_system, those already
+    reaped, so the count never goes back when workers exit.
+    """
+    process = psutil.Process()
+    total = 0.0
+    for proc in [process] + process.children(recursive=True):
+        try:
+            cpu_times = proc.cpu_times()
+            total += cpu_times.user + cpu_times.system
+            total += getattr(cpu_times, 'children_user', 0.0) + getattr(cpu_times, 'children_system', 0.0)
+        except psutil.Error:
+            pass
+    return total
+
 class StatsCounter(object):
 
     def __init__(self):
@@ -53,9 +73,16 @@ class StatsCounter(object):
         self.comm_size = self.args.comm_size
         self.output_folder = self.args.output_folder
         self.record_size = self.args.record_length
+        self.eval_record_size = self.args.record_length
         self.batch_size = self.args.batch_size
         self.batch_size_eval = self.args.batch_size_eval
         self.checkpoint_size = 0.0
+        self.sample_cache_totals = {}
+        # set by the benchmark when the readers count the bytes they deliver
+        self.read_counters = None
+        self.read_bytes_seen = {}
+        # epoch -> block, train, eval or checkpoint -> kind of latency -> histogram
+        self.latency = {}
         self.summary = {}
         self.summary['start'] = utcnow()
         self.summary['num_accelerators'] = self.comm_size
@@ -123,6 +150,10 @@ class StatsCounter(object):
         self.eval_au = []
         self.train_throughput = []
         self.eval_throughput = []
+        self.train_io = []
+        self.eval_io = []
+        self.train_io_rates = []
+        self.eval_io_rates = []
         data_per_node = self.MPI.npernode()*self.args.num_samples_per_file * self.args.num_files_train//self.MPI.size()*self.args.record_length
         self.summary['data_size_per_host_GB'] = data_per_node/1024./1024./1024.
         if self.MPI.rank() == 0 and self.args.do_train:
@@ -139,10 +170,194 @@ class StatsCounter(object):
                 potential_caching.append(1)
         self.summary['potential_caching'] = potential_caching
 
+    def record_file_discovery(self, source, duration):
+        self.output['file_discovery_seconds'] = duration
+        # the slowest rank decides when the benchmark can start
+        max_duration = self.comm.allreduce(duration, op=MPI.MAX)
+        mean_duration = self.comm.allreduce(duration, op=MPI.SUM) / self.comm_size
+        self.summary['file_discovery'] = {'source': source,
+                                          'duration_seconds': max_duration,
+                                          'mean_duration_seconds': mean_duration}
+        if self.my_rank == 0:
+            self.logger.output(f"{utcnow()} Listed dataset files from the {source} in {max_duration:.4f} seconds (mean over ranks {mean_duration:.4f})")
+
+    def record_sample_sizes(self, manifest):
+        """
+        Uses the mean size of the samples of the dataset, from the file sizes of the manifest,
+        for the I/O bandwidth instead of record_length. Only for the indexed binary formats, whose
+        files are exactly their samples, which may have any size.
+        """
+        for dataset_type in [DatasetType.TRAIN, DatasetType.VALID]:
+            entries = manifest[f"{dataset_type}"]
+            samples = sum(entry['samples'] for entry in entries)
+            if samples == 0:
+                continue
+            record_size = sum(entry['size'] for entry in entries) / samples
+            if dataset_type is DatasetType.TRAIN:
+                self.record_size = record_size
+            else:
+                self.eval_record_size = record_size
+        self.summary['mean_record_size'] = {'train': self.record_size, 'valid': self.eval_record_size}
+
+    def record_generation(self, generator):
+        """
+        Records the files and bytes the rank generated and how long it took, and the bandwidth
+        of every rank and of the whole generation, which ends when the slowest rank is done.
+        Storages that do not report file sizes leave the bytes and bandwidths out (None).
+        """
+        GB = 1024 ** 3
+        duration = generator.generation_time
+        sized = self.comm.allreduce(generator.generated_bytes is not None, op=MPI.LAND)
+        bandwidth = None
+        if generator.generated_bytes is not None:
+            bandwidth = generator.generated_bytes / duration / GB if duration > 0 else 0.0
+        self.output['generation'] = {'files': generator.generated_files,
+                                     'bytes': generator.generated_bytes,
+                                     'duration_seconds': duration,
+                                     'GB_per_second': bandwidth}
+        rank_bandwidth = self.comm.gather(bandwidth, root=0)
+        total_files = self.comm.allreduce(generator.generated_files, op=MPI.SUM)
+        total_bytes = self.comm.allreduce(generator.generated_bytes if sized else 0, op=MPI.SUM)
+        max_duration = self.comm.allreduce(duration, op=MPI.MAX)
+        mean_duration = self.comm.allreduce(duration, op=MPI.SUM) / self.comm_size
+        self.summary['generation'] = {'schedule': str(self.args.generation_schedule),
+                                      'processes': self.args.generation_processes,
+                                      'files': total_files,
+                                      'bytes': None,
+                                      'duration_seconds': max_duration,
+                                      'imbalance': max_duration / mean_duration if mean_duration > 0 else 1.0,
+                                      'GB_per_second': None,
+                                      'rank_GB_per_second': None}
+        if sized:
+            self.summary['generation'].update(bytes=total_bytes, rank_GB_per_second=rank_bandwidth,
+                                              GB_per_second=total_bytes / max_duration / GB if max_duration > 0 else 0.0)
+        if self.my_rank != 0:
+            return
+        if not sized:
+            self.logger.output(f"{utcnow()} Generated {total_files} files in {max_duration:.4f} seconds; the storage does not "
+                               f"report file sizes, so no bandwidth is computed")
+        else:
+            self.logger.output(f"{utcnow()} Generated {total_files} files ({total_bytes / GB:.4f} GB) in {max_duration:.4f} seconds: "
+                               f"{self.summary['generation']['GB_per_second']:.4f} GB/s overall, "
+                               f"{np.mean(rank_bandwidth):.4f} GB/s per rank on average (min {np.min(rank_bandwidth):.4f}, "
+                               f"max {np.max(rank_bandwidth):.4f}), slowest rank {self.summary['generation']['imbalance']:.2f}x the mean")
+
+    def record_node_cache(self, cache):
+        hits, misses, evictions = [int(count) for count in cache.row_counters()]
+        self.output['node_cache'] = {'hits': hits, 'misses': misses, 'evictions': evictions}
+        # every rank of a node has its own row of counters in the arena, so summing gives the totals
+        total = np.zeros(3, dtype=np.int64)
+        self.comm.Allreduce(np.array([hits, misses, evictions], dtype=np.int64), total, op=MPI.SUM)
+        hits, misses, evictions = [int(count) for count in total]
+        lookups = hits + misses
+        self.summary['node_cache'] = {'policy': str(cache.policy),
+                                      'capacity_bytes': cache.num_slots * cache.slot_size,
+                                      'slot_bytes': cache.slot_size,
+                                      'slots': cache.num_slots,
+                                      'hits': hits,
+                                      'misses': misses,
+                                      'evictions': evictions,
+                                      'hit_ratio': hits / lookups if lookups > 0 else 0.0}
+        if self.my_rank == 0:
+            self.logger.output(f"{utcnow()} Node sample cache ({cache.policy}, {cache.num_slots} slots of {cache.slot_size} bytes): "
+                               f"{hits} hits, {misses} misses, {evictions} evictions, hit ratio {self.summary['node_cache']['hit_ratio']:.4f}")
+
+    def record_sample_cache(self, epoch, counters):
+        """
+        Records the hits, misses and evictions of the reader sample caches during the epoch,
+        the counters being cumulative over the run.
+        """
+        self.output[epoch]['sample_cache'] = {}
+        for dataset_type in [DatasetType.TRAIN, DatasetType.VALID]:
+            totals = counters.totals(dataset_type, self.args.read_threads)
+            hits, misses, evictions = [int(count) for count in totals - self.sample_cache_totals.get(dataset_type, 0)]
+            self.sample_cache_totals[dataset_type] = totals
+            if dataset_type is DatasetType.VALID and not self.args.do_eval:
+                continue
+            lookups = hits + misses
+            self.output[epoch]['sample_cache'][f'{dataset_type}'] = {'hits': hits, 'misses': misses, 'evictions': evictions,
+                                                                     'hit_rate': hits / lookups if lookups > 0 else 0.0}
+        epoch_stats = self.output[epoch]['sample_cache'][f'{DatasetType.TRAIN}']
+        total = np.zeros(3, dtype=np.int64)
+        self.comm.Allreduce(np.array([epoch_stats['hits'], epoch_stats['misses'], epoch_stats['evictions']], dtype=np.int64),
+                            total, op=MPI.SUM)
+        hits, misses, evictions = [int(count) for count in total]
+        if 'sample_cache' not in self.summary:
+            self.summary['sample_cache'] = {'policy': str(self.args.sample_cache_policy),
+                                            'capacity_bytes': self.args.sample_cache_size,
+                                            'hits': [], 'misses': [], 'evictions': [], 'hit_rate': []}
+        summary = self.summary['sample_cache']
+        summary['hits'].append(hits)
+        summary['misses'].append(misses)
+        summary['evictions'].append(evictions)
+        summary['hit_rate'].append(hits / (hits + misses) if hits + misses > 0 else 0.0)
+        if self.my_rank == 0:
+            self.logger.output(f"{utcnow()} Epoch {epoch} - sample cache ({self.args.sample_cache_policy}): {hits} hits, "
+                               f"{misses} misses, {evictions} evictions, hit rate {summary['hit_rate'][-1]:.4f}")
+
+    def record_async_checkpoints(self, checkpoints):
+        """
+        Summarizes the asynchronous checkpoints of the ranks: the time training was blocked saving
+        them, the time to persist them, slowest rank first, and the share of it overlapping with
+        training.
+        """
+        if not self.args.checkpoint_async:
+            return
+        self.output['async_checkpoints'] = [{name: value for name, value in checkpoint.items() if name not in ['persist_start', 'persist_end']}
+                                            for checkpoint in checkpoints]
+        columns = np.array([[checkpoint[name] for name in ['blocked', 'staging', 'persist', 'overlap']]
+                            for checkpoint in checkpoints], dtype=np.float64).reshape(-1, 4)
+        columns = self.comm.gather(columns, root=0)
+        if self.my_rank != 0 or len(checkpoints) == 0:
+            return
+        blocked, staging, persist, overlap = np.moveaxis(np.stack(columns), 2, 0)
+        slowest_persist = np.max(persist, axis=0)
+        self.summary['metric']['save_checkpoint_blocked_mean_seconds'] = np.mean(np.max(blocked, axis=0))
+        self.summary['metric']['save_checkpoint_staging_mean_seconds'] = np.mean(np.max(staging, axis=0))
+        self.summary['metric']['save_checkpoint_persist_mean_seconds'] = np.mean(slowest_persist)
+        self.summary['metric']['save_checkpoint_persist_stdev_seconds'] = np.std(slowest_persist)
+        self.summary['metric']['save_checkpoint_persist_io_mean_GB_per_second'] = np.mean(self.checkpoint_size / np.maximum(slowest_persist, 1e-9))
+        self.summary['metric']['save_checkpoint_overlap_percentage'] = 100 * np.sum(overlap) / np.sum(persist) if np.sum(persist) > 0 else 0.0
+        self.logger.output(f"{utcnow()} Asynchronous checkpoints: blocked {self.summary['metric']['save_checkpoint_blocked_mean_seconds']:.4f} s, "
+                           f"persisted in {self.summary['metric']['save_checkpoint_persist_mean_seconds']:.4f} s, "
+                           f"{self.summary['metric']['save_checkpoint_overlap_percentage']:.2f}% overlapping with training")
+
+    def record_checkpoint_loads(self, loads):
+        """
+        Summarizes the files read by the checkpoint loads of the ranks: the bandwidth of every
+        file and of every load, the bytes read by all the ranks over the time of the slowest.
+        """
+        if len(loads) > 0:
+            self.output['checkpoint_loads'] = loads
+        loads = self.comm.gather([(load['checkpoint'], load['bytes'], load['seconds'],
+                                   [file['bytes'] / max(file['seconds'], 1e-9) for file in load['files']])
+                                  for load in loads], root=0)
+        if self.my_rank != 0:
+            return
+        loads = [load for rank_loads in loads for load in rank_loads]
+        if len(loads) == 0:
+            return
+        checkpoints = {}
+        for checkpoint, nbytes, seconds, _ in loads:
+            total_bytes, slowest = checkpoints.get(checkpoint, (0, 0.0))
+            checkpoints[checkpoint] = (total_bytes + nbytes, max(slowest, seconds))
+        GB = 1024. * 1024. * 1024.
+        file_io = np.array([rate for load in loads for rate in load[3]], dtype=np.float64) / GB
+        self.summary['metric']['load_checkpoint_files'] = len(file_io)
+        if len(file_io) > 0:
+            self.summary['metric']['load_checkpoint_file_io_mean_GB_per_second'] = np.mean(file_io)
+            self.summary['metric']['load_checkpoint_file_io_min_GB_per_second'] = np.min(file_io)
+            self.summary['metric']['load_checkpoint_file_io_max_GB_per_second'] = np.max(file_io)
+        self.summary['metric']['load_checkpoint_read_io_mean_GB_per_second'] = np.mean(
+            [nbytes / GB / max(seconds, 1e-9) for nbytes, seconds in checkpoints.values()])
+        self.logger.output(f"{utcnow()} Checkpoint loads: {len(file_io)} files read at "
+                           f"{self.summary['metric']['load_checkpoint_read_io_mean_GB_per_second']:.4f} GB/s")
+
     def start_run(self):
         self.start_run_timestamp = time()
     def end_run(self):
         self.end_run_timestamp = time()
+        self.reduce_latency()
         if self.args.do_checkpoint and self.my_rank == 0:
             duration_save = []
             io_save = []
@@ -182,8 +397,7 @@ class StatsCounter(object):
                 self.summary['metric']['train_throughput_samples_per_second'] = list(train_throughput)
                 self.summary['metric']['train_throughput_mean_samples_per_second'] = np.mean(train_throughput)
                 self.summary['metric']['train_throughput_stdev_samples_per_second'] = np.std(train_throughput)
-                self.summary['metric']['train_io_mean_MB_per_second'] = np.mean(train_throughput)*self.record_size/1024./1024.
-                self.summary['metric']['train_io_stdev_MB_per_second'] = np.std(train_throughput)*self.record_size/1024./1024.
+                self.summarize_io('train', self.train_io, self.train_io_rates, train_throughput, self.record_size)
             
             if self.args.do_eval:
                 eval_au = np.array(self.comm.allreduce(self.eval_au))/self.comm.size
@@ -198,8 +412,7 @@ class StatsCounter(object):
                 self.summary['metric']['eval_throughput_samples_per_second'] = list(eval_throughput)
                 self.summary['metric']['eval_throughput_mean_samples_per_second'] = np.mean(eval_throughput)
                 self.summary['metric']['eval_throughput_stdev_samples_per_second'] = np.std(eval_throughput)
-                self.summary['metric']['eval_io_mean_MB_per_second'] = np.mean(eval_throughput)*self.record_size/1024./1024.
-                self.summary['metric']['eval_io_stdev_MB_per_second'] = np.std(eval_throughput)*self.record_size/1024./1024.
+                self.summarize_io('eval', self.eval_io, self.eval_io_rates, eval_throughput, self.eval_record_size)
             if self.my_rank==0:
                 self.logger.output(f"{utcnow()} Saved outputs in {self.output_folder}")   
                 metric="Averaged metric over all steps/epochs\n[METRIC] ==========================================================\n"
@@ -207,23 +420,42 @@ class StatsCounter(object):
                 if self.args.do_train:
                     metric = metric + f"[METRIC] Training Accelerator Utilization [AU] (%): {np.mean(train_au):.4f} ({np.std(train_au):.4f})\n"
                     metric = metric + f"[METRIC] Training Throughput (samples/second): {np.mean(train_throughput):.4f} ({np.std(train_throughput):.4f})\n"
-                    metric = metric + f"[METRIC] Training I/O Throughput (MB/second): {np.mean(train_throughput)*self.record_size/1024/1024:.4f} ({np.std(train_throughput)*self.record_size/1024/1024:.4f})\n"
+                    metric = metric + f"[METRIC] Training I/O Throughput (MB/second): {self.summary['metric']['train_io_mean_MB_per_second']:.4f} ({self.summary['metric']['train_io_stdev_MB_per_second']:.4f})\n"
                     metric = metric + f"[METRIC] train_au_meet_expectation: {self.summary['metric']['train_au_meet_expectation']}\n"
+                    for kind, name in [('load', 'load'), ('step', 'step')]:
+                        if kind in self.summary.get('latency', {}).get('train', {}):
+                            metric = metric + self.latency_metric(f"Training {name} time per step", self.summary['latency']['train'][kind])
                 if self.args.do_checkpoint: 
                     if self.args.num_checkpoints_write > 0:
                         metric = metric + f"[METRIC] Checkpoint save duration (seconds): {self.summary['metric']['save_checkpoint_duration_mean_seconds']:.4f} ({self.summary['metric']['save_checkpoint_duration_stdev_seconds']:.4f})\n"
                         metric = metric + f"[METRIC] Checkpoint save I/O Throughput (GB/second): {self.summary['metric']['save_checkpoint_io_mean_GB_per_second']:.4f} ({self.summary['metric']['save_checkpoint_io_stdev_GB_per_second']:.4f})\n"
+                        if 'save' in self.summary.get('latency', {}).get('checkpoint', {}):
+                            metric = metric + self.latency_metric("Checkpoint save time", self.summary['latency']['checkpoint']['save'])
+                    if 'save_checkpoint_persist_mean_seconds' in self.summary['metric']:
+                        metric = metric + f"[METRIC] Checkpoint save blocked time (seconds): {self.summary['metric']['save_checkpoint_blocked_mean_seconds']:.4f}\n"
+                        metric = metric + f"[METRIC] Checkpoint persist duration (seconds): {self.summary['metric']['save_checkpoint_persist_mean_seconds']:.4f} ({self.summary['metric']['save_checkpoint_persist_stdev_seconds']:.4f})\n"
+                        metric = metric + f"[METRIC] Checkpoint persist I/O Throughput (GB/second): {self.summary['metric']['save_checkpoint_persist_io_mean_GB_per_second']:.4f}\n"
+                        metric = metric + f"[METRIC] Checkpoint persist overlap with training (%): {self.summary['metric']['save_checkpoint_overlap_percentage']:.2f}\n"
                     if self.args.num_checkpoints_read > 0:
                         metric = metric + f"[METRIC] Checkpoint load duration (seconds): {self.summary['metric']['load_checkpoint_duration_mean_seconds']:.4f} ({self.summary['metric']['load_checkpoint_duration_stdev_seconds']:.4f})\n"
                         metric = metric + f"[METRIC] Checkpoint load I/O Throughput (GB/second): {self.summary['metric']['load_checkpoint_io_mean_GB_per_second']:.4f} ({self.summary['metric']['load_checkpoint_io_stdev_GB_per_second']:.4f})\n"
+                        if 'load' in self.summary.get('latency', {}).get('checkpoint', {}):
+                            metric = metric + self.latency_metric("Checkpoint load time", self.summary['latency']['checkpoint']['load'])
+                        if 'load_checkpoint_read_io_mean_GB_per_second' in self.summary['metric']:
+                            metric = metric + f"[METRIC] Checkpoint load read I/O Throughput (GB/second): {self.summary['metric']['load_checkpoint_read_io_mean_GB_per_second']:.4f}\n"
+                        if 'load_checkpoint_file_io_mean_GB_per_second' in self.summary['metric']:
+                            metric = metric + f"[METRIC] Checkpoint load file I/O Throughput (GB/second): {self.summary['metric']['load_checkpoint_file_io_mean_GB_per_second']:.4f} (min {self.summary['metric']['load_checkpoint_file_io_min_GB_per_second']:.4f}, max {self.summary['metric']['load_checkpoint_file_io_max_GB_per_second']:.4f})\n"
 
                 if self.args.do_eval:
                     metric = metric + f"[METRIC] Eval Accelerator Utilization [AU] (%): {np.mean(eval_au):.4f} ({np.std(eval_au):.4f})\n"
                     metric = metric + f"[METRIC] Eval Throughput (samples/second): {np.mean(eval_throughput):.6f} ({np.std(eval_throughput):.6f})\n"
-                    metric = metric + f"[METRIC] Eval Throughput (MB/second): {np.mean(eval_throughput)*self.record_size/1024/1024:.6f} ({np.std(eval_throughput)*self.record_size/1024/1024:.6f})\n"
+                    metric = metric + f"[METRIC] Eval Throughput (MB/second): {self.summary['metric']['eval_io_mean_MB_per_second']:.6f} ({self.summary['metric']['eval_io_stdev_MB_per_second']:.6f})\n"
                     metric = metric + f"[METRIC] eval_au_meet_expectation: {self.summary['metric']['eval_au_meet_expectation']}\n"
                 metric+="[METRIC] ==========================================================\n"
                 self.logger.output(metric)   
+    def latency_metric(self, name, stats):
+        return f"[METRIC] {name} (second) p50/p90/p99/p99.9: {stats['p50']:.4f}/{stats['p90']:.4f}/{stats['p99']:.4f}/{stats['p99.9']:.4f}\n"
+
     def start_train(self, epoch):   
         ts = utcnow()
         self.per_epoch_stats[epoch] = {
@@ -241,8 +473,12 @@ class StatsCounter(object):
         self.output[epoch]['throughput'] = {}
         self.output[epoch]['au'] = {}
         self.output[epoch]['compute'] = {}
+        self.output[epoch]['bytes'] = {}
+        self.output[epoch]['io'] = {}
+        self.output[epoch]['latency'] = {}
         if os.path.exists("/proc/meminfo"):
             self.output[epoch]['host_meminfo'] = lines_to_dict(open("/proc/meminfo", "r").read())
+        self.train_cpu_start = (process_cpu_seconds(), time())
 
     def end_train(self, epoch, steps):
         au = np.array([self.output[epoch]['au'][k] for k in self.output[epoch]['au']])
@@ -256,12 +492,35 @@ class StatsCounter(object):
             throughput = np.sum(throughput*steps)/np.sum(steps)
         self.train_au.append(au)
         self.train_throughput.append(throughput)
+        blocks = [k for k in self.output[epoch]['io'] if k.startswith('block')]
+        if len(blocks) > 0:
+            block_steps = np.array([len(self.output[epoch]['proc'][k]) for k in blocks])
+            block_io = np.array([self.output[epoch]['io'][k]['MB_per_second'] for k in blocks])
+            io = np.sum(block_io*block_steps)/np.sum(block_steps) if np.sum(block_steps) > 0 else 0.0
+            rates = np.concatenate([self.step_io_rates(epoch, k, self.metric_start_step, self.metric_end_step) for k in blocks])
+            self.output[epoch]['io']['train'] = {'bytes': sum(self.output[epoch]['io'][k]['bytes'] for k in blocks),
+                                                 'MB_per_second': io}
+            self.output[epoch]['io']['train'].update(self.io_percentiles(rates))
+            self.train_io.append(io)
+            self.train_io_rates.append(rates)
+        merged = {}
+        for key, histograms in self.latency.get(epoch, {}).items():
+            if key.startswith('block'):
+                for kind, histogram in histograms.items():
+                    merged.setdefault(kind, LatencyHistogram()).merge(histogram)
+        if len(merged) > 0:
+            self.latency[epoch]['train'] = merged
+            self.latency_summary(epoch, 'train')
 
         ts = utcnow()
         duration = pd.to_datetime(ts) - pd.to_datetime(self.per_epoch_stats[epoch]['start'])
         duration = '{:.2f}'.format(duration.total_seconds())
         self.per_epoch_stats[epoch]['end'] = ts
         self.per_epoch_stats[epoch]['duration'] = duration
+        # cores kept busy by the rank and its workers, to tell decode bound epochs from I/O bound ones
+        cpu_seconds = process_cpu_seconds() - self.train_cpu_start[0]
+        self.output[epoch]['cpu_seconds'] = cpu_seconds
+        self.output[epoch]['cpu_cores'] = cpu_seconds / max(time() - self.train_cpu_start[1], 1e-9)
         if self.my_rank == 0:
             self.logger.output(f"{ts} Ending epoch {epoch} - {np.sum(steps)} steps completed in {duration} s")
 
@@ -276,13 +535,20 @@ class StatsCounter(object):
         self.output[epoch]['load']['eval'] = []
         self.output[epoch]['proc']['eval'] = []
         self.output[epoch]['compute']['eval'] = []
+        if self.read_counters is not None:
+            self.output[epoch].setdefault('bytes', {})['eval'] = []
+            self.output[epoch].setdefault('io', {})
         self.output[epoch]['au']['eval'] = 0.0
         self.output[epoch]['throughput']['eval'] = 0.0
     def end_eval(self, epoch):
         self.end_timestamp = time()
         self.compute_metrics_eval(epoch)
+        self.latency_summary(epoch, 'eval')
         self.eval_au.append(self.output[epoch]['au']['eval'])
         self.eval_throughput.append(self.output[epoch]['throughput']['eval'] )
+        if 'eval' in self.output[epoch].get('io', {}):
+            self.eval_io.append(self.output[epoch]['io']['eval']['MB_per_second'])
+            self.eval_io_rates.append(self.step_io_rates(epoch, 'eval', self.metric_start_step_eval, self.metric_end_step_eval))
         ts = utcnow()
         duration = pd.to_datetime(ts)- pd.to_datetime(self.per_epoch_stats[epoch]['eval']['start'])
         duration = '{:.2f}'.format(duration.total_seconds())
@@ -292,6 +558,8 @@ class StatsCounter(object):
             self.logger.output(f"{ts} Ending eval - {self.steps_eval} steps completed in {duration} s")
             self.logger.output(f"{utcnow()} Epoch {epoch} [Eval] Accelerator Utilization [AU] (%): {self.output[epoch]['au']['eval']:.4f}")
             self.logger.output(f"{utcnow()} Epoch {epoch} [Eval] Throughput (samples/second): {self.output[epoch]['throughput']['eval']*self.comm_size:.4f}")
+            if 'eval' in self.output[epoch].get('io', {}):
+                self.logger.output(f"{utcnow()} Epoch {epoch} [Eval] {self.io_message(self.output[epoch]['io']['eval'])}")
 
     def start_epoch(self, epoch=1):
         ts = utcnow()
@@ -302,6 +570,9 @@ class StatsCounter(object):
             self.output[epoch]['throughput'] = {}
             self.output[epoch]['au'] = {}
             self.output[epoch]['compute'] = {}
+            self.output[epoch]['bytes'] = {}
+            self.output[epoch]['io'] = {}
+            self.output[epoch]['latency'] = {}
         if not(epoch in self.per_epoch_stats):
             self.per_epoch_stats[epoch] = {'start': ts}
     def end_epoch(self, epoch=1):
@@ -316,6 +587,8 @@ class StatsCounter(object):
         self.output[epoch]['throughput'][f'block{block}'] = []
         self.output[epoch]['au'][f'block{block}'] = []
         self.output[epoch]['compute'][f'block{block}'] = []
+        if self.read_counters is not None:
+            self.output[epoch]['bytes'][f'block{block}'] = []
         ts = utcnow()
         self.per_epoch_stats[epoch][f'block{block}'] = {
             'start': ts
@@ -326,6 +599,7 @@ class StatsCounter(object):
     def end_block(self, epoch, block, steps_taken):
         self.end_timestamp = time()
         self.compute_metrics_train(epoch, block)
+        self.latency_summary(epoch, f'block{block}')
         if 'end' in self.per_epoch_stats[epoch][f'block{block}']:
             return
         ts = utcnow()
@@ -339,6 +613,11 @@ class StatsCounter(object):
             if self.args.do_train:
                 self.logger.output(f"{utcnow()} Epoch {epoch} - Block {block} [Training] Accelerator Utilization [AU] (%): {self.output[epoch]['au'][f'block{block}']:.4f}")
                 self.logger.output(f"{utcnow()} Epoch {epoch} - Block {block} [Training] Throughput (samples/second): {self.output[epoch]['throughput'][f'block{block}']*self.comm_size:.4f}")
+                if f'block{block}' in self.output[epoch]['latency']:
+                    load = self.output[epoch]['latency'][f'block{block}']['load']
+                    self.logger.output(f"{utcnow()} Epoch {epoch} - Block {block} [Training] Load time per step (second): p50 {load['p50']:.4f}, p90 {load['p90']:.4f}, p99 {load['p99']:.4f}, p99.9 {load['p99.9']:.4f}")
+                if f'block{block}' in self.output[epoch]['io']:
+                    self.logger.output(f"{utcnow()} Epoch {epoch} - Block {block} [Training] {self.io_message(self.output[epoch]['io'][f'block{block}'])}")
                 self.logger.output(f"{utcnow()} Epoch {epoch} - Block {block} [Training] Computation time per step (second): {np.mean(self.output[epoch]['compute'][f'block{block}'][self.metric_start_step:self.metric_end_step+1]):.4f}+/-{np.std(self.output[epoch]['compute'][f'block{block}'][self.metric_start_step:self.metric_end_step+1]):.4f} (set value: {self.args.computation_time})")
 
     def start_save_ckpt(self, epoch, block, steps_taken):
@@ -355,8 +634,13 @@ class StatsCounter(object):
         self.per_epoch_stats[epoch][f'save_ckpt{block}']['end'] = ts
         self.per_epoch_stats[epoch][f'save_ckpt{block}']['duration'] = float(duration.total_seconds())
         self.per_epoch_stats[epoch][f'save_ckpt{block}']['throughput'] = self.checkpoint_size / float(duration.total_seconds())
+        self.record_latency(epoch, 'checkpoint', 'save', duration.total_seconds())
+        self.latency_summary(epoch, 'checkpoint')
         if self.my_rank == 0:
-            self.logger.output(f"{ts} Finished saving checkpoint {block} for epoch {epoch} in {duration.total_seconds():.4f} s; Throughput: {self.per_epoch_stats[epoch][f'save_ckpt{block}']['throughput']:.4f} GB/s")
+            if self.args.checkpoint_async:
+                self.logger.output(f"{ts} Staged checkpoint {block} for epoch {epoch} in {duration.total_seconds():.4f} s; persisting it in the background")
+            else:
+                self.logger.output(f"{ts} Finished saving checkpoint {block} for epoch {epoch} in {duration.total_seconds():.4f} s; Throughput: {self.per_epoch_stats[epoch][f'save_ckpt{block}']['throughput']:.4f} GB/s")
 
     def start_load_ckpt(self, epoch, block, steps_taken):
         ts = utcnow()
@@ -372,6 +656,8 @@ class StatsCounter(object):
         self.per_epoch_stats[epoch][f'load_ckpt{block}']['end'] = ts
         self.per_epoch_stats[epoch][f'load_ckpt{block}']['duration'] = float(duration.total_seconds())
         self.per_epoch_stats[epoch][f'load_ckpt{block}']['throughput'] = self.checkpoint_size / float(duration.total_seconds())
+        self.record_latency(epoch, 'checkpoint', 'load', duration.total_seconds())
+        self.latency_summary(epoch, 'checkpoint')
         if self.my_rank == 0:
             self.logger.output(f"{ts} Finished loading checkpoint {block} for epoch {epoch} in {duration.total_seconds():.4f} s; Throughput: {self.per_epoch_stats[epoch][f'load_ckpt{block}']['throughput']:.4f} GB/s")
 
@@ -386,6 +672,9 @@ class StatsCounter(object):
             self.output[epoch]['load'][key].append(duration)
         else:
             self.output[epoch]['load'][key] = [duration]
+        if key in self.output[epoch].get('bytes', {}):
+            self.output[epoch]['bytes'][key].append(self.read_bytes(DatasetType.TRAIN))
+        self.record_latency(epoch, key, 'load', duration)
         self.logger.info(f"{utcnow()} Rank {self.my_rank} step {step}: loaded {self.batch_size} samples in {duration:.4f} s")
 
     def batch_processed(self, epoch, step, block):
@@ -399,6 +688,8 @@ class StatsCounter(object):
         else:
             self.output[epoch]['proc'] = [duration]
             self.output[epoch]['compute']=[self.computation_time]
+        self.record_latency(epoch, key, 'compute', self.computation_time)
+        self.record_latency(epoch, key, 'step', duration)
         self.logger.info(f"{utcnow()} Rank {self.my_rank} step {step} processed {self.batch_size} samples in {duration:.4f}s)")
 
     def compute_metrics_train(self, epoch, block):
@@ -412,6 +703,8 @@ class StatsCounter(object):
         throughput = (len(self.output[epoch]['compute'][key]) - 2)/(total_time)*self.batch_size
         self.output[epoch]['au'][key] = au*100
         self.output[epoch]['throughput'][key] = throughput
+        if key in self.output[epoch].get('bytes', {}):
+            self.compute_io(epoch, key, total_time, self.metric_start_step, self.metric_end_step)
 
     def compute_metrics_eval(self, epoch):
         key = 'eval'
@@ -424,10 +717,130 @@ class StatsCounter(object):
         throughput = len(self.output[epoch]['compute'][key])/(self.end_timestamp - self.start_timestamp)*self.batch_size_eval
         self.output[epoch]['au'][key] = au*100
         self.output[epoch]['throughput'][key] = throughput
+        if key in self.output[epoch].get('bytes', {}):
+            total_time = self.end_timestamp - self.start_timestamp - np.sum(self.output[epoch]['proc'][key][:self.metric_start_step_eval]) - np.sum(self.output[epoch]['proc'][key][self.metric_end_step_eval+1:])
+            self.compute_io(epoch, key, total_time, self.metric_start_step_eval, self.metric_end_step_eval)
+
+    def record_latency(self, epoch, key, kind, seconds):
+        self.latency.setdefault(epoch, {}).setdefault(key, {}).setdefault(kind, LatencyHistogram()).record(seconds)
+
+    def latency_summary(self, epoch, key):
+        """
+        Writes the count, mean, extremes and percentiles of the latencies of the rank during a
+        block, an epoch, the evaluation or the checkpoints of the epoch to the output.
+        """
+        histograms = self.latency.get(epoch, {}).get(key, {})
+        if len(histograms) > 0:
+            self.output[epoch].setdefault('latency', {})[key] = {kind: histograms[kind].summary() for kind in histograms}
+
+    def reduce_latency(self):
+        """
+        Adds up the latency histograms of all the ranks with one reduce, every rank sending the
+        histograms rank 0 has, in the order of rank 0, and writes their percentiles per epoch
+        and over the whole run to the summary.
+        """
+        names = None
+        if self.my_rank == 0:
+            names = sorted((epoch, key, kind) for epoch in self.latency for key in self.latency[epoch]
+                           for kind in self.latency[epoch][key])
+        names = self.comm.bcast(names, root=0)
+        if len(names) == 0:
+            return
+        local = np.zeros((len(names), LatencyHistogram.SIZE), dtype=np.int64)
+        for i, (epoch, key, kind) in enumerate(names):
+            histogram = self.latency.get(epoch, {}).get(key, {}).get(kind)
+            if histogram is not None:
+                local[i] = histogram.counts
+        total = np.zeros_like(local) if self.my_rank == 0 else None
+        self.comm.Reduce(local, total, op=MPI.SUM, root=0)
+        if self.my_rank != 0:
+            return
+        epochs = {}
+        run = {}
+        for i, (epoch, key, kind) in enumerate(names):
+            histogram = LatencyHistogram(total[i])
+            epochs.setdefault(epoch, {}).setdefault(key, {})[kind] = histogram.summary()
+            if not key.startswith('block'):
+                run.setdefault(key, {}).setdefault(kind, LatencyHistogram()).merge(histogram)
+        self.summary['latency'] = {key: {kind: run[key][kind].summary() for kind in run[key]} for key in run}
+        self.summary['latency']['epochs'] = epochs
+
+    def read_bytes(self, dataset_type):
+        """
+        Bytes the readers of the rank read from storage for dataset_type since the last call,
+        from the read counters, which are cumulative over the run.
+        """
+        total = int(self.read_counters.totals(dataset_type, self.args.read_threads)[self.read_counters.BYTES])
+        nbytes = total - self.read_bytes_seen.get(dataset_type, 0)
+        self.read_bytes_seen[dataset_type] = total
+        return nbytes
+
+    def step_io_rates(self, epoch, key, start_step, end_step):
+        """
+        MB/s of every measured step: the bytes read for the step over the time the step took.
+        """
+        step_bytes = np.array(self.output[epoch]['bytes'][key][start_step:end_step+1], dtype=np.float64)
+        step_time = np.array(self.output[epoch]['proc'][key][start_step:end_step+1], dtype=np.float64)
+        steps = min(len(step_bytes), len(step_time))
+        return step_bytes[:steps] / np.maximum(step_time[:steps], 1e-9) / 1024 / 1024
+
+    def io_percentiles(self, rates):
+        if len(rates) == 0:
+            return {'p50_MB_per_second': 0.0, 'p90_MB_per_second': 0.0, 'p99_MB_per_second': 0.0}
+        p50, p90, p99 = np.percentile(rates, [50, 90, 99])
+        return {'p50_MB_per_second': float(p50), 'p90_MB_per_second': float(p90), 'p99_MB_per_second': float(p99)}
+
+    def compute_io(self, epoch, key, total_time, start_step, end_step):
+        """
+        I/O bandwidth of the rank over the measured steps of a block or of the evaluation, from
+        the bytes the readers actually delivered rather than from record_length, with the
+        percentiles of the bandwidth of single steps.
+        """
+        step_bytes = self.output[epoch]['bytes'][key]
+        measured_bytes = np.sum(step_bytes[start_step:end_step+1])
+        io = {'bytes': int(np.sum(step_bytes)),
+              'MB_per_second': float(measured_bytes / total_time / 1024 / 1024) if total_time > 0 else 0.0}
+        io.update(self.io_percentiles(self.step_io_rates(epoch, key, start_step, end_step)))
+        self.output[epoch]['io'][key] = io
+
+    def io_message(self, io):
+        return (f"I/O Throughput (MB/second): {io['MB_per_second']*self.comm_size:.4f}; "
+                f"rank step p50 {io['p50_MB_per_second']:.4f}, p90 {io['p90_MB_per_second']:.4f}, "
+                f"p99 {io['p99_MB_per_second']:.4f}")
+
+    def summarize_io(self, prefix, rank_io, rank_rates, throughput, record_size):
+        """
+        Fills the {prefix}_io metrics of the summary. Each epoch's bandwidth is the sum over the
+        ranks, like the throughput, of the bandwidth the readers measured, and the percentiles
+        are those of the step bandwidth of every rank. Without read counts, as with the DALI
+        readers, the bandwidth is the throughput times the mean sample size.
+        """
+        measured_bytes = sum(self.output[e]['io'][prefix]['bytes'] for e in self.output
+                             if isinstance(self.output[e], dict) and prefix in self.output[e].get('io', {}))
+        # every rank must have measured every epoch for the sums over the ranks to line up
+        measured = self.comm.allreduce(int(measured_bytes), op=MPI.SUM) > 0 and \
+            self.comm.allreduce(len(rank_io), op=MPI.MIN) == self.comm.allreduce(len(rank_io), op=MPI.MAX)
+        metric = self.summary['metric']
+        if measured:
+            io = self.comm.allreduce(np.array(rank_io))
+            rates = self.comm.gather(np.concatenate(rank_rates) if len(rank_rates) > 0 else np.zeros(0), root=0)
+            metric[f'{prefix}_io_source'] = 'read_counters'
+        else:
+            io = np.array(throughput)*record_size/1024./1024.
+            metric[f'{prefix}_io_source'] = 'record_length'
+        metric[f'{prefix}_io_MB_per_second'] = list(io)
+        metric[f'{prefix}_io_mean_MB_per_second'] = np.mean(io)
+        metric[f'{prefix}_io_stdev_MB_per_second'] = np.std(io)
+        if measured and self.my_rank == 0:
+            for name, value in self.io_percentiles(np.concatenate(rates)).items():
+                metric[f'{prefix}_io_step_{name}'] = value
 
     def eval_batch_loaded(self, epoch, step):
         duration = time() - self.start_time_loading
         self.output[epoch]['load']['eval'].append(duration)
+        if 'eval' in self.output[epoch].get('bytes', {}):
+            self.output[epoch]['bytes']['eval'].append(self.read_bytes(DatasetType.VALID))
+        self.record_latency(epoch, 'eval', 'load', duration)
         self.logger.info(f"{utcnow()} Rank {self.my_rank} step {step} loaded {self.batch_size_eval} samples in {duration:.4f} s")
 
     def eval_batch_processed(self, epoch, step):
@@ -436,21 +849,44 @@ class StatsCounter(object):
         computation_time = current_time - self.start_time_compute
         self.output[epoch]['proc']['eval'].append(duration)
         self.output[epoch]['compute']['eval'].append(computation_time)
+        self.record_latency(epoch, 'eval', 'compute', computation_time)
+        self.record_latency(epoch, 'eval', 'step', duration)
         self.logger.info(f"{utcnow()} Rank {self.my_rank} step {step} processed {self.batch_size_eval} samples in {duration:.4f} s")
     def finalize(self):
         self.summary['end'] = utcnow()
     def save_data(self):
         # Dump statistic counters to files for postprocessing
         # Overall stats
-        with open(os.path.join(self.output_folder, f'{self.my_rank}_per_epoch_stats.json'), 'w') as outfile:
-            json.dump(self.per_epoch_stats, outfile, indent=4)
-            outfile.flush()
         if self.my_rank == 0:
             with open(os.path.join(self.output_folder, 'summary.json'), 'w') as outfile:
                 json.dump(self.summary, outfile, indent=4)
         self.output['hostname'] = socket.gethostname()
+        if self.args.output_format is OutputFormat.NPZ:
+            self.save_columnar_data()
+            return
+        with open(os.path.join(self.output_folder, f'{self.my_rank}_per_epoch_stats.json'), 'w') as outfile:
+            json.dump(self.per_epoch_stats, outfile, indent=4)
+            outfile.flush()
         with open(os.path.join(self.output_folder, f'{self.my_rank}_output.json'), 'w') as outfile:
             json.dump(self.output, outfile, indent=4)
             outfile.flush()
         if self.my_rank == 0:
             self.logger.output(f"{utcnow()} outputs saved in RANKID_output.json")
+
+    def save_columnar_data(self):
+        """
+        Gathers the outputs of the ranks to output.aggregators ranks, each the first of a
+        contiguous group of ranks, which write them as one stats_{group}.npz file per group
+        instead of two JSON files per rank.
+        """
+        aggregators = min(self.args.output_aggregators, self.comm_size)
+        group = self.my_rank * aggregators // self.comm_size
+        group_comm = self.comm.Split(group, self.my_rank)
+        # the outputs go through JSON so that every value is a plain type, as in the JSON files
+        parts = group_comm.gather((self.my_rank, json.loads(json.dumps(self.output)),
+                                   json.loads(json.dumps(self.per_epoch_stats))), root=0)
+        if group_comm.rank == 0:
+            write_columnar_stats(os.path.join(self.output_folder, f'stats_{group}.npz'), parts)
+        group_comm.Free()
+        if self.my_rank == 0:
+            self.logger.output(f"{utcnow()} outputs saved in {aggregators} stats_GROUPID.npz files")
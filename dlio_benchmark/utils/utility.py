@@ -161,6 +161,7 @@ class DLIOMPI:
             self.mpi_size = MPI.COMM_WORLD.size
             self.mpi_world = MPI.COMM_WORLD
             split_comm = MPI.COMM_WORLD.Split_type(MPI.COMM_TYPE_SHARED)
+            self.mpi_node_comm = split_comm
             # Get the number of nodes
             self.mpi_ppn = split_comm.size
             self.mpi_local_rank = split_comm.rank
@@ -203,6 +204,14 @@ class DLIOMPI:
         else:
             raise Exception(f"method {self.classname()}.comm() called before initializing MPI")
 
+    def node_comm(self):
+        if self.mpi_state == MPIState.MPI_INITIALIZED:
+            return self.mpi_node_comm
+        elif self.mpi_state == MPIState.CHILD_INITIALIZED:
+            raise Exception(f"method {self.classname()}.node_comm() called in a child process")
+        else:
+            raise Exception(f"method {self.classname()}.node_comm() called before initializing MPI")
+
     def local_rank(self):
         if self.mpi_state == MPIState.UNINITIALIZED:
             raise Exception(f"method {self.classname()}.size() called before initializing MPI")
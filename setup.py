@@ -107,6 +107,8 @@ setup(
             "dlio_benchmark = dlio_benchmark.main:main",
             "dlio_benchmark_query = dlio_benchmark.main:query_config",
             "dlio_postprocessor = dlio_benchmark.postprocessor:main",
+            "dlio_checkpoint_sweep = dlio_benchmark.checkpointing.raw_checkpoint_io:main",
+            "dlio_checkpoint_plan = dlio_benchmark.checkpointing.checkpoint_plan:main",
         ]
     },
 )
@@ -18,17 +18,43 @@
 from hydra import initialize, initialize_config_dir, compose
 from omegaconf import OmegaConf
 import unittest
+import unittest.mock
 import shutil
 from mpi4py import MPI
 import pathlib
+import io
 comm = MPI.COMM_WORLD
 import pytest
 import time
 import subprocess
+import sys
 import logging
 import os
+import json
+import math
+import pickle
+import asyncio
+import itertools
+import threading
+import numpy as np
+from dlio_benchmark.common.enumerations import Shuffle, CachePolicy, BufferBacking, DatasetType
 from dlio_benchmark.utils.config import ConfigArguments
+from dlio_benchmark.reader.read_engine import PreadvEngine
+from dlio_benchmark.reader.reader_factory import ReaderFactory
+from dlio_benchmark.storage.storage_factory import StorageFactory
+from dlio_benchmark.storage.file_storage import FileStorage
+from dlio_benchmark.data_generator.indexed_binary_generator import write_records
+from dlio_benchmark.reader.sample_cache import NodeSampleCache, SampleCache
+from dlio_benchmark.reader.batch_assembler import BatchAssembler
+from dlio_benchmark.reader.transforms import crop_resize, crop_resize_batch, TransformChain
 from dlio_benchmark.utils.utility import DLIOMPI
+from dlio_benchmark.utils.latency_histogram import LatencyHistogram
+from dlio_benchmark.utils.columnar_stats import read_columnar_stats
+from dlio_benchmark.utils.statscounter import process_cpu_seconds
+from dlio_benchmark.postprocessor import DLIOPostProcessor
+from dlio_benchmark.checkpointing.checkpoint_plan import plan_checkpoint, predict_time
+from dlio_benchmark.checkpointing.raw_checkpoint_io import flatten_state, read_raw_file, read_raw_index, sweep, write_raw_file
+from collections import namedtuple, OrderedDict
 import dlio_benchmark
 config_dir=os.path.dirname(dlio_benchmark.__file__)+"/configs/"
 
@@ -608,6 +634,1375 @@ def test_custom_storage_root_train(fmt, framework) -> None:
     clean(storage_root)
     finalize()
 
+def legacy_sample_map_iter(args, file_list, total_samples, epoch_number, num_threads):
+    # Reference implementation of the per-sample loop the sample maps used to be built with.
+    samples_per_proc = int(math.ceil(total_samples / args.comm_size))
+    samples_per_thread = samples_per_proc // num_threads
+    start = samples_per_proc * args.my_rank
+    end = min(samples_per_proc * (args.my_rank + 1) - 1, total_samples - 1)
+    sample_list = np.arange(start, end + 1)
+    if args.sample_shuffle is not Shuffle.OFF:
+        np.random.seed(args.seed + epoch_number if args.seed_change_epoch else args.seed)
+        np.random.shuffle(sample_list)
+    thread_map = {thread_index: [] for thread_index in range(num_threads)}
+    global_map = {}
+    file_index = args.my_rank * ((len(file_list) // args.comm_size) % len(file_list))
+    for position, sample in enumerate(sample_list):
+        thread_index = (position // samples_per_thread) % num_threads
+        thread_map[thread_index].append((sample, os.path.abspath(file_list[file_index]),
+                                         sample % args.num_samples_per_file))
+        file_index = ((position + 1) // args.num_samples_per_file) % len(file_list)
+        global_map[sample] = (os.path.abspath(file_list[sample // args.num_samples_per_file]),
+                              sample % args.num_samples_per_file)
+    return thread_map, global_map, sample_list.sum()
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("sample_shuffle, read_threads, num_samples_per_file, comm_size", [("off", 1, 1, 1),
+                                                                                       ("seed", 2, 4, 3),
+                                                                                       ("random", 3, 5, 4),
+                                                                                       ("seed", 4, 16, 2)])
+def test_sample_map(sample_shuffle, read_threads, num_samples_per_file, comm_size) -> None:
+    init()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for sample map sharding shuffle={sample_shuffle} read_threads={read_threads}")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=['++workload.workflow.train=False',
+                                                       '++workload.workflow.generate_data=False',
+                                                       '++workload.framework=tensorflow',
+                                                       '++workload.reader.data_loader=tensorflow',
+                                                       f'++workload.reader.read_threads={read_threads}',
+                                                       f'++workload.reader.sample_shuffle={sample_shuffle}',
+                                                       f'++workload.dataset.num_samples_per_file={num_samples_per_file}'])
+        ConfigArguments.reset()
+        benchmark = DLIOBenchmark(cfg['workload'])
+        args = benchmark.args
+        args.comm_size = comm_size
+        file_list = [f"data/train/img_{i}_of_13.npz" for i in range(13)]
+        total_samples = len(file_list) * num_samples_per_file
+        for my_rank in range(comm_size):
+            args.my_rank = my_rank
+            expected_threads, expected_global, expected_sum = legacy_sample_map_iter(args, file_list, total_samples, 1,
+                                                                                     read_threads)
+            thread_map, samples_sum = args.build_sample_map_iter(file_list, total_samples, 1)
+            assert samples_sum == expected_sum
+            assert sorted(thread_map.keys()) == sorted(expected_threads.keys())
+            for thread_index, samples in thread_map.items():
+                assert list(samples) == expected_threads[thread_index]
+            global_map, samples_sum = args.get_global_map_index(file_list, total_samples, 1)
+            assert samples_sum == expected_sum
+            assert list(global_map.items()) == list(expected_global.items())
+            for sample, value in expected_global.items():
+                assert global_map[sample] == value
+            # shared maps are pickled by name and attached by the receiving side
+            global_map.share()
+            attached = pickle.loads(pickle.dumps(global_map))
+            assert list(attached.items()) == list(expected_global.items())
+            # closing the attached mapping leaves the owner's one valid
+            attached.close()
+            assert attached.global_index is None
+            assert list(global_map.items()) == list(expected_global.items())
+            global_map.release()
+    finalize()
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("fmt, file_discovery", [("npz", "rank_zero"), ("indexed_binary", "node"),
+                                                 ("npz", "all_ranks")])
+def test_manifest(fmt, file_discovery) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for dataset manifest with {fmt} dataset and {file_discovery} file discovery")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=['++workload.framework=tensorflow',
+                                                       '++workload.reader.data_loader=tensorflow',
+                                                       '++workload.workflow.train=True',
+                                                       '++workload.workflow.generate_data=True',
+                                                       f"++workload.dataset.format={fmt}",
+                                                       '++workload.dataset.num_files_train=8',
+                                                       '++workload.dataset.num_files_eval=4',
+                                                       'workload.train.computation_time=0.01',
+                                                       '++workload.train.epochs=1'])
+        benchmark = run_benchmark(cfg)
+        manifest_path = os.path.join(cfg.workload.dataset.data_folder, "manifest.json")
+        if comm.rank == 0:
+            with open(os.path.join(benchmark.output_folder, "summary.json")) as f:
+                assert json.load(f)['file_discovery']['source'] == "manifest"
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            assert len(manifest['train']) == 8 and len(manifest['valid']) == 4
+            for entry in manifest['train'] + manifest['valid']:
+                path = os.path.join(cfg.workload.dataset.data_folder, entry['path'])
+                assert entry['size'] == os.path.getsize(path)
+                assert entry['samples'] == cfg.workload.dataset.num_samples_per_file
+                for index_file in entry['index_files']:
+                    assert os.path.isfile(os.path.join(cfg.workload.dataset.data_folder, index_file))
+            if fmt == "indexed_binary":
+                assert len(manifest['train'][0]['index_files']) == 2
+            os.remove(manifest_path)
+        comm.Barrier()
+        cfg = compose(config_name='config', overrides=['++workload.framework=tensorflow',
+                                                       '++workload.reader.data_loader=tensorflow',
+                                                       '++workload.workflow.train=True',
+                                                       '++workload.workflow.generate_data=False',
+                                                       f"++workload.dataset.format={fmt}",
+                                                       f"++workload.dataset.file_discovery={file_discovery}",
+                                                       '++workload.dataset.num_files_train=8',
+                                                       '++workload.dataset.num_files_eval=4',
+                                                       'workload.train.computation_time=0.01',
+                                                       '++workload.train.epochs=1'])
+        benchmark = run_benchmark(cfg)
+        if comm.rank == 0:
+            with open(os.path.join(benchmark.output_folder, "summary.json")) as f:
+                assert json.load(f)['file_discovery']['source'] == f"{file_discovery} walk"
+    clean()
+    finalize()
+
+def first_thread_reader():
+    """
+    A train reader of the first thread of the last run, with the samples of its file map.
+    """
+    args = ConfigArguments.get_instance()
+    # the read counters of the run are released by the time it returns
+    args.read_counters_name = None
+    return ReaderFactory.get_reader(args.format, DatasetType.TRAIN, 0, 0), list(args.train_file_map[0])
+
+def assert_same_samples(samples, expected):
+    assert [sample[:3] for sample in samples] == [sample[:3] for sample in expected]
+    assert all(np.array_equal(sample[3], image) for sample, (_, _, _, image) in zip(samples, expected))
+
+class InFlight:
+    """
+    Counts the calls running at the same time, from threads or asyncio tasks.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.max = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.current += 1
+            self.max = max(self.max, self.current)
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.current -= 1
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("fmt, prefetch_files, io_threads, sample_shuffle, read_type", [("npz", 4, 2, "off", "on_demand"),
+                                                                                        ("indexed_binary", 2, 4, "off", "on_demand"),
+                                                                                        ("indexed_binary", 2, 4, "seed", "memory"),
+                                                                                        ("hdf5", 1, 1, "seed", "on_demand")])
+def test_prefetch_files(fmt, prefetch_files, io_threads, sample_shuffle, read_type) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for read ahead of {prefetch_files} files on {io_threads} threads with {fmt} dataset, "
+                     f"sample shuffle {sample_shuffle} and {read_type} reads")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=['++workload.framework=tensorflow',
+                                                       '++workload.reader.data_loader=tensorflow',
+                                                       '++workload.workflow.train=True',
+                                                       '++workload.workflow.generate_data=True',
+                                                       f"++workload.dataset.format={fmt}",
+                                                       '++workload.dataset.num_files_train=8',
+                                                       '++workload.dataset.num_samples_per_file=4',
+                                                       '++workload.reader.batch_size=3',
+                                                       '++workload.reader.read_threads=1',
+                                                       f"++workload.reader.sample_shuffle={sample_shuffle}",
+                                                       f"++workload.reader.read_type={read_type}",
+                                                       f"++workload.reader.prefetch_files={prefetch_files}",
+                                                       f"++workload.reader.io_threads={io_threads}",
+                                                       'workload.train.computation_time=0.01',
+                                                       '++workload.train.epochs=1'])
+        benchmark = run_benchmark(cfg)
+        if comm.rank == 0:
+            with open(os.path.join(benchmark.output_folder, "summary.json")) as f:
+                summary = json.load(f)
+            assert summary['epochs'] == 1
+        reader, samples = first_thread_reader()
+        serial = list(reader.read_samples(samples))
+        # number of samples up to the end of every run of consecutive samples from the same file
+        run_ends = np.cumsum([len(list(run)) for _, run in itertools.groupby(samples, key=lambda sample: sample[1])])
+        prefetched = []
+        outstanding = []
+        lock = threading.Lock()
+        read_run = reader.read_run
+
+        def counted_read_run(local, filename, sample_indices):
+            with lock:
+                # runs started so far minus the runs the consumer got all the samples of
+                outstanding.append(len(outstanding) + 1 - int(np.searchsorted(run_ends, len(prefetched), side='right')))
+            return read_run(local, filename, sample_indices)
+
+        reader.read_run = counted_read_run
+        for sample in reader.prefetch_samples(samples):
+            prefetched.append(sample)
+        assert_same_samples(prefetched, serial)
+        assert len(outstanding) == len(run_ends)
+        assert 0 < max(outstanding) <= prefetch_files
+        assert reader.thread_readers == []
+    clean()
+    finalize()
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("fmt, io_queue_depth", [("indexed_binary", 8), ("npz", 4), ("hdf5", 1)])
+def test_async_io(fmt, io_queue_depth) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for async I/O with queue depth {io_queue_depth} and {fmt} dataset")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=['++workload.framework=tensorflow',
+                                                       '++workload.reader.data_loader=tensorflow',
+                                                       '++workload.workflow.train=True',
+                                                       '++workload.workflow.generate_data=True',
+                                                       f"++workload.dataset.format={fmt}",
+                                                       '++workload.dataset.num_files_train=8',
+                                                       '++workload.dataset.num_samples_per_file=4',
+                                                       '++workload.reader.batch_size=3',
+                                                       '++workload.reader.read_threads=1',
+                                                       '++workload.reader.async_io=True',
+                                                       f"++workload.reader.io_queue_depth={io_queue_depth}",
+                                                       'workload.train.computation_time=0.01',
+                                                       '++workload.train.epochs=1'])
+        benchmark = run_benchmark(cfg)
+        if comm.rank == 0:
+            with open(os.path.join(benchmark.output_folder, "summary.json")) as f:
+                summary = json.load(f)
+            assert summary['epochs'] == 1
+        reader, samples = first_thread_reader()
+        serial = list(reader.read_samples(samples))
+        in_flight = InFlight()
+        if fmt == "indexed_binary":
+            # the indexed binary reader issues one ranged storage read per sample
+            args = ConfigArguments.get_instance()
+            reader.storage = StorageFactory().get_storage(args.storage_type, args.storage_root)
+            get_data_async = reader.storage.get_data_async
+
+            async def counted_get_data_async(*arguments):
+                with in_flight:
+                    await asyncio.sleep(0.001)
+                    return await get_data_async(*arguments)
+
+            reader.storage.get_data_async = counted_get_data_async
+        else:
+            read_run = reader.read_run
+
+            def counted_read_run(*arguments):
+                with in_flight:
+                    time.sleep(0.001)
+                    return read_run(*arguments)
+
+            reader.read_run = counted_read_run
+        assert_same_samples(list(reader.async_samples(samples)), serial)
+        assert 0 < in_flight.max <= io_queue_depth
+    clean()
+    finalize()
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("fmt, read_engine, sample_shuffle, read_gap_tolerance", [("indexed_binary", "preadv", "off", 0),
+                                                                                  ("indexed_binary", "preadv", "seed", 0),
+                                                                                  ("indexed_binary", "io_uring", "seed", 0),
+                                                                                  ("indexed_binary", "preadv", "seed", 65536),
+                                                                                  ("hdf5", "preadv", "off", 0)])
+def test_read_engine(fmt, read_engine, sample_shuffle, read_gap_tolerance) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for the {read_engine} read engine with {fmt} dataset, sample shuffle {sample_shuffle} "
+                     f"and gap tolerance {read_gap_tolerance}")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=['++workload.framework=tensorflow',
+                                                       '++workload.reader.data_loader=tensorflow',
+                                                       '++workload.workflow.train=True',
+                                                       '++workload.workflow.generate_data=True',
+                                                       '++workload.workflow.evaluation=False',
+                                                       f"++workload.dataset.format={fmt}",
+                                                       '++workload.dataset.num_files_train=8',
+                                                       '++workload.dataset.num_samples_per_file=16',
+                                                       '++workload.dataset.record_length_bytes=4096',
+                                                       '++workload.reader.batch_size=6',
+                                                       f"++workload.reader.sample_shuffle={sample_shuffle}",
+                                                       f"++workload.reader.read_engine={read_engine}",
+                                                       f"++workload.reader.read_gap_tolerance={read_gap_tolerance}",
+                                                       '++workload.reader.io_queue_depth=4',
+                                                       'workload.train.computation_time=0.01',
+                                                       '++workload.train.epochs=1'])
+        benchmark = run_benchmark(cfg)
+        if comm.rank == 0:
+            with open(os.path.join(benchmark.output_folder, "summary.json")) as f:
+                summary = json.load(f)
+            assert summary['epochs'] == 1
+    clean()
+    finalize()
+
+@pytest.mark.parametrize("gap, expected_requests", [(0, 6), (8, 3), (16, 2), (64, 1)])
+def test_read_plan(gap, expected_requests) -> None:
+    path = f"read_plan_test_{comm.rank}.bin"
+    data = np.random.randint(0, 255, 256, dtype=np.uint8)
+    data.tofile(path)
+    # 8 byte samples: 0-2 are adjacent, then gaps of 8, 16, 8, 64 and 8 bytes
+    offsets = np.array([0, 8, 16, 32, 56, 72, 144, 160])
+    sizes = np.full(len(offsets), 8)
+    requested = [6, 1, 3, 0, 7, 2, 5, 4]
+    engine = PreadvEngine(queue_depth=4, gap=gap)
+    plan = engine.plan(np.zeros(len(requested)), offsets[requested], sizes[requested])
+    assert len(plan) == expected_requests
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        assert engine.read([fd], plan) == expected_requests
+    finally:
+        os.close(fd)
+        os.remove(path)
+    for view, offset in zip(plan.views, offsets[requested]):
+        assert np.array_equal(view, data[offset:offset + 8])
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("fmt, policy", [("npz", "lru"), ("indexed_binary", "clock"), ("hdf5", "lru")])
+def test_node_cache(fmt, policy) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for the node sample cache with {policy} eviction and {fmt} dataset")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=['++workload.framework=tensorflow',
+                                                       '++workload.reader.data_loader=tensorflow',
+                                                       '++workload.workflow.train=True',
+                                                       '++workload.workflow.generate_data=True',
+                                                       '++workload.workflow.evaluation=False',
+                                                       f"++workload.dataset.format={fmt}",
+                                                       '++workload.dataset.num_files_train=8',
+                                                       '++workload.dataset.num_samples_per_file=16',
+                                                       '++workload.dataset.record_length_bytes=4096',
+                                                       '++workload.dataset.record_length_bytes_stdev=0',
+                                                       '++workload.reader.batch_size=4',
+                                                       f"++workload.reader.node_cache_size={1024 * 1024}",
+                                                       f"++workload.reader.node_cache_policy={policy}",
+                                                       'workload.train.computation_time=0.01',
+                                                       '++workload.train.epochs=2'])
+        benchmark = run_benchmark(cfg)
+        with open(os.path.join(benchmark.output_folder, f"{comm.rank}_output.json")) as f:
+            output = json.load(f)
+        # the second epoch reads the same samples again, all of them from the cache
+        assert output['node_cache']['hits'] > 0
+        if comm.rank == 0:
+            with open(os.path.join(benchmark.output_folder, "summary.json")) as f:
+                summary = json.load(f)
+            assert summary['node_cache']['policy'] == policy
+            assert summary['node_cache']['hits'] >= summary['node_cache']['misses']
+            assert summary['node_cache']['evictions'] == 0
+    clean()
+    finalize()
+
+@pytest.mark.parametrize("policy", ["lru", "clock"])
+def test_node_sample_cache(policy) -> None:
+    cache = NodeSampleCache(NodeSampleCache.new_name(), 0, CachePolicy(policy), create=True,
+                            capacity=4 * 16, slot_size=16)
+    try:
+        samples = [np.full(16, index, dtype=np.uint8) for index in range(6)]
+        for index in range(5):
+            cache.put("file", index, samples[index])
+        assert cache.get("file", 1) is not None
+        # sample 0 made room for sample 4, then sample 2 is the least recently used one, and the
+        # first one the clock hand finds unreferenced, so it makes room for sample 5
+        cache.put("file", 5, samples[5])
+        assert cache.get("file", 0) is None
+        assert cache.get("file", 2) is None
+        assert np.array_equal(cache.get("file", 5), samples[5])
+        assert np.array_equal(cache.get("file", 4), samples[4])
+        # samples larger than a slot are not cached
+        cache.put("file", 6, np.zeros(32, dtype=np.uint8))
+        assert cache.get("file", 6) is None
+        assert cache.row_counters().tolist() == [3, 3, 2]
+    finally:
+        cache.release()
+        cache.close()
+
+def test_node_sample_cache_lru() -> None:
+    cache = NodeSampleCache(NodeSampleCache.new_name(), 0, CachePolicy.LRU, create=True,
+                            capacity=8 * 8, slot_size=8)
+    try:
+        # the arena evicts like an ordered dict moving every hit to its end
+        expected = OrderedDict()
+        rng = np.random.default_rng(0)
+        for index in rng.integers(0, 20, size=500).tolist():
+            if index in expected:
+                expected.move_to_end(index)
+                assert cache.get("file", index)[0] == index
+                continue
+            assert cache.get("file", index) is None
+            if len(expected) == 8:
+                expected.popitem(last=False)
+            expected[index] = None
+            cache.put("file", index, np.full(8, index, dtype=np.uint8))
+        assert sorted(index for index in range(20) if cache.get("file", index) is not None) == sorted(expected)
+    finally:
+        cache.release()
+        cache.close()
+
+def test_node_sample_cache_shape() -> None:
+    cache = NodeSampleCache(NodeSampleCache.new_name(), 0, CachePolicy.LRU, create=True,
+                            capacity=4 * 12000, slot_size=12000)
+    try:
+        # hits give back the dtype and shape of the sample that was put
+        samples = [np.random.randint(255, size=(60, 200), dtype=np.uint8),
+                   np.arange(12, dtype=np.float32).reshape(3, 4), np.arange(5, dtype=np.int64)]
+        for index, sample in enumerate(samples):
+            cache.put("file", index, sample)
+        for index, sample in enumerate(samples):
+            image = cache.get("file", index)
+            assert image.dtype == sample.dtype and image.shape == sample.shape
+            assert np.array_equal(image, sample)
+        assert np.array_equal(crop_resize(cache.get("file", 0), 32), crop_resize(samples[0], 32))
+    finally:
+        cache.release()
+        cache.close()
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("policy, size", [("lru", 1024 * 1024), ("lfu", 65536), ("fifo", 65536)])
+def test_sample_cache(policy, size) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for the reader sample cache with {policy} eviction and {size} bytes")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=['++workload.framework=tensorflow',
+                                                       '++workload.reader.data_loader=tensorflow',
+                                                       '++workload.workflow.train=True',
+                                                       '++workload.workflow.generate_data=True',
+                                                       '++workload.workflow.evaluation=False',
+                                                       '++workload.dataset.format=npz',
+                                                       '++workload.dataset.num_files_train=8',
+                                                       '++workload.dataset.num_samples_per_file=16',
+                                                       '++workload.dataset.record_length_bytes=4096',
+                                                       '++workload.dataset.record_length_bytes_stdev=0',
+                                                       '++workload.reader.batch_size=4',
+                                                       f"++workload.reader.sample_cache_size={size}",
+                                                       f"++workload.reader.sample_cache_policy={policy}",
+                                                       'workload.train.computation_time=0.01',
+                                                       '++workload.train.epochs=2'])
+        benchmark = run_benchmark(cfg)
+        with open(os.path.join(benchmark.output_folder, f"{comm.rank}_output.json")) as f:
+            output = json.load(f)
+        first, second = output['1']['sample_cache']['train'], output['2']['sample_cache']['train']
+        assert first['hits'] == 0 and first['misses'] > 0
+        if size == 1024 * 1024:
+            # every sample of the rank fits, so the second epoch is served from the cache
+            assert second['hit_rate'] == 1.0 and second['evictions'] == 0
+        else:
+            assert first['evictions'] + second['evictions'] > 0
+        if comm.rank == 0:
+            with open(os.path.join(benchmark.output_folder, "summary.json")) as f:
+                summary = json.load(f)
+            assert summary['sample_cache']['policy'] == policy
+            assert len(summary['sample_cache']['hit_rate']) == 2
+    clean()
+    finalize()
+
+@pytest.mark.parametrize("policy, survivors", [("lru", [1, 3, 4]), ("lfu", [0, 1, 4]), ("fifo", [2, 3, 4])])
+def test_sample_cache_policy(policy, survivors) -> None:
+    cache = SampleCache(3 * 16, CachePolicy(policy))
+    for index in range(3):
+        cache.put("file", index, np.full(16, index, dtype=np.uint8))
+    cache.get("file", 0)
+    cache.get("file", 1)
+    cache.get("file", 1)
+    cache.put("file", 3, np.full(16, 3, dtype=np.uint8))
+    cache.put("file", 4, np.full(16, 4, dtype=np.uint8))
+    assert len(cache) == 3 and cache.nbytes == 3 * 16
+    assert [index for index in range(5) if cache.get("file", index) is not None] == survivors
+    assert np.array_equal(cache.get("file", survivors[0]), np.full(16, survivors[0], dtype=np.uint8))
+    assert cache.counters.tolist() == [7, 2, 2]
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("fmt, framework, backing, read_threads", [("npz", "tensorflow", "heap", 1),
+                                                                  ("hdf5", "tensorflow", "heap", 2),
+                                                                  ("npz", "pytorch", "heap", 0),
+                                                                  ("indexed_binary", "pytorch", "shared", 2),
+                                                                  ("hdf5", "pytorch", "pinned", 0)])
+def test_batch_buffers(fmt, framework, backing, read_threads) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for batch buffers with {backing} memory, {framework} and {fmt} dataset")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=[f"++workload.framework={framework}",
+                                                       f"++workload.reader.data_loader={framework}",
+                                                       f"++workload.reader.read_threads={read_threads}",
+                                                       '++workload.workflow.train=True',
+                                                       '++workload.workflow.generate_data=True',
+                                                       '++workload.workflow.evaluation=False',
+                                                       f"++workload.dataset.format={fmt}",
+                                                       '++workload.dataset.num_files_train=8',
+                                                       '++workload.dataset.num_samples_per_file=15',
+                                                       '++workload.dataset.record_length_bytes=4096',
+                                                       '++workload.reader.batch_size=4',
+                                                       '++workload.reader.batch_buffers=3',
+                                                       f"++workload.reader.batch_buffer_backing={backing}",
+                                                       'workload.train.computation_time=0.01',
+                                                       '++workload.train.epochs=1'])
+        benchmark = run_benchmark(cfg)
+        if comm.rank == 0:
+            with open(os.path.join(benchmark.output_folder, "summary.json")) as f:
+                summary = json.load(f)
+            assert summary['epochs'] == 1
+    clean()
+    finalize()
+
+@pytest.mark.parametrize("backing", ["heap", "shared"])
+def test_batch_assembler(backing) -> None:
+    assembler = BatchAssembler(3, (4, 4), np.uint8, depth=2, backing=BufferBacking(backing))
+    batches = []
+    for index in range(8):
+        assembler.add(np.full((4, 4), index, dtype=np.uint8))
+        if index == 7:
+            assembler.pad(np.zeros((4, 4), dtype=np.uint8))
+        if assembler.full():
+            batches.append(assembler.pop())
+    assert len(batches) == 3
+    # the ring has two buffers, so the third batch is written into the buffer of the first one
+    assert batches[0] is batches[2] and batches[0] is not batches[1]
+    assert batches[1][:, 0, 0].tolist() == [3, 4, 5]
+    assert batches[2][:, 0, 0].tolist() == [6, 7, 0]
+    assembler.close()
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("fmt, batch_buffers", [("jpeg", 0), ("png", 2), ("npz", 0), ("hdf5", 2), ("indexed_binary", 0)])
+def test_faithful_decode(fmt, batch_buffers) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for faithful decoding of {fmt} dataset with {batch_buffers} batch buffers")
+        logging.info("=" * 80)
+    # image formats hold one sample per file
+    num_samples_per_file = 1 if fmt in ["jpeg", "png"] else 16
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=['++workload.framework=tensorflow',
+                                                       '++workload.reader.data_loader=tensorflow',
+                                                       '++workload.workflow.train=True',
+                                                       '++workload.workflow.generate_data=True',
+                                                       '++workload.workflow.evaluation=False',
+                                                       f"++workload.dataset.format={fmt}",
+                                                       '++workload.dataset.num_files_train=8',
+                                                       f"++workload.dataset.num_samples_per_file={num_samples_per_file}",
+                                                       '++workload.dataset.record_length_bytes=16384',
+                                                       '++workload.dataset.record_length_resize=4096',
+                                                       '++workload.reader.batch_size=4',
+                                                       '++workload.reader.faithful_decode=True',
+                                                       f"++workload.reader.batch_buffers={batch_buffers}",
+                                                       'workload.train.computation_time=0.01',
+                                                       '++workload.train.epochs=1'])
+        benchmark = run_benchmark(cfg)
+        with open(os.path.join(benchmark.output_folder, f"{comm.rank}_output.json")) as f:
+            output = json.load(f)
+        assert output['1']['cpu_seconds'] > 0
+    clean()
+    finalize()
+
+def test_process_cpu_seconds() -> None:
+    start = process_cpu_seconds()
+    # a child that burns CPU and is reaped before the second measurement
+    subprocess.run([sys.executable, "-c", "import time\nend = time.process_time() + 0.5\nwhile time.process_time() < end: pass"],
+                   check=True)
+    assert process_cpu_seconds() - start >= 0.4
+
+def test_crop_resize() -> None:
+    image = np.arange(24, dtype=np.uint8).reshape(6, 4)
+    # the centered 4 x 4 crop is rows 1 to 4, of which every other row and column are kept
+    assert crop_resize(image, 2).tolist() == [[4, 6], [12, 14]]
+    # flat samples use their largest square prefix, color images their first channel
+    assert crop_resize(np.arange(20, dtype=np.uint8), 2).tolist() == [[0, 2], [8, 10]]
+    color = np.stack([image, image + 100, image + 200], axis=-1)
+    assert np.array_equal(crop_resize(color, 2), crop_resize(image, 2))
+    samples = [np.random.randint(255, size=(8, 12), dtype=np.uint8) for _ in range(3)]
+    expected = np.stack([crop_resize(sample, 5) for sample in samples])
+    assert np.array_equal(crop_resize_batch(samples, 5), expected)
+    assert np.array_equal(crop_resize_batch(samples + [image], 5)[:3], expected)
+    out = np.empty((5, 5), dtype=np.uint8)
+    assert crop_resize(samples[0], 5, out) is out and np.array_equal(out, expected[0])
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("fmt, framework, read_threads", [("npz", "tensorflow", 1), ("hdf5", "tensorflow", 2),
+                                                           ("indexed_binary", "tensorflow", 2),
+                                                           ("npz", "pytorch", 2)])
+def test_transforms(fmt, framework, read_threads) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for preprocessing transforms of {fmt} dataset with {framework} and {read_threads} threads")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=[f"++workload.framework={framework}",
+                                                       f"++workload.reader.data_loader={framework}",
+                                                       '++workload.workflow.train=True',
+                                                       '++workload.workflow.generate_data=True',
+                                                       '++workload.workflow.evaluation=False',
+                                                       f"++workload.dataset.format={fmt}",
+                                                       '++workload.dataset.num_files_train=8',
+                                                       '++workload.dataset.num_samples_per_file=16',
+                                                       '++workload.dataset.record_length_bytes=16384',
+                                                       '++workload.dataset.record_length_resize=4096',
+                                                       '++workload.reader.batch_size=4',
+                                                       f"++workload.reader.read_threads={read_threads}",
+                                                       '++workload.reader.faithful_decode=True',
+                                                       '++workload.reader.transforms=[{type:random_crop,size:48},'
+                                                       '{type:flip,probability:0.5},{type:normalize},'
+                                                       '{type:cast,dtype:float16}]',
+                                                       'workload.train.computation_time=0.01',
+                                                       '++workload.train.epochs=1'])
+        benchmark = run_benchmark(cfg)
+        assert benchmark.args.transforms[0] == {'type': 'random_crop', 'size': 48}
+    clean()
+    finalize()
+
+def test_transform_chain() -> None:
+    image = np.arange(64, dtype=np.uint8).reshape(8, 8)
+    chain = TransformChain([{'type': 'center_crop', 'size': 4}, {'type': 'flip', 'axis': 1, 'probability': 1.0},
+                            {'type': 'normalize', 'mean': 0.0, 'std': 2.0}, {'type': 'cast', 'dtype': 'float16'}])
+    output = chain(image)
+    assert output.dtype == np.float16 and output.flags['C_CONTIGUOUS']
+    assert output[0].tolist() == [10.5, 10.0, 9.5, 9.0]
+    assert chain.output_spec(image) == ((4, 4), np.float16)
+    # random crops are reproducible for a given seed and stay inside the sample
+    crops = [TransformChain([{'type': 'random_crop', 'size': 3}], np.random.default_rng(7))(image) for _ in range(2)]
+    assert np.array_equal(crops[0], crops[1]) and crops[0].shape == (3, 3)
+    assert TransformChain([{'type': 'resize', 'size': 2}])(image).tolist() == [[0, 4], [32, 36]]
+    with pytest.raises(Exception):
+        TransformChain([{'type': 'rotate'}])
+    with pytest.raises(Exception):
+        TransformChain([{'type': 'flip', 'angle': 90}])
+    with pytest.raises(Exception):
+        TransformChain([{'type': 'random_crop', 'size': 16}])(image)
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("fmt, schedule, processes", [("npz", "static", 2), ("npz", "dynamic", 1),
+                                                      ("hdf5", "dynamic", 2), ("indexed_binary", "dynamic", 2)])
+def test_generation_schedule(fmt, schedule, processes) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for {schedule} generation of {fmt} dataset with {processes} processes per rank")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=['++workload.framework=tensorflow',
+                                                       '++workload.reader.data_loader=tensorflow',
+                                                       '++workload.workflow.train=True',
+                                                       '++workload.workflow.generate_data=True',
+                                                       '++workload.workflow.evaluation=False',
+                                                       f"++workload.dataset.format={fmt}",
+                                                       '++workload.dataset.num_files_train=16',
+                                                       '++workload.dataset.num_files_eval=4',
+                                                       '++workload.dataset.num_samples_per_file=4',
+                                                       '++workload.dataset.record_length_bytes=65536',
+                                                       '++workload.dataset.record_length_bytes_stdev=32768',
+                                                       f"++workload.dataset.generation_schedule={schedule}",
+                                                       f"++workload.dataset.generation_processes={processes}",
+                                                       'workload.train.computation_time=0.01',
+                                                       '++workload.train.epochs=1'])
+        benchmark = run_benchmark(cfg)
+        train_files = list(pathlib.Path(f"{cfg.workload.dataset.data_folder}/train").rglob(f"*.{fmt}"))
+        valid_files = list(pathlib.Path(f"{cfg.workload.dataset.data_folder}/valid").rglob(f"*.{fmt}"))
+        assert len(train_files) == 16 and len(valid_files) == 4
+        generation = benchmark.stats.summary['generation']
+        assert generation['files'] == 20
+        index_files = list(pathlib.Path(cfg.workload.dataset.data_folder).rglob("*.idx"))
+        assert generation['bytes'] == sum(os.path.getsize(f) for f in train_files + valid_files + index_files)
+        if comm.rank == 0:
+            assert len(generation['rank_GB_per_second']) == comm.size
+        # files are seeded by their index, so they do not depend on the rank or process that made them
+        if fmt == "npz":
+            first = np.load(benchmark.data_generator._file_list[0])['x']
+            np.random.seed([10, 0])
+            assert np.array_equal(first, np.random.randint(255, size=first.shape, dtype=np.uint8))
+            np.random.seed()
+    clean()
+    finalize()
+
+@pytest.mark.timeout(60, method="thread")
+def test_generation_unknown_size() -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for generation on a storage that does not report file sizes")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=['++workload.framework=tensorflow',
+                                                       '++workload.reader.data_loader=tensorflow',
+                                                       '++workload.workflow.train=True',
+                                                       '++workload.workflow.generate_data=True',
+                                                       '++workload.workflow.evaluation=False',
+                                                       '++workload.dataset.format=npz',
+                                                       '++workload.dataset.num_files_train=8',
+                                                       '++workload.dataset.num_files_eval=2',
+                                                       '++workload.dataset.num_samples_per_file=4',
+                                                       '++workload.dataset.record_length_bytes=4096',
+                                                       'workload.train.computation_time=0.01',
+                                                       '++workload.train.epochs=1'])
+        # like s3, whose get_size returns None
+        with unittest.mock.patch.object(FileStorage, 'get_size', return_value=None):
+            benchmark = run_benchmark(cfg)
+        generation = benchmark.stats.summary['generation']
+        assert generation['files'] == 10
+        assert generation['bytes'] is None and generation['GB_per_second'] is None
+        assert benchmark.stats.output['generation']['bytes'] is None
+    clean()
+    finalize()
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("random_pool", [0, 1048576])
+def test_indexed_binary_generation(random_pool) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for indexed binary generation with a random pool of {random_pool} bytes")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=['++workload.framework=tensorflow',
+                                                       '++workload.reader.data_loader=tensorflow',
+                                                       '++workload.workflow.train=True',
+                                                       '++workload.workflow.generate_data=True',
+                                                       '++workload.workflow.evaluation=False',
+                                                       '++workload.dataset.format=indexed_binary',
+                                                       '++workload.dataset.num_files_train=8',
+                                                       '++workload.dataset.num_samples_per_file=16',
+                                                       '++workload.dataset.record_length_bytes=65536',
+                                                       # smaller than a file, which is then written in several pieces
+                                                       '++workload.dataset.generation_buffer_size=300000',
+                                                       f"++workload.dataset.generation_random_pool={random_pool}",
+                                                       '++workload.reader.batch_size=4',
+                                                       'workload.train.computation_time=0.01',
+                                                       '++workload.train.epochs=1'])
+        benchmark = run_benchmark(cfg)
+        filename = benchmark.data_generator._file_list[0]
+        assert os.path.getsize(filename) == 16 * 65536
+        offsets = np.fromfile(filename + '.off.idx', dtype=np.uint64)
+        sizes = np.fromfile(filename + '.sz.idx', dtype=np.uint64)
+        assert offsets.tolist() == list(range(0, 16 * 65536, 65536)) and sizes.tolist() == [65536] * 16
+    clean()
+    finalize()
+
+def test_write_records() -> None:
+    records = np.arange(10, dtype=np.uint8)
+    data_file = io.BytesIO()
+    write_records(data_file, records, 7, 25)
+    assert list(data_file.getvalue()) == [7, 8, 9] + list(range(10)) * 2 + [0, 1]
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("fmt, distribution", [("indexed_binary", "normal"), ("mmap_indexed_binary", "lognormal"),
+                                               ("indexed_binary", "histogram")])
+def test_record_length_distribution(fmt, distribution) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for {distribution} record lengths of {fmt} dataset")
+        logging.info("=" * 80)
+    histogram = os.path.abspath("record_length_histogram.csv")
+    if comm.rank == 0:
+        with open(histogram, "w") as f:
+            f.write("# size, count\n1024, 3\n16384, 1\n100000, 1\n")
+    comm.Barrier()
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=['++workload.framework=tensorflow',
+                                                       '++workload.reader.data_loader=tensorflow',
+                                                       '++workload.workflow.train=True',
+                                                       '++workload.workflow.generate_data=True',
+                                                       '++workload.workflow.evaluation=False',
+                                                       f"++workload.dataset.format={fmt}",
+                                                       '++workload.dataset.num_files_train=8',
+                                                       '++workload.dataset.num_samples_per_file=16',
+                                                       '++workload.dataset.record_length_bytes=32768',
+                                                       '++workload.dataset.record_length_bytes_stdev=16384',
+                                                       f"++workload.dataset.record_length_bytes_distribution={distribution}",
+                                                       f"++workload.dataset.record_length_bytes_histogram={histogram}",
+                                                       '++workload.reader.batch_size=4',
+                                                       '++workload.reader.read_threads=2',
+                                                       'workload.train.computation_time=0.01',
+                                                       '++workload.train.epochs=1'])
+        benchmark = run_benchmark(cfg)
+        total_size = 0
+        for filename in benchmark.args.file_list_train:
+            offsets = np.fromfile(filename + '.off.idx', dtype=np.uint64)
+            sizes = np.fromfile(filename + '.sz.idx', dtype=np.uint64)
+            assert len(np.unique(sizes)) > 1 and np.all(sizes >= 1)
+            assert offsets[0] == 0 and np.array_equal(offsets[1:], np.cumsum(sizes)[:-1])
+            assert os.path.getsize(filename) == sizes.sum()
+            if distribution == "histogram":
+                assert set(sizes.tolist()) <= {1024, 16384, 100000}
+            total_size += int(sizes.sum())
+        mean_record_size = total_size / (8 * 16)
+        assert benchmark.stats.record_size == pytest.approx(mean_record_size)
+        if comm.rank == 0:
+            assert benchmark.stats.summary['metric']['train_io_source'] == 'read_counters'
+    comm.Barrier()
+    if comm.rank == 0:
+        os.remove(histogram)
+    clean()
+    finalize()
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("fmt, distribution, batch_buffers, sample_cache_size", [("npz", "fixed", 0, 0),
+                                                                                ("hdf5", "fixed", 2, 0),
+                                                                                ("indexed_binary", "lognormal", 0, 0),
+                                                                                ("indexed_binary", "normal", 2, 0),
+                                                                                ("npz", "fixed", 0, 16777216)])
+def test_read_bytes(fmt, distribution, batch_buffers, sample_cache_size) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for the bytes read from a {fmt} dataset with {distribution} record lengths "
+                     f"and a sample cache of {sample_cache_size} bytes")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=['++workload.framework=tensorflow',
+                                                       '++workload.reader.data_loader=tensorflow',
+                                                       '++workload.workflow.train=True',
+                                                       '++workload.workflow.generate_data=True',
+                                                       '++workload.workflow.evaluation=False',
+                                                       f"++workload.dataset.format={fmt}",
+                                                       '++workload.dataset.num_files_train=8',
+                                                       '++workload.dataset.num_samples_per_file=16',
+                                                       '++workload.dataset.record_length_bytes=65536',
+                                                       '++workload.dataset.record_length_bytes_stdev=0' if distribution == "fixed"
+                                                       else '++workload.dataset.record_length_bytes_stdev=32768',
+                                                       f"++workload.dataset.record_length_bytes_distribution={distribution}",
+                                                       '++workload.reader.batch_size=4',
+                                                       '++workload.reader.read_threads=2',
+                                                       f"++workload.reader.batch_buffers={batch_buffers}",
+                                                       f"++workload.reader.sample_cache_size={sample_cache_size}",
+                                                       'workload.train.computation_time=0.01',
+                                                       '++workload.train.epochs=2'])
+        benchmark = run_benchmark(cfg)
+        # every epoch reads the samples of the file map of the rank, without shuffling
+        expected = 0
+        sizes = {}
+        for thread_samples in benchmark.args.train_file_map.values():
+            for global_sample_idx, filename, sample_index in thread_samples:
+                if fmt == "indexed_binary":
+                    if filename not in sizes:
+                        sizes[filename] = np.fromfile(filename + '.sz.idx', dtype=np.uint64)
+                    expected += int(sizes[filename][sample_index])
+                else:
+                    expected += 65536
+        output = benchmark.stats.output
+        for epoch in [1, 2]:
+            # the second epoch is served from the sample caches when they hold every sample
+            epoch_expected = 0 if sample_cache_size > 0 and epoch == 2 else expected
+            step_bytes = output[epoch]['bytes']['block1']
+            assert len(step_bytes) == len(output[epoch]['proc']['block1'])
+            assert sum(step_bytes) == output[epoch]['io']['train']['bytes'] == epoch_expected
+            io = output[epoch]['io']['train']
+            assert (io['MB_per_second'] > 0) == (epoch_expected > 0)
+            assert io['p50_MB_per_second'] <= io['p90_MB_per_second'] <= io['p99_MB_per_second']
+        metric = benchmark.stats.summary['metric']
+        io = comm.allreduce(np.array([output[epoch]['io']['train']['MB_per_second'] for epoch in [1, 2]]))
+        if comm.rank == 0:
+            assert metric['train_io_source'] == 'read_counters'
+            assert metric['train_io_MB_per_second'] == pytest.approx(list(io))
+            assert metric['train_io_mean_MB_per_second'] == pytest.approx(np.mean(io))
+            assert metric['train_io_step_p50_MB_per_second'] <= metric['train_io_step_p99_MB_per_second']
+    clean()
+    finalize()
+
+def test_latency_histogram() -> None:
+    rng = np.random.default_rng(3)
+    values = rng.lognormal(-4, 1, 20000)
+    histogram = LatencyHistogram()
+    halves = [LatencyHistogram(), LatencyHistogram()]
+    for i, value in enumerate(values):
+        histogram.record(value)
+        halves[i % 2].record(value)
+    # buckets tile the microsecond values and keep them within 1/128 of their true value
+    for index in range(1, LatencyHistogram.NUM_BUCKETS):
+        lowest, highest = LatencyHistogram.bucket_range(index)
+        assert LatencyHistogram.bucket_range(index - 1)[1] + 1 == lowest
+        assert LatencyHistogram.bucket_index(lowest) == LatencyHistogram.bucket_index(highest) == index
+        assert highest - lowest < max(lowest / 128, 1)
+    stats = histogram.summary()
+    assert stats['count'] == len(values)
+    assert stats['mean'] == pytest.approx(np.mean(values), rel=1e-3)
+    for q in [50, 90, 99, 99.9]:
+        assert stats[f'p{q:g}'] == pytest.approx(np.percentile(values, q), rel=0.02)
+    assert stats['min'] <= np.min(values) + 1e-6 and stats['max'] >= np.max(values) - 1e-6
+    assert halves[0].merge(halves[1]).summary() == stats
+    # the memory does not depend on the number of values and large values are clamped
+    histogram.record(1e6)
+    assert histogram.counts.shape == (LatencyHistogram.SIZE,)
+    assert histogram.summary()['max'] < 2 ** LatencyHistogram.MAX_EXPONENT * LatencyHistogram.UNIT
+
+
+@pytest.mark.timeout(60, method="thread")
+def test_latency_percentiles() -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for the latency percentiles")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=['++workload.framework=tensorflow',
+                                                       '++workload.reader.data_loader=tensorflow',
+                                                       '++workload.workflow.train=True',
+                                                       '++workload.workflow.generate_data=True',
+                                                       '++workload.workflow.evaluation=True',
+                                                       '++workload.workflow.checkpoint=True',
+                                                       '++workload.checkpoint.epochs_between_checkpoints=1',
+                                                       '++workload.model.model_size=1024',
+                                                       '++workload.dataset.num_files_train=8',
+                                                       '++workload.dataset.num_files_eval=4',
+                                                       '++workload.dataset.num_samples_per_file=8',
+                                                       '++workload.reader.batch_size=2',
+                                                       '++workload.reader.batch_size_eval=2',
+                                                       'workload.train.computation_time=0.01',
+                                                       '++workload.evaluation.eval_time=0.005',
+                                                       '++workload.train.epochs=2'])
+        comm.Barrier()
+        if comm.rank == 0:
+            shutil.rmtree("./checkpoints", ignore_errors=True)
+            os.makedirs("./checkpoints", exist_ok=True)
+        comm.Barrier()
+        benchmark = run_benchmark(cfg)
+        output = benchmark.stats.output
+        for epoch in [1, 2]:
+            latency = output[epoch]['latency']
+            steps = sum(len(output[epoch]['proc'][key]) for key in output[epoch]['proc'] if key.startswith('block'))
+            assert latency['train']['step']['count'] == steps
+            for kind in ['load', 'compute', 'step']:
+                stats = latency['train'][kind]
+                assert stats['min'] <= stats['p50'] <= stats['p90'] <= stats['p99'] <= stats['p99.9'] <= stats['max']
+            assert latency['train']['compute']['p50'] >= 0.01
+            assert latency['eval']['step']['count'] == len(output[epoch]['proc']['eval'])
+            assert latency['checkpoint']['save']['count'] == 1
+        steps = comm.allreduce(sum(output[epoch]['latency']['train']['step']['count'] for epoch in [1, 2]))
+        if comm.rank == 0:
+            summary = benchmark.stats.summary['latency']
+            assert summary['train']['step']['count'] == steps
+            assert summary['checkpoint']['save']['count'] == 2 * comm.size
+            assert summary['epochs'][1]['block1']['load']['count'] > 0
+            assert summary['train']['step']['p99.9'] <= summary['train']['step']['max']
+    if comm.rank == 0:
+        shutil.rmtree("./checkpoints", ignore_errors=True)
+    clean()
+    finalize()
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("aggregators", [1, 2])
+def test_columnar_output(aggregators) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for the columnar output with {aggregators} aggregators")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config', overrides=['++workload.framework=tensorflow',
+                                                       '++workload.reader.data_loader=tensorflow',
+                                                       '++workload.workflow.train=True',
+                                                       '++workload.workflow.generate_data=True',
+                                                       '++workload.workflow.evaluation=False',
+                                                       '++workload.dataset.num_files_train=8',
+                                                       '++workload.dataset.num_samples_per_file=8',
+                                                       '++workload.reader.batch_size=2',
+                                                       'workload.train.computation_time=0.01',
+                                                       '++workload.train.epochs=2',
+                                                       '++workload.output.format=npz',
+                                                       f"++workload.output.aggregators={aggregators}"])
+        benchmark = run_benchmark(cfg, verify=False)
+        output_folder = benchmark.output_folder
+        outputs = comm.gather(benchmark.stats.output, root=0)
+        if comm.rank == 0:
+            assert len(glob.glob(os.path.join(output_folder, "*_output.json"))) == 0
+            assert len(glob.glob(os.path.join(output_folder, "*_per_epoch_stats.json"))) == 0
+            assert len(glob.glob(os.path.join(output_folder, "stats_*.npz"))) == min(aggregators, comm.size)
+            columns, rank_outputs, per_epoch_stats = read_columnar_stats(output_folder)
+            assert sorted(rank_outputs) == sorted(per_epoch_stats) == list(range(comm.size))
+            assert np.all(np.diff(columns['rank']) >= 0)
+            for rank, output in enumerate(outputs):
+                for epoch in [1, 2]:
+                    rows = (columns['rank'] == rank) & (columns['epoch'] == epoch) & (columns['phase'] == 'block1')
+                    assert np.array_equal(columns['load'][rows], output[epoch]['load']['block1'])
+                    assert np.array_equal(columns['proc'][rows], output[epoch]['proc']['block1'])
+                    assert np.array_equal(columns['step'][rows], np.arange(len(output[epoch]['proc']['block1'])))
+                    assert rank_outputs[rank][str(epoch)]['throughput']['block1'] == pytest.approx(output[epoch]['throughput']['block1'])
+                    assert 'load' not in rank_outputs[rank][str(epoch)]
+            args = {'output_folder': output_folder, 'name': '', 'num_proc': comm.size, 'epochs': 2, 'do_eval': False,
+                    'do_checkpoint': False, 'batch_size': 2, 'batch_size_eval': 1, 'record_size': 65536}
+            postproc = DLIOPostProcessor(namedtuple('args', args.keys())(*args.values()))
+            postproc.process_loading_and_processing_times()
+            loading_time = sum(sum(output[epoch]['load']['block1']) for output in outputs for epoch in [1, 2]) / comm.size
+            assert postproc.overall_stats['avg_process_loading_time'] == '{:.2f}'.format(loading_time)
+            assert postproc.per_epoch_stats['1']['block1']['samples/s']['mean'] != 'n/a'
+    clean()
+    finalize()
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("framework, max_concurrent", [("tensorflow", 1), ("tensorflow", 2),
+                                                       ("pytorch", 1), ("pytorch", 2)])
+def test_checkpoint_async(framework, max_concurrent) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for asynchronous checkpointing with {max_concurrent} concurrent checkpoints")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        epochs = 4
+        cfg = compose(config_name='config',
+                      overrides=[f'++workload.framework={framework}',
+                                 f'++workload.reader.data_loader={framework}',
+                                 '++workload.workflow.train=True',
+                                 '++workload.workflow.generate_data=True',
+                                 '++workload.train.computation_time=0.01',
+                                 f'++workload.train.epochs={epochs}', '++workload.workflow.checkpoint=True',
+                                 '++workload.checkpoint.epochs_between_checkpoints=1',
+                                 '++workload.checkpoint.async=True',
+                                 f'++workload.checkpoint.max_concurrent={max_concurrent}',
+                                 '++workload.model.model_size=1024',
+                                 '++workload.model.optimization_groups=[1024, 128]',
+                                 '++workload.model.num_layers=2',
+                                 '++workload.model.layer_parameters=[16]',
+                                 f'++workload.model.parallelism.tensor={comm.size}'])
+        comm.Barrier()
+        if comm.rank == 0:
+            shutil.rmtree("./checkpoints", ignore_errors=True)
+            os.makedirs("./checkpoints", exist_ok=True)
+        comm.Barrier()
+        # the checkpointing mechanisms are singletons, start from one configured for this test
+        if framework == "tensorflow":
+            from dlio_benchmark.checkpointing.tf_checkpointing import TFCheckpointing as mechanism_class
+        else:
+            from dlio_benchmark.checkpointing.pytorch_checkpointing import PyTorchCheckpointing as mechanism_class
+        setattr(mechanism_class, f"_{mechanism_class.__name__}__instance", None)
+        benchmark = run_benchmark(cfg)
+        setattr(mechanism_class, f"_{mechanism_class.__name__}__instance", None)
+        # the same files as the synchronous checkpoints of test_checkpoint_epoch
+        load_bin = list(pathlib.Path("./checkpoints").glob("*/*"))
+        files_per_checkpoint = 3 * comm.size
+        if framework == "tensorflow":
+            assert len(load_bin) == epochs * (files_per_checkpoint * 2 + 1), f"files produced are {load_bin}"
+        else:
+            assert len(load_bin) == epochs * files_per_checkpoint, f"files produced are {load_bin}"
+        checkpoints = benchmark.stats.output['async_checkpoints']
+        assert len(checkpoints) == epochs
+        for checkpoint in checkpoints:
+            assert checkpoint['blocked'] >= checkpoint['staging'] >= 0
+            assert checkpoint['persist'] > 0
+            assert 0 <= checkpoint['overlap'] <= checkpoint['persist'] + 1e-6
+        if comm.rank == 0:
+            metric = benchmark.stats.summary['metric']
+            for name in ['save_checkpoint_blocked_mean_seconds', 'save_checkpoint_staging_mean_seconds',
+                         'save_checkpoint_persist_mean_seconds', 'save_checkpoint_persist_io_mean_GB_per_second']:
+                assert metric[name] >= 0, name
+            assert 0 <= metric['save_checkpoint_overlap_percentage'] <= 100
+        comm.Barrier()
+        if comm.rank == 0:
+            shutil.rmtree("./checkpoints", ignore_errors=True)
+        comm.Barrier()
+        clean()
+    finalize()
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("write_size, threads, odirect", [(4096, 1, False), (4096, 3, True),
+                                                          (1 << 20, 1, True), (1 << 20, 4, False), (12345, 2, False)])
+def test_raw_checkpoint_io(write_size, threads, odirect, tmp_path) -> None:
+    rng = np.random.default_rng(comm.rank)
+    tensors = [("layer/0", rng.random(1000, dtype=np.float32)),
+               ("layer/1", rng.integers(0, 256, size=3 * 4096 + 7, dtype=np.uint8)),
+               ("optimizer", rng.random(300000).astype(np.float16)),
+               ("empty", np.zeros(0, dtype=np.float64)),
+               ("bf16", rng.integers(0, 1 << 16, size=513, dtype=np.uint16))]
+    name = str(tmp_path / f"checkpoint_{comm.rank}.raw")
+    stats = write_raw_file(name, tensors, write_size, odirect, threads, fsync=True)
+    assert stats['bytes'] == os.path.getsize(name)
+    assert stats['bytes'] >= sum(array.nbytes for _, array in tensors)
+    assert isinstance(stats['odirect'], bool)
+    for use_mmap in [False, True]:
+        loaded = read_raw_file(name, write_size, use_mmap)
+        assert list(loaded) == [key for key, _ in tensors]
+        for key, array in tensors:
+            assert loaded[key].dtype == array.dtype
+            assert np.array_equal(loaded[key], array)
+    results = sweep(str(tmp_path / "sweep"), 1 << 20, [4096, 65536], [1, 2], odirect=odirect, fsync=False)
+    assert [(result['write_size'], result['threads']) for result in results] == [(4096, 1), (4096, 2), (65536, 1), (65536, 2)]
+    assert all(result['bytes'] > 1 << 20 and result['GB_per_second'] > 0 for result in results)
+    assert len(os.listdir(tmp_path / "sweep")) == 0
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("threads, odirect", [(1, False), (4, True)])
+def test_checkpoint_raw(threads, odirect) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for raw checkpoints with {threads} writer threads")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config',
+                      overrides=['++workload.framework=tensorflow',
+                                 '++workload.reader.data_loader=tensorflow',
+                                 '++workload.workflow.checkpoint=True',
+                                 '++workload.workflow.generate_data=False',
+                                 '++workload.workflow.train=False',
+                                 '++workload.checkpoint.mechanism=raw',
+                                 '++workload.checkpoint.write_size=65536',
+                                 f'++workload.checkpoint.writer_threads={threads}',
+                                 f'++workload.checkpoint.odirect={odirect}',
+                                 '++workload.checkpoint.num_checkpoints_write=2',
+                                 '++workload.checkpoint.num_checkpoints_read=1',
+                                 '++workload.model.model_size=100000',
+                                 '++workload.model.optimization_groups=[300000, 128]',
+                                 '++workload.model.num_layers=2',
+                                 '++workload.model.layer_parameters=[4096]',
+                                 f'++workload.model.parallelism.tensor={comm.size}'])
+        comm.Barrier()
+        if comm.rank == 0:
+            shutil.rmtree("./checkpoints", ignore_errors=True)
+            os.makedirs("./checkpoints", exist_ok=True)
+        comm.Barrier()
+        from dlio_benchmark.checkpointing.raw_checkpointing import RawCheckpointing
+        RawCheckpointing._RawCheckpointing__instance = None
+        benchmark = run_benchmark(cfg)
+        mechanism = RawCheckpointing.get_instance()
+        RawCheckpointing._RawCheckpointing__instance = None
+        load_bin = sorted(pathlib.Path("./checkpoints").glob("*/*"))
+        assert len(load_bin) == 2 * 3 * comm.size, f"files produced are {load_bin}"
+        assert all(path.suffix == ".raw" for path in load_bin)
+        optimizer = read_raw_file(f"./checkpoints/global_epoch1_step1/zero_pp_rank_0_mp_rank_{comm.rank}_optim_states.raw")
+        tensors = flatten_state(mechanism.optimization_state)
+        assert list(optimizer) == [key for key, _ in tensors]
+        for key, tensor in tensors:
+            assert np.array_equal(optimizer[key], tensor)
+        comm.Barrier()
+        if comm.rank == 0:
+            shutil.rmtree("./checkpoints", ignore_errors=True)
+        comm.Barrier()
+        clean()
+    finalize()
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("threads, mmap, checksum", [(1, False, False), (4, True, True), (4, False, True)])
+def test_checkpoint_read_parallel(threads, mmap, checksum) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for checkpoint loads with {threads} reader threads")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config',
+                      overrides=['++workload.framework=tensorflow',
+                                 '++workload.reader.data_loader=tensorflow',
+                                 '++workload.workflow.checkpoint=True',
+                                 '++workload.workflow.generate_data=False',
+                                 '++workload.workflow.train=False',
+                                 '++workload.checkpoint.mechanism=raw',
+                                 f'++workload.checkpoint.reader_threads={threads}',
+                                 f'++workload.checkpoint.load_mmap={mmap}',
+                                 f'++workload.checkpoint.checksum={checksum}',
+                                 '++workload.checkpoint.readahead=True',
+                                 '++workload.checkpoint.recovery_rank_shift=True',
+                                 '++workload.checkpoint.num_checkpoints_write=2',
+                                 '++workload.checkpoint.num_checkpoints_read=2',
+                                 '++workload.model.model_size=100000',
+                                 '++workload.model.optimization_groups=[300000, 128]',
+                                 '++workload.model.num_layers=2',
+                                 '++workload.model.layer_parameters=[4096]',
+                                 f'++workload.model.parallelism.tensor={comm.size}'])
+        comm.Barrier()
+        if comm.rank == 0:
+            shutil.rmtree("./checkpoints", ignore_errors=True)
+            os.makedirs("./checkpoints", exist_ok=True)
+        comm.Barrier()
+        from dlio_benchmark.checkpointing.raw_checkpointing import RawCheckpointing
+        RawCheckpointing._RawCheckpointing__instance = None
+        benchmark = run_benchmark(cfg)
+        RawCheckpointing._RawCheckpointing__instance = None
+        load_bin = sorted(pathlib.Path("./checkpoints").glob("*/*"))
+        assert len(load_bin) == 2 * 3 * comm.size * (2 if checksum else 1), f"files produced are {load_bin}"
+        # the rank loads the files of the rank ppn after it
+        shifted = (comm.rank + DLIOMPI.get_instance().npernode()) % comm.size
+        loads = benchmark.stats.output['checkpoint_loads']
+        assert [load['checkpoint'] for load in loads] == ["global_epoch1_step1", "global_epoch1_step2"]
+        for load in loads:
+            assert load['rank'] == shifted
+            assert sorted(file['file'].split('/')[1] for file in load['files']) == \
+                sorted([f"model_states-{shifted}", f"zero_pp_rank_0_mp_rank_{shifted}_model_states",
+                        f"zero_pp_rank_0_mp_rank_{shifted}_optim_states"])
+            assert all(file['bytes'] > 0 and file['seconds'] > 0 for file in load['files'])
+            assert load['bytes'] == sum(file['bytes'] for file in load['files'])
+        if comm.rank == 0:
+            metric = benchmark.stats.summary['metric']
+            assert metric['load_checkpoint_files'] == 2 * 3 * comm.size
+            assert metric['load_checkpoint_read_io_mean_GB_per_second'] > 0
+            assert metric['load_checkpoint_file_io_min_GB_per_second'] <= metric['load_checkpoint_file_io_mean_GB_per_second'] \
+                <= metric['load_checkpoint_file_io_max_GB_per_second']
+        comm.Barrier()
+        if comm.rank == 0:
+            shutil.rmtree("./checkpoints", ignore_errors=True)
+        comm.Barrier()
+        clean()
+    finalize()
+
+@pytest.mark.timeout(60, method="thread")
+def test_checkpoint_shared_tensors() -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for checkpoints of shared tensors")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config',
+                      overrides=['++workload.framework=tensorflow',
+                                 '++workload.reader.data_loader=tensorflow',
+                                 '++workload.workflow.checkpoint=True',
+                                 '++workload.workflow.generate_data=False',
+                                 '++workload.workflow.train=False',
+                                 '++workload.checkpoint.mechanism=raw',
+                                 '++workload.checkpoint.tensor_provider=shared',
+                                 '++workload.checkpoint.num_checkpoints_write=1',
+                                 '++workload.checkpoint.num_checkpoints_read=1',
+                                 '++workload.model.model_size=100000',
+                                 '++workload.model.optimization_groups=[300000, 200000, 100000]',
+                                 f'++workload.model.parallelism.tensor={comm.size}'])
+        comm.Barrier()
+        if comm.rank == 0:
+            shutil.rmtree("./checkpoints", ignore_errors=True)
+            os.makedirs("./checkpoints", exist_ok=True)
+        comm.Barrier()
+        from dlio_benchmark.checkpointing.raw_checkpointing import RawCheckpointing
+        RawCheckpointing._RawCheckpointing__instance = None
+        run_benchmark(cfg)
+        mechanism = RawCheckpointing.get_instance()
+        RawCheckpointing._RawCheckpointing__instance = None
+        # the tensors are views over one buffer, smaller than the tensors together
+        tensors = flatten_state(mechanism.optimization_state) + flatten_state(mechanism.model_state)
+        assert all(np.shares_memory(tensor, mechanism.shared_buffer) for _, tensor in tensors)
+        assert len(mechanism.shared_buffer) < sum(tensor.nbytes for _, tensor in tensors)
+        name = f"./checkpoints/global_epoch1_step1/zero_pp_rank_0_mp_rank_{comm.rank}_optim_states.raw"
+        optimizer = read_raw_file(name)
+        for key, tensor in flatten_state(mechanism.optimization_state):
+            assert np.array_equal(optimizer[key], tensor)
+        # no page of the file is the same as another one
+        with open(name, 'rb') as f:
+            data = f.read()
+        pages = [data[offset:offset + 4096] for offset in range(0, len(data) - 4096 + 1, 4096)]
+        assert len(set(pages)) == len(pages)
+        comm.Barrier()
+        if comm.rank == 0:
+            shutil.rmtree("./checkpoints", ignore_errors=True)
+        comm.Barrier()
+        clean()
+    finalize()
+
+@pytest.mark.timeout(60, method="thread")
+@pytest.mark.parametrize("zero_stage, pipeline", [(0, 1), (1, comm.size), (3, 1)])
+def test_checkpoint_plan(zero_stage, pipeline) -> None:
+    init()
+    clean()
+    if (comm.rank == 0):
+        logging.info("")
+        logging.info("=" * 80)
+        logging.info(f" DLIO test for the checkpoint plan with ZeRO stage {zero_stage} and pipeline parallelism {pipeline}")
+        logging.info("=" * 80)
+    with initialize_config_dir(version_base=None, config_dir=config_dir):
+        cfg = compose(config_name='config',
+                      overrides=['++workload.framework=tensorflow',
+                                 '++workload.reader.data_loader=tensorflow',
+                                 '++workload.workflow.checkpoint=True',
+                                 '++workload.workflow.generate_data=False',
+                                 '++workload.workflow.train=False',
+                                 '++workload.checkpoint.mechanism=raw',
+                                 '++workload.checkpoint.num_checkpoints_write=1',
+                                 '++workload.checkpoint.num_checkpoints_read=1',
+                                 '++workload.model.type=transformer',
+                                 '++workload.model.num_layers=3',
+                                 '++workload.model.model_datatype=fp16',
+                                 '++workload.model.optimizer_datatype=fp32',
+                                 '++workload.model.transformer.vocab_size=1000',
+                                 '++workload.model.transformer.hidden_size=64',
+                                 '++workload.model.transformer.ffn_hidden_size=128',
+                                 '++workload.model.transformer.num_attention_heads=4',
+                                 '++workload.model.transformer.num_kv_heads=2',
+                                 f'++workload.model.parallelism.zero_stage={zero_stage}',
+                                 f'++workload.model.parallelism.pipeline={pipeline}'])
+        comm.Barrier()
+        if comm.rank == 0:
+            shutil.rmtree("./checkpoints", ignore_errors=True)
+            os.makedirs("./checkpoints", exist_ok=True)
+        comm.Barrier()
+        from dlio_benchmark.checkpointing.raw_checkpointing import RawCheckpointing
+        RawCheckpointing._RawCheckpointing__instance = None
+        run_benchmark(cfg)
+        RawCheckpointing._RawCheckpointing__instance = None
+        plan = plan_checkpoint(cfg['workload'], comm.size)
+        assert plan['zero_stage'] == zero_stage and plan['pipeline_parallelism'] == pipeline
+        assert plan['bytes'] == sum(rank_plan['bytes'] for rank_plan in plan['rank_plans'])
+        # the plan has the files the benchmark wrote, with the same tensors
+        planned = sorted(file['file'] for rank_plan in plan['rank_plans'] for file in rank_plan['files'])
+        written = sorted(str(path.relative_to("./checkpoints")) for path in pathlib.Path("./checkpoints").glob("*/*"))
+        assert planned == written
+        for rank_plan in plan['rank_plans']:
+            if rank_plan['rank'] != comm.rank:
+                continue
+            for file in rank_plan['files']:
+                with open(os.path.join("./checkpoints", file['file']), 'rb') as f:
+                    index, _ = read_raw_index(f)
+                assert {name: entry['nbytes'] for name, entry in index.items()} == \
+                    {tensor['name']: tensor['bytes'] for tensor in file['tensors']}
+        assert predict_time(plan, 1.0) == plan['bytes'] / 1024. / 1024. / 1024.
+        assert predict_time(plan, 1e9, 1.0) == plan['max_rank_bytes'] / 1024. / 1024. / 1024.
+        comm.Barrier()
+        if comm.rank == 0:
+            shutil.rmtree("./checkpoints", ignore_errors=True)
+        comm.Barrier()
+        clean()
+    finalize()
+
 compute_time_distributions = {
     "uniform": {"type": "uniform", "min": 1.0, "max": 2.0},
     "normal": {"type": "normal", "mean": 1.0, "stdev": 1.0},
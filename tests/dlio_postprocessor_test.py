@@ -56,6 +56,60 @@ class TestDLIOPostProcessor(unittest.TestCase):
         self.assertEqual(postproc.overall_stats['avg_process_processing_time'], '65.87')
 
 
+    def test_parse_iostat_trace_multiple_hosts(self):
+        args = {
+            'output_folder': os.path.join(os.path.dirname(__file__), 'test_data'),
+            'name': '',
+            'num_proc': 2,
+            'epochs': 1,
+            'do_eval': False,
+            'do_checkpoint': False,
+            'batch_size': 4,
+            'batch_size_eval': 1,
+            'record_size':234560851
+        }
+        args = namedtuple('args', args.keys())(*args.values())
+        postproc = self.create_DLIO_PostProcessor(args)
+
+        def item(second, offset):
+            disk = {'r/s': second + offset, 'w/s': 0.0, 'rMB/s': 10.0 * (second + offset), 'wMB/s': 0.0,
+                    'r_await': 0.5, 'w_await': 0.0, 'aqu-sz': 1.0}
+            return {
+                'timestamp': f'04/04/23 16:33:{second:02d}',
+                'avg-cpu': {'user': 10.0 + offset, 'nice': 1.0, 'system': 5.0, 'iowait': 1.0, 'steal': 0.0, 'idle': 83.0 - offset},
+                'disk': [dict(disk, disk_device='vda'), dict(disk, disk_device='vdb')]
+            }
+        # the second host starts later, its items are interleaved with those of the first one by time
+        postproc.iotrace = {'sysstat': {'hosts': [
+            {'nodename': 'node0', 'statistics': [item(second, 0) for second in range(10)]},
+            {'nodename': 'node1', 'statistics': [item(second, 100) for second in range(5, 15)]},
+        ]}}
+        postproc.per_epoch_stats = {'1': {
+            'start': '2023-04-04T16:33:00', 'end': '2023-04-04T16:33:15', 'duration': '15.00',
+            'block1': {'start': '2023-04-04T16:33:03', 'end': '2023-04-04T16:33:08', 'duration': '5.00'},
+        }}
+        postproc.parse_iostat_trace()
+
+        self.assertEqual(list(postproc.disks), ['node0:vda', 'node0:vdb', 'node1:vda', 'node1:vdb'])
+        self.assertEqual(len(postproc.cpu_stats), 20)
+        self.assertEqual(len(postproc.disk_stats), 40)
+        self.assertTrue(postproc.cpu_stats['timestamp'].is_monotonic_increasing)
+        self.assertEqual(postproc.cpu_stats['user'].iloc[0], 11.0)
+
+        postproc.extract_stats_from_iostat_trace()
+
+        block = postproc.per_epoch_stats['1']['block1']
+        # [16:33:03, 16:33:08) holds seconds 3 to 7 of node0 and 5 to 7 of node1
+        self.assertEqual(block['disk']['node0:vda']['r/s']['min'], '3.00')
+        self.assertEqual(block['disk']['node0:vda']['r/s']['max'], '7.00')
+        self.assertEqual(block['disk']['node1:vdb']['r/s']['min'], '105.00')
+        self.assertEqual(block['disk']['node1:vdb']['r/s']['max'], '107.00')
+        self.assertEqual(block['cpu']['user']['min'], '11.00')
+        self.assertEqual(block['cpu']['user']['max'], '111.00')
+        self.assertEqual(postproc.overall_stats['disk']['node1:vda']['rMB/s']['max'], '1070.00')
+        self.assertEqual(postproc.overall_stats['disk']['node0:vda']['r/s']['mean'], '5.00')
+
+
 
 if __name__ == '__main__':
     unittest.main()